@@ -0,0 +1 @@
+"""Support modules for the CodeCollab AI agent test suite (scripts/test-codecollab-agents.py)"""
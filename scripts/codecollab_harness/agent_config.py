@@ -0,0 +1,95 @@
+import os
+import re
+from typing import Dict, Any, List, NamedTuple, Optional
+
+# The agent table lives in the app; reading it here keeps the test suite in
+# sync with whatever models and temperatures the product actually uses
+CONFIG_PATH = os.path.normpath(os.path.join(os.path.dirname(__file__), "..", "..", "lib", "ai", "config.ts"))
+
+DEFAULT_MODEL = "gemini-2.0-flash-exp"
+
+# Test result agent ids that differ from the ids in AI_AGENTS
+AGENT_ALIASES = {
+    "code-review-specialist": "code-review",
+}
+
+_STRING_FIELD = re.compile(r"(\w+)\s*:\s*'([^']*)'")
+_NUMBER_FIELD = re.compile(r"(\w+)\s*:\s*(-?\d+(?:\.\d+)?)\s*[,}\n]")
+
+
+class AgentConfig(NamedTuple):
+    id: str
+    name: str
+    model: str
+    temperature: Optional[float]
+    specialization: str = ""
+
+
+def _balanced_block(source: str, start: int, open_char: str, close_char: str) -> str:
+    """Return the text between the bracket at `start` and its matching close bracket"""
+    depth = 0
+    for i in range(start, len(source)):
+        if source[i] == open_char:
+            depth += 1
+        elif source[i] == close_char:
+            depth -= 1
+            if depth == 0:
+                return source[start + 1:i]
+    raise ValueError(f"Unbalanced '{open_char}' at offset {start}")
+
+
+def _fields(block: str) -> Dict[str, Any]:
+    fields: Dict[str, Any] = {key: value for key, value in _STRING_FIELD.findall(block)}
+    for key, value in _NUMBER_FIELD.findall(block):
+        fields.setdefault(key, float(value) if "." in value else int(value))
+    return fields
+
+
+def _top_level_objects(block: str) -> List[str]:
+    objects = []
+    i = 0
+    while True:
+        i = block.find("{", i)
+        if i == -1:
+            return objects
+        body = _balanced_block(block, i, "{", "}")
+        objects.append(body)
+        i += len(body) + 2
+
+
+def load_ai_config(path: str = CONFIG_PATH) -> Dict[str, Dict[str, Any]]:
+    """Parse AI_CONFIG (provider -> model/maxTokens) from lib/ai/config.ts"""
+    with open(path, "r", encoding="utf-8") as f:
+        source = f.read()
+    start = source.index("{", source.index("=", source.index("AI_CONFIG")))
+    block = _balanced_block(source, start, "{", "}")
+    providers = {}
+    for match in re.finditer(r"(\w+)\s*:\s*{", block):
+        body = _balanced_block(block, match.end() - 1, "{", "}")
+        providers[match.group(1)] = _fields(body)
+    return providers
+
+
+def load_agents(path: str = CONFIG_PATH) -> Dict[str, AgentConfig]:
+    """Parse the AI_AGENTS table from lib/ai/config.ts into AgentConfig entries keyed by id"""
+    with open(path, "r", encoding="utf-8") as f:
+        source = f.read()
+    start = source.index("[", source.index("=", source.index("AI_AGENTS")))
+    agents = {}
+    for body in _top_level_objects(_balanced_block(source, start, "[", "]")):
+        fields = _fields(body)
+        if "id" not in fields or "model" not in fields:
+            continue
+        agents[fields["id"]] = AgentConfig(
+            id=fields["id"],
+            name=fields.get("name", fields["id"]),
+            model=fields["model"],
+            temperature=fields.get("temperature"),
+            specialization=fields.get("specialization", ""),
+        )
+    return agents
+
+
+def resolve_agent(agents: Dict[str, AgentConfig], agent_id: str) -> Optional[AgentConfig]:
+    """Look up a test's agent id in the agent table, honouring AGENT_ALIASES"""
+    return agents.get(AGENT_ALIASES.get(agent_id, agent_id))
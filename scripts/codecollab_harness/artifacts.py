@@ -0,0 +1,384 @@
+import os
+import re
+import json
+import shutil
+import hashlib
+import threading
+import subprocess
+from functools import lru_cache
+from typing import Dict, Any, List, NamedTuple, Optional, Sequence, Tuple
+
+from .cache import ResponseCache
+from .options import DEFAULT_MEMO_DIR
+
+REPO_ROOT = os.path.normpath(os.path.join(os.path.dirname(__file__), "..", ".."))
+TYPESCRIPT_CHECKER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "check_typescript.js")
+
+# Bumped whenever a check changes, so verdicts memoized by an older one are not reused
+CHECK_VERSION = 1
+
+# Artifact kinds a spec can declare for a response field. A "files" field is
+# an object of file path -> content, each file checked by its extension.
+TYPESCRIPT_KINDS = ("ts", "tsx", "js", "jsx")
+SQL = "sql"
+JSON = "json"
+PACKAGE_JSON = "package.json"
+FILES = "files"
+ARTIFACT_KINDS = TYPESCRIPT_KINDS + (SQL, JSON, PACKAGE_JSON, FILES)
+_EXTENSION_KINDS = {
+    ".ts": "ts", ".tsx": "tsx", ".js": "js", ".jsx": "jsx", ".mjs": "js", ".cjs": "js", ".sql": SQL, ".json": JSON,
+}
+
+# Errors kept per artifact
+MAX_ERRORS = 5
+# Artifacts per checker process: one node process parses a whole batch
+BATCH_SIZE = 64
+TYPESCRIPT_TIMEOUT = 120.0
+
+_FENCE = re.compile(r"^\s*```[\w.+-]*[ \t]*\n(.*?)\n?```\s*$", re.S)
+_PACKAGE_NAME = re.compile(r"^(?:@[a-z0-9-~][a-z0-9-._~]*/)?[a-z0-9-~][a-z0-9-._~]*$")
+_SEMVER = re.compile(r"^\d+\.\d+\.\d+(?:-[0-9A-Za-z.-]+)?(?:\+[0-9A-Za-z.-]+)?$")
+_PACKAGE_MAPS = ("scripts", "dependencies", "devDependencies", "peerDependencies", "optionalDependencies")
+_SQL_DELIMITERS = re.compile(r"--|/\*|'|\"|\$(?:[A-Za-z_]\w*)?\$")
+_SQL_CLOSERS = {"--": "\n", "/*": "*/", "'": "'", '"': '"'}
+_SQL_OPENERS = {"--": "comment", "/*": "comment", "'": "string", '"': "quoted identifier"}
+_SQL_COMMANDS = frozenset("""
+    abort alter analyze begin call checkpoint cluster comment commit copy create deallocate declare delete discard do
+    drop end execute explain grant import insert listen lock merge notify prepare refresh reindex reset revoke
+    rollback savepoint security select set show start truncate unlisten update vacuum values with
+""".split())
+
+
+class Artifact(NamedTuple):
+    """Code or config carried by a response: `name` is its field, or field/path inside a "files" field"""
+    name: str
+    kind: str
+    content: str
+
+
+def kind_for_path(path: str) -> Optional[str]:
+    """The artifact kind of a generated file, or None for files nothing checks (CSS, Markdown, ...)"""
+    if os.path.basename(path) == PACKAGE_JSON:
+        return PACKAGE_JSON
+    return _EXTENSION_KINDS.get(os.path.splitext(path)[1].lower())
+
+
+def _artifact(name: str, kind: str, value: Any) -> Artifact:
+    if isinstance(value, str):
+        # A fenced block inside the string (```tsx ... ```) is unwrapped, not counted as broken code
+        match = _FENCE.match(value)
+        return Artifact(name, kind, match.group(1) if match else value)
+    if isinstance(value, list) and all(isinstance(line, str) for line in value):
+        return Artifact(name, kind, "\n".join(value))
+    # Models sometimes give a JSON file as the object itself rather than its text
+    return Artifact(name, kind, json.dumps(value, indent=2))
+
+
+def extract_artifacts(parsed: Dict[str, Any], fields: Dict[str, str]) -> List[Artifact]:
+    """The artifacts of a parsed response, from the fields its spec declares (field -> kind)"""
+    artifacts = []
+    for field, kind in fields.items():
+        value = parsed.get(field)
+        if kind == FILES:
+            if isinstance(value, dict):
+                for path, content in value.items():
+                    file_kind = kind_for_path(path)
+                    if file_kind is not None:
+                        artifacts.append(_artifact(f"{field}/{path}", file_kind, content))
+        elif value is not None:
+            artifacts.append(_artifact(field, kind, value))
+    return artifacts
+
+
+def _line(text: str, offset: int) -> int:
+    return text.count("\n", 0, offset) + 1
+
+
+def check_json(text: str) -> List[str]:
+    try:
+        json.loads(text)
+    except ValueError as e:
+        return [str(e)]
+    return []
+
+
+def check_package_json(text: str) -> List[str]:
+    """npm's manifest rules: a lowercase, URL-safe name, a semver version, and scripts and dependencies as string maps"""
+    try:
+        manifest = json.loads(text)
+    except ValueError as e:
+        return [str(e)]
+    if not isinstance(manifest, dict):
+        return ["package.json is not a JSON object"]
+    errors = []
+    name = manifest.get("name")
+    if name is not None and not (isinstance(name, str) and len(name) <= 214 and _PACKAGE_NAME.match(name)):
+        errors.append(f"invalid package name {name!r}")
+    version = manifest.get("version")
+    if version is not None and not (isinstance(version, str) and _SEMVER.match(version)):
+        errors.append(f"version {version!r} is not semver")
+    for field in _PACKAGE_MAPS:
+        value = manifest.get(field)
+        if value is not None and not (isinstance(value, dict) and all(isinstance(item, str) for item in value.values())):
+            errors.append(f"{field} must map names to strings")
+    return errors
+
+
+@lru_cache(maxsize=None)
+def _pglast():
+    """PostgreSQL's own parser (libpg_query), when the optional pglast package is installed"""
+    try:
+        from pglast import parser
+    except ImportError:
+        return None
+    return parser
+
+
+def sql_checker() -> str:
+    return "pglast" if _pglast() is not None else "lexical"
+
+
+def check_sql(text: str) -> List[str]:
+    """Parse a SQL script with PostgreSQL's grammar (pglast), or check its structure without it
+
+    Generated schemas target Supabase: gen_random_uuid() defaults, row level
+    security policies and plpgsql functions, which no embedded database loads,
+    so without pglast only the lexical structure is checked.
+    """
+    parser = _pglast()
+    if parser is None:
+        return check_sql_lexically(text)
+    try:
+        statements = parser.parse_sql(text)
+    except parser.ParseError as e:
+        message, location = e.args[0], e.args[1] if len(e.args) > 1 else None
+        return [f"line {_line(text, location)}: {message}" if location is not None else message]
+    return [] if statements else ["no SQL statements"]
+
+
+def check_sql_lexically(text: str) -> List[str]:
+    """Terminated strings, comments and dollar quotes, balanced parentheses, and statements that start with a SQL command"""
+    # Comments and quoted text are blanked out (keeping offsets and newlines) so ; and ( inside them are ignored
+    code: List[str] = []
+    position = 0
+    while True:
+        match = _SQL_DELIMITERS.search(text, position)
+        if match is None:
+            code.append(text[position:])
+            break
+        code.append(text[position:match.start()])
+        opener = match.group()
+        closer = _SQL_CLOSERS.get(opener, opener)
+        end = text.find(closer, match.end())
+        # A doubled quote inside a string or identifier is an escaped quote
+        while closer in ("'", '"') and end != -1 and text.startswith(closer, end + 1):
+            end = text.find(closer, end + 2)
+        if end == -1 and opener == "--":
+            end = len(text)
+        elif end == -1:
+            kind = _SQL_OPENERS.get(opener, f"dollar-quoted body {opener}")
+            return [f"line {_line(text, match.start())}: unterminated {kind}"]
+        position = min(end + len(closer), len(text))
+        code.append(re.sub(r"[^\n]", " ", text[match.start():position]))
+    code_text = "".join(code)
+
+    errors = []
+    statements = 0
+    offset = 0
+    for statement in code_text.split(";"):
+        depth = 0
+        for paren in re.finditer(r"[()]", statement):
+            depth += 1 if paren.group() == "(" else -1
+            if depth < 0:
+                errors.append(f"line {_line(code_text, offset + paren.start())}: unbalanced ')'")
+                break
+        if depth > 0:
+            errors.append(f"line {_line(code_text, offset + len(statement.rstrip()))}: unclosed '('")
+        first_word = re.match(r"\s*([A-Za-z]*)", statement)
+        if statement.strip():
+            statements += 1
+            if first_word.group(1).lower() not in _SQL_COMMANDS:
+                errors.append(f"line {_line(code_text, offset + first_word.start(1))}: "
+                              f"statement does not start with a SQL command: {statement.strip()[:40]!r}")
+        offset += len(statement) + 1
+    return errors if statements else ["no SQL statements"]
+
+
+@lru_cache(maxsize=None)
+def typescript_package() -> Optional[Tuple[str, str]]:
+    """Directory and version of the app's typescript package, from the nearest node_modules above the repo root"""
+    directory = REPO_ROOT
+    while True:
+        package = os.path.join(directory, "node_modules", "typescript")
+        if os.path.exists(os.path.join(package, "package.json")):
+            with open(os.path.join(package, "package.json"), "r", encoding="utf-8") as f:
+                return package, json.load(f).get("version", "")
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return None
+        directory = parent
+
+
+def _checker_id(kind: str) -> Optional[str]:
+    """Which checker judges a kind, part of its memo key; None when it cannot run"""
+    if kind in TYPESCRIPT_KINDS:
+        package = typescript_package()
+        return f"typescript {package[1]}" if package else None
+    if kind == SQL:
+        return sql_checker()
+    return kind
+
+
+def _verdict(checker: str, errors: List[str]) -> Dict[str, Any]:
+    return {"valid": not errors, "checker": checker, "errors": errors[:MAX_ERRORS]}
+
+
+def _skipped(reason: str) -> Dict[str, Any]:
+    return {"valid": None, "skipped": reason}
+
+
+def _check_typescript(items: Sequence[Tuple[str, str]]) -> List[Dict[str, Any]]:
+    """Parse TypeScript/JavaScript with the app's typescript package, all items in one node process"""
+    node = shutil.which("node")
+    package = typescript_package()
+    if node is None or package is None:
+        reason = "node is not installed" if node is None else "typescript is not installed: run npm install"
+        return [_skipped(reason)] * len(items)
+    try:
+        completed = subprocess.run(
+            [node, TYPESCRIPT_CHECKER, package[0]], input=json.dumps([{"kind": kind, "text": text} for kind, text in items]),
+            capture_output=True, text=True, encoding="utf-8", timeout=TYPESCRIPT_TIMEOUT,
+        )
+    except subprocess.TimeoutExpired:
+        return [_skipped(f"TypeScript check timed out after {TYPESCRIPT_TIMEOUT:.0f}s")] * len(items)
+    if completed.returncode != 0:
+        reason = (completed.stderr.strip().splitlines() or [f"exit code {completed.returncode}"])[-1]
+        return [_skipped(reason)] * len(items)
+    output = json.loads(completed.stdout)
+    return [_verdict(output["checker"], errors) for errors in output["errors"]]
+
+
+def check_batch(items: Sequence[Tuple[str, str]]) -> List[Dict[str, Any]]:
+    """Check (kind, content) pairs that share a checker; runs in a pool worker"""
+    if items and items[0][0] in TYPESCRIPT_KINDS:
+        return _check_typescript(items)
+    verdicts = []
+    for kind, content in items:
+        if kind == SQL:
+            verdicts.append(_verdict(sql_checker(), check_sql(content)))
+        elif kind == PACKAGE_JSON:
+            verdicts.append(_verdict(PACKAGE_JSON, check_package_json(content)))
+        else:
+            verdicts.append(_verdict(JSON, check_json(content)))
+    return verdicts
+
+
+def _family(kind: str) -> str:
+    return "typescript" if kind in TYPESCRIPT_KINDS else "sql" if kind == SQL else "json"
+
+
+def _runs_inline(family: str) -> bool:
+    """JSON checks cost less than a trip to a worker, and so does finding that TypeScript cannot be checked"""
+    if family == "typescript":
+        return typescript_package() is None or shutil.which("node") is None
+    return family == "json"
+
+
+def memo_key(artifact: Artifact) -> Optional[str]:
+    """SHA-256 of the check version, checker, kind and content; None when the checker is unknown"""
+    checker = _checker_id(artifact.kind)
+    if checker is None:
+        return None
+    material = json.dumps([CHECK_VERSION, checker, artifact.kind, artifact.content], ensure_ascii=False)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class ArtifactValidator:
+    """Checks artifacts with offline tools in a process pool, memoizing verdicts by content hash
+
+    Verdicts are stored on disk like response cache entries, keyed by
+    `memo_key`, so an unchanged artifact is checked once across runs and
+    re-scoring. Verdicts of checks that could not run (no node, no
+    typescript package) are not stored. Misses are grouped by checker and
+    sent to the pool in batches: the TypeScript files of a batch share one
+    node process. JSON checks run inline, where they cost less than a trip
+    to a worker; with `workers=0` everything runs inline.
+    """
+
+    def __init__(self, workers: Optional[int] = None, memo_dir: Optional[str] = DEFAULT_MEMO_DIR):
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.memo = ResponseCache(memo_dir) if memo_dir else None
+        self.checked = 0
+        self.memo_hits = 0
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+                # Tests run in threads, and forking a threaded process can deadlock its children
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+            return self._pool
+
+    def validate(self, artifacts: Sequence[Artifact]) -> List[Dict[str, Any]]:
+        """A verdict per artifact: name, kind, valid (None when skipped), checker and errors"""
+        verdicts: List[Optional[Dict[str, Any]]] = [None] * len(artifacts)
+        keys: Dict[int, Optional[str]] = {}
+        pending: Dict[str, List[int]] = {}
+        hits = 0
+        for index, artifact in enumerate(artifacts):
+            if not artifact.content.strip():
+                verdicts[index] = _verdict(artifact.kind, ["empty artifact"])
+                continue
+            key = keys[index] = memo_key(artifact) if self.memo is not None else None
+            entry = self.memo.get(key) if key is not None else None
+            if entry is not None:
+                verdicts[index] = entry["verdict"]
+                hits += 1
+            else:
+                pending.setdefault(_family(artifact.kind), []).append(index)
+
+        batches = [
+            (family, indexes[start:start + BATCH_SIZE])
+            for family, indexes in pending.items() for start in range(0, len(indexes), BATCH_SIZE)
+        ]
+        submitted, done = [], []
+        for family, indexes in batches:
+            items = [(artifacts[index].kind, artifacts[index].content) for index in indexes]
+            if self.workers > 0 and not _runs_inline(family):
+                submitted.append((indexes, self._executor().submit(check_batch, items)))
+            else:
+                done.append((indexes, check_batch(items)))
+        done += [(indexes, future.result()) for indexes, future in submitted]
+        for indexes, results in done:
+            for index, verdict in zip(indexes, results):
+                verdicts[index] = verdict
+                if keys.get(index) is not None and verdict["valid"] is not None:
+                    self.memo.put(keys[index], {"key": keys[index], "kind": artifacts[index].kind, "verdict": verdict})
+
+        with self._lock:
+            self.memo_hits += hits
+            self.checked += sum(len(indexes) for indexes, _ in done)
+        return [{"name": artifact.name, "kind": artifact.kind, **verdict} for artifact, verdict in zip(artifacts, verdicts)]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"checked": self.checked, "memo_hits": self.memo_hits}
+
+    def close(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+
+def summarize_artifacts(verdicts: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Counts over a response's artifact verdicts; skipped artifacts count for neither side"""
+    checked = [verdict for verdict in verdicts if verdict["valid"] is not None]
+    return {
+        "checked": len(checked),
+        "valid": sum(1 for verdict in checked if verdict["valid"]),
+        "skipped": len(verdicts) - len(checked),
+        "results": verdicts,
+    }
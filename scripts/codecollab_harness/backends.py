@@ -0,0 +1,268 @@
+import json
+import time
+import random
+import hashlib
+import threading
+from typing import Dict, Any, Callable, Iterator, NamedTuple, Optional, Union
+
+from .agent_config import load_ai_config
+from .schema import RESPONSE_SCHEMA_KEY, prompt_template, to_gemini_schema
+from .usage import TokenUsage, estimate_usage
+
+
+class ModelResponse(NamedTuple):
+    """Backend-neutral model response, exposing `.text` like the SDK objects"""
+    text: str
+    model: str
+    stream_metrics: Optional[Dict[str, Any]] = None
+    aborted: bool = False
+    parsed_json: Optional[Dict[str, Any]] = None
+    usage: Optional[TokenUsage] = None
+    # Attempts, retries and hedging for the call, filled in by the scheduler
+    scheduling: Optional[Dict[str, Any]] = None
+
+
+# Streams yield text chunks and may finish with the call's TokenUsage
+StreamItem = Union[str, TokenUsage]
+
+
+class BackendError(Exception):
+    """Raised by a backend when a model call fails
+
+    `transient` marks failures worth retrying, such as a throttled or
+    overloaded provider, as opposed to configuration errors.
+    """
+
+    def __init__(self, message: str, transient: bool = False):
+        super().__init__(message)
+        self.transient = transient
+
+
+class ModelBackend:
+    """Interface every model backend implements"""
+    name = "base"
+
+    def generate(self, model: str, prompt: str, generation_config: Optional[Dict[str, Any]] = None) -> ModelResponse:
+        raise NotImplementedError
+
+    def stream(self, model: str, prompt: str, generation_config: Optional[Dict[str, Any]] = None) -> Iterator[StreamItem]:
+        """Yield response text chunks as they arrive, then the token usage if the provider reports it
+
+        Backends without native streaming yield the whole response as one chunk.
+        """
+        response = self.generate(model, prompt, generation_config)
+        yield response.text
+        if response.usage is not None:
+            yield response.usage
+
+
+class GeminiBackend(ModelBackend):
+    """Google Gemini models through google.generativeai"""
+    name = "gemini"
+
+    def __init__(self, api_key: str):
+        # Imported here so offline backends never pay for (or need) the SDK
+        import google.generativeai as genai
+        genai.configure(api_key=api_key)
+        self._genai = genai
+        self._models: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def _model(self, model: str):
+        with self._lock:
+            if model not in self._models:
+                self._models[model] = self._genai.GenerativeModel(model)
+            return self._models[model]
+
+    @staticmethod
+    def _config(generation_config: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Generation config for the SDK, with a response schema as Gemini's JSON mode constraint"""
+        config = dict(generation_config or {})
+        schema = config.pop(RESPONSE_SCHEMA_KEY, None)
+        if schema is not None:
+            config["response_mime_type"] = "application/json"
+            config["response_schema"] = to_gemini_schema(schema)
+        return config or None
+
+    def generate(self, model: str, prompt: str, generation_config: Optional[Dict[str, Any]] = None) -> ModelResponse:
+        response = self._model(model).generate_content(prompt, generation_config=self._config(generation_config))
+        return ModelResponse(response.text, model, usage=self._usage(response))
+
+    @staticmethod
+    def _usage(response) -> Optional[TokenUsage]:
+        metadata = getattr(response, "usage_metadata", None)
+        if not metadata or not getattr(metadata, "total_token_count", 0):
+            return None
+        return TokenUsage(metadata.prompt_token_count, metadata.candidates_token_count, metadata.total_token_count)
+
+    def stream(self, model: str, prompt: str, generation_config: Optional[Dict[str, Any]] = None) -> Iterator[StreamItem]:
+        response = self._model(model).generate_content(prompt, generation_config=self._config(generation_config),
+                                                       stream=True)
+        usage = None
+        for chunk in response:
+            # Chunks carrying only safety or finish metadata have no text parts
+            if chunk.parts:
+                yield chunk.text
+            # Usage on each chunk is cumulative, so the last one is the total
+            usage = self._usage(chunk) or usage
+        if usage is not None:
+            yield usage
+
+
+class ClaudeBackend(ModelBackend):
+    """Anthropic Claude models through the anthropic SDK
+
+    A response schema is enforced by forcing a call to a tool whose input
+    schema it is; the tool input is the response.
+    """
+    name = "claude"
+    RESPONSE_TOOL = "submit_response"
+
+    def __init__(self, api_key: Optional[str] = None, max_tokens: Optional[int] = None):
+        import anthropic
+        self._client = anthropic.Anthropic(api_key=api_key) if api_key else anthropic.Anthropic()
+        self.max_tokens = max_tokens or load_ai_config().get("claude", {}).get("maxTokens", 4096)
+
+    def _request(self, model: str, prompt: str, generation_config: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        config = dict(generation_config or {})
+        schema = config.pop(RESPONSE_SCHEMA_KEY, None)
+        if schema is not None:
+            config["tools"] = [{
+                "name": self.RESPONSE_TOOL,
+                "description": "Submit the response in the requested JSON format",
+                "input_schema": schema,
+            }]
+            config["tool_choice"] = {"type": "tool", "name": self.RESPONSE_TOOL}
+        return dict(
+            model=model,
+            max_tokens=config.pop("max_output_tokens", self.max_tokens),
+            messages=[{"role": "user", "content": prompt}],
+            **config,
+        )
+
+    def generate(self, model: str, prompt: str, generation_config: Optional[Dict[str, Any]] = None) -> ModelResponse:
+        message = self._client.messages.create(**self._request(model, prompt, generation_config))
+        tool_inputs = [block.input for block in message.content if getattr(block, "type", "") == "tool_use"]
+        if tool_inputs:
+            text = json.dumps(tool_inputs[0])
+        else:
+            text = "".join(block.text for block in message.content if getattr(block, "type", "") == "text")
+        return ModelResponse(text, model, usage=self._usage(message))
+
+    @staticmethod
+    def _usage(message) -> TokenUsage:
+        return TokenUsage(
+            message.usage.input_tokens, message.usage.output_tokens,
+            message.usage.input_tokens + message.usage.output_tokens
+        )
+
+    def stream(self, model: str, prompt: str, generation_config: Optional[Dict[str, Any]] = None) -> Iterator[StreamItem]:
+        if RESPONSE_SCHEMA_KEY in (generation_config or {}):
+            # text_stream carries no tool input, so a constrained call arrives as one chunk
+            yield from super().stream(model, prompt, generation_config)
+            return
+        with self._client.messages.stream(**self._request(model, prompt, generation_config)) as stream:
+            yield from stream.text_stream
+            yield self._usage(stream.get_final_message())
+
+
+class RoutingBackend(ModelBackend):
+    """Dispatch each call to a provider backend based on the model name prefix
+
+    Provider backends are built on first use, so a run that only touches
+    Gemini models never imports the Claude SDK and vice versa.
+    """
+    name = "routing"
+
+    def __init__(self, factories: Dict[str, Callable[[], ModelBackend]]):
+        self._factories = factories
+        self._backends: Dict[str, ModelBackend] = {}
+        self._lock = threading.Lock()
+
+    def _backend_for(self, model: str) -> ModelBackend:
+        provider = model.split("-", 1)[0]
+        with self._lock:
+            if provider not in self._backends:
+                if provider not in self._factories:
+                    raise BackendError(f"No backend configured for model '{model}'")
+                self._backends[provider] = self._factories[provider]()
+            return self._backends[provider]
+
+    def generate(self, model: str, prompt: str, generation_config: Optional[Dict[str, Any]] = None) -> ModelResponse:
+        return self._backend_for(model).generate(model, prompt, generation_config)
+
+    def stream(self, model: str, prompt: str, generation_config: Optional[Dict[str, Any]] = None) -> Iterator[StreamItem]:
+        return self._backend_for(model).stream(model, prompt, generation_config)
+
+
+class StubBackend(ModelBackend):
+    """Deterministic local stand-in for a model, for offline and load-testing runs
+
+    The reply is the JSON template the prompt asks for, so every downstream
+    stage (validation, scoring, reporting) sees realistic input. Like a
+    constrained model, it drops the ```json fence when given a response schema. Latency and
+    failures are drawn from an RNG seeded by the prompt and its call count,
+    so the same run always produces the same sequence of outcomes.
+    """
+    name = "stub"
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, failure_rate: float = 0.0, seed: int = 0,
+                 chunk_chars: int = 64, chunk_delay: float = 0.0):
+        if not 0.0 <= failure_rate <= 1.0:
+            raise ValueError("failure_rate must be between 0 and 1")
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.seed = seed
+        self.chunk_chars = max(1, chunk_chars)
+        self.chunk_delay = chunk_delay
+        self._calls: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _template_from_prompt(prompt: str) -> Dict[str, Any]:
+        """Pull the 'exact JSON format' example out of a prompt"""
+        return prompt_template(prompt) or {"response": "stub response"}
+
+    def _begin(self, model: str, prompt: str) -> random.Random:
+        """Apply the first-token latency and failure draw for one call"""
+        digest = hashlib.sha256(f"{model}\0{prompt}".encode("utf-8")).hexdigest()
+        with self._lock:
+            call_index = self._calls.get(digest, 0)
+            self._calls[digest] = call_index + 1
+        rng = random.Random(f"{self.seed}:{digest}:{call_index}")
+
+        delay = self.latency * (1 + rng.uniform(-self.jitter, self.jitter))
+        if delay > 0:
+            time.sleep(delay)
+        if rng.random() < self.failure_rate:
+            raise BackendError(f"Stub failure for model '{model}' (call {call_index})", transient=True)
+        return rng
+
+    def _body(self, prompt: str, generation_config: Optional[Dict[str, Any]] = None) -> str:
+        body = json.dumps(self._template_from_prompt(prompt), indent=2)
+        if RESPONSE_SCHEMA_KEY in (generation_config or {}):
+            return body
+        return f"```json\n{body}\n```"
+
+    def generate(self, model: str, prompt: str, generation_config: Optional[Dict[str, Any]] = None) -> ModelResponse:
+        self._begin(model, prompt)
+        body = self._body(prompt, generation_config)
+        return ModelResponse(body, model, usage=estimate_usage(prompt, body))
+
+    def stream(self, model: str, prompt: str, generation_config: Optional[Dict[str, Any]] = None) -> Iterator[StreamItem]:
+        self._begin(model, prompt)
+        body = self._body(prompt, generation_config)
+        for offset in range(0, len(body), self.chunk_chars):
+            if offset and self.chunk_delay > 0:
+                time.sleep(self.chunk_delay)
+            yield body[offset:offset + self.chunk_chars]
+        yield estimate_usage(prompt, body)
+
+
+def create_live_backend(gemini_api_key: str, anthropic_api_key: Optional[str] = None) -> RoutingBackend:
+    """Backend for real runs: Gemini and Claude models routed to their SDKs"""
+    return RoutingBackend({
+        "gemini": lambda: GeminiBackend(gemini_api_key),
+        "claude": lambda: ClaudeBackend(anthropic_api_key),
+    })
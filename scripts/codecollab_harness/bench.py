@@ -0,0 +1,354 @@
+import math
+import random
+import statistics
+from functools import lru_cache
+from typing import Dict, Any, Callable, List, Optional, Sequence, Tuple
+
+from .faults import PARSE
+
+BOOTSTRAP_RESAMPLES = 2000
+# Latency intervals narrower than this meet any adaptive target: timer noise, not model behaviour
+LATENCY_RESOLUTION = 0.01
+
+
+def percentile(values: Sequence[float], q: float) -> Optional[float]:
+    """Linear-interpolated percentile (q in 0-100), the same definition numpy uses by default"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100.0
+    lower = math.floor(position)
+    upper = math.ceil(position)
+    if lower == upper:
+        return ordered[lower]
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def bootstrap_ci(values: Sequence[float], statistic: Callable[[Sequence[float]], float] = statistics.fmean,
+                 confidence: float = 0.95, resamples: int = BOOTSTRAP_RESAMPLES,
+                 seed: int = 0) -> Tuple[Optional[float], Optional[float]]:
+    """Percentile bootstrap confidence interval for a statistic of one sample"""
+    if not values:
+        return None, None
+    if len(values) == 1:
+        return values[0], values[0]
+    rng = random.Random(seed)
+    n = len(values)
+    estimates = sorted(statistic([values[rng.randrange(n)] for _ in range(n)]) for _ in range(resamples))
+    tail = (1 - confidence) / 2 * 100
+    return percentile(estimates, tail), percentile(estimates, 100 - tail)
+
+
+def bootstrap_difference_ci(a: Sequence[float], b: Sequence[float],
+                            statistic: Callable[[Sequence[float]], float] = statistics.fmean,
+                            confidence: float = 0.95, resamples: int = BOOTSTRAP_RESAMPLES,
+                            seed: int = 0) -> Tuple[Optional[float], Optional[float]]:
+    """Percentile bootstrap confidence interval for statistic(b) - statistic(a)"""
+    if not a or not b:
+        return None, None
+    rng = random.Random(seed)
+    estimates = sorted(
+        statistic([b[rng.randrange(len(b))] for _ in b]) - statistic([a[rng.randrange(len(a))] for _ in a])
+        for _ in range(resamples)
+    )
+    tail = (1 - confidence) / 2 * 100
+    return percentile(estimates, tail), percentile(estimates, 100 - tail)
+
+
+def _spread(values: Sequence[float]) -> Dict[str, Optional[float]]:
+    return {
+        "mean": statistics.fmean(values) if values else None,
+        "stdev": statistics.stdev(values) if len(values) > 1 else 0.0,
+        "variance": statistics.variance(values) if len(values) > 1 else 0.0,
+        "min": min(values) if values else None,
+        "max": max(values) if values else None,
+    }
+
+
+def answered(result: Dict[str, Any]) -> bool:
+    """Whether the call returned a response, parseable or not; only those say anything about latency"""
+    error = result.get("error")
+    return error is None or error["kind"] == PARSE
+
+
+def summarize_trials(results: List[Dict[str, Any]], confidence: float = 0.95, seed: int = 0) -> Dict[str, Any]:
+    """Latency percentiles, spread and a bootstrap CI on quality for one test's trials
+
+    Latency covers the calls that returned a response: a timeout would
+    report the deadline, and a quota or transport error how fast it failed.
+    Those calls are counted in `errors` instead; quality covers every trial.
+    """
+    latencies = [r["response_time"] for r in results if answered(r)]
+    qualities = [r["evaluation"]["quality_score"] for r in results]
+    first_tokens = [
+        r["stream_metrics"]["time_to_first_token"] for r in results
+        if (r.get("stream_metrics") or {}).get("time_to_first_token") is not None
+    ]
+    quality_low, quality_high = bootstrap_ci(qualities, confidence=confidence, seed=seed)
+
+    summary = {
+        "agent": results[0]["agent"],
+        "test": results[0]["test"],
+        "model": results[0].get("model"),
+        "scenario": results[0].get("scenario"),
+        "temperature": results[0].get("temperature"),
+        "variant": results[0].get("variant"),
+        "quality_bar": results[0].get("quality_bar"),
+        "trials": len(results),
+        "success_rate": 100.0 * sum(1 for r in results if r["success"]) / len(results),
+        "errors": len(results) - len(latencies),
+        "latency": {
+            **_spread(latencies),
+            "p50": percentile(latencies, 50),
+            "p90": percentile(latencies, 90),
+            "p99": percentile(latencies, 99),
+        },
+        "quality": {**_spread(qualities), "ci_low": quality_low, "ci_high": quality_high, "confidence": confidence},
+        # Raw samples so two benchmark files can be compared later
+        "samples": {"response_time": latencies, "quality_score": qualities},
+    }
+    if first_tokens:
+        summary["time_to_first_token"] = {
+            "p50": percentile(first_tokens, 50),
+            "p90": percentile(first_tokens, 90),
+            "p99": percentile(first_tokens, 99),
+        }
+    return summary
+
+
+# Up to this many degrees of freedom t_quantile inverts the exact distribution function
+EXACT_T_DF = 30
+
+
+def _t_confidence(t: float, df: int) -> float:
+    """P(|T| < t) for Student's t with integer df, from its closed form as a finite trigonometric series"""
+    theta = math.atan(t / math.sqrt(df))
+    cos2 = math.cos(theta) ** 2
+    if df % 2:
+        term, total = math.cos(theta), 0.0
+        for k in range(1, (df - 1) // 2 + 1):
+            total += term
+            term *= cos2 * 2 * k / (2 * k + 1)
+        return 2 / math.pi * (theta + math.sin(theta) * total)
+    term, total = 1.0, 0.0
+    for k in range(1, df // 2 + 1):
+        total += term
+        term *= cos2 * (2 * k - 1) / (2 * k)
+    return math.sin(theta) * total
+
+
+@lru_cache(maxsize=1024)
+def t_quantile(confidence: float, df: int) -> float:
+    """Two-sided Student t critical value, with no SciPy
+
+    Up to EXACT_T_DF degrees of freedom, where the adaptive sampler spends
+    most of its decisions, the exact distribution function is inverted by
+    bisection. Above that the Cornish-Fisher expansion of the normal value
+    is within 0.01% of it.
+    """
+    if df <= EXACT_T_DF:
+        low, high = 0.0, 1.0
+        while _t_confidence(high, df) < confidence:
+            low, high = high, high * 2
+        for _ in range(100):
+            middle = (low + high) / 2
+            if _t_confidence(middle, df) < confidence:
+                low = middle
+            else:
+                high = middle
+        return (low + high) / 2
+    z = statistics.NormalDist().inv_cdf((1 + confidence) / 2)
+    terms = (
+        (z ** 3 + z) / 4,
+        (5 * z ** 5 + 16 * z ** 3 + 3 * z) / 96,
+        (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / 384,
+        (79 * z ** 9 + 776 * z ** 7 + 1482 * z ** 5 - 1920 * z ** 3 - 945 * z) / 92160,
+    )
+    return z + sum(term / df ** power for power, term in enumerate(terms, 1))
+
+
+def mean_half_width(values: Sequence[float], confidence: float = 0.95) -> Optional[float]:
+    """Half-width of the t confidence interval on the mean; None with fewer than two values"""
+    if len(values) < 2:
+        return None
+    return t_quantile(confidence, len(values) - 1) * statistics.stdev(values) / math.sqrt(len(values))
+
+
+class AdaptiveSampler:
+    """Sequential stopping and allocation of trials across tests
+
+    A test stops once it has `min_trials` and the confidence intervals on
+    its mean quality_score and mean latency are within their targets:
+    `quality_precision` points and `latency_precision` as a fraction of the
+    mean latency, or LATENCY_RESOLUTION (a fixed-width sequential interval).
+    It also stops when it reaches `max_trials`, its call budget.
+
+    Each free call goes to the test furthest from its target. Calls still in
+    flight count toward that by assuming the interval narrows by √n. Tests
+    below `min_trials` come first, fewest samples first. A noisy test keeps
+    drawing calls, and a stable one stops at `min_trials`.
+    """
+
+    def __init__(self, tests: Sequence[str], min_trials: int = 5, max_trials: int = 30,
+                 quality_precision: float = 2.5, latency_precision: float = 0.1, confidence: float = 0.95):
+        if not 2 <= min_trials <= max_trials:
+            raise ValueError(f"min_trials ({min_trials}) must be between 2 and the per-test budget ({max_trials})")
+        if quality_precision <= 0 or latency_precision <= 0:
+            raise ValueError("precision targets must be positive")
+        self.min_trials = min_trials
+        self.max_trials = max_trials
+        self.quality_precision = quality_precision
+        self.latency_precision = latency_precision
+        self.confidence = confidence
+        self._order = list(tests)
+        self._qualities: Dict[str, List[float]] = {test: [] for test in tests}
+        self._latencies: Dict[str, List[float]] = {test: [] for test in tests}
+        self._in_flight: Dict[str, int] = {test: 0 for test in tests}
+
+    def widths(self, test: str) -> Tuple[Optional[float], Optional[float]]:
+        """Interval half-widths on mean quality (points) and mean latency (seconds)"""
+        return (mean_half_width(self._qualities[test], self.confidence),
+                mean_half_width(self._latencies[test], self.confidence))
+
+    def _excess(self, test: str) -> float:
+        """How many times wider than its target the test's widest interval is"""
+        quality, latency = self.widths(test)
+        if quality is None or latency is None:
+            return math.inf
+        latency_target = max(self.latency_precision * statistics.fmean(self._latencies[test]), LATENCY_RESOLUTION)
+        return max(quality / self.quality_precision, latency / latency_target)
+
+    def converged(self, test: str) -> bool:
+        return len(self._qualities[test]) >= self.min_trials and self._excess(test) <= 1
+
+    def done(self, test: str) -> bool:
+        return self.converged(test) or len(self._qualities[test]) >= self.max_trials
+
+    def next_test(self) -> Optional[str]:
+        """Claim a call for the test that needs one most; None when no test does right now"""
+        best, best_priority = None, None
+        for test in self._order:
+            n, in_flight = len(self._qualities[test]), self._in_flight[test]
+            if self.done(test) or n + in_flight >= self.max_trials:
+                continue
+            if n + in_flight < self.min_trials:
+                priority = (1, -(n + in_flight))
+            else:
+                excess = self._excess(test)
+                if math.isinf(excess):
+                    # Too few results to judge yet (and sqrt(0) would make it NaN):
+                    # top priority, shared evenly with other such tests
+                    priority = (0, math.inf, -(n + in_flight))
+                else:
+                    projected = excess * math.sqrt(n / (n + in_flight))
+                    if projected <= 1:
+                        continue
+                    priority = (0, projected, -(n + in_flight))
+            if best_priority is None or priority > best_priority:
+                best, best_priority = test, priority
+        if best is not None:
+            self._in_flight[best] += 1
+        return best
+
+    def add(self, test: str, quality: float, latency: Optional[float]) -> None:
+        """Record a finished call; latency is None for a call that returned no response"""
+        self._in_flight[test] -= 1
+        self._qualities[test].append(quality)
+        if latency is not None:
+            self._latencies[test].append(latency)
+
+    def status(self, test: str) -> Dict[str, Any]:
+        quality, latency = self.widths(test)
+        return {
+            "converged": self.converged(test),
+            "stop_reason": "precision" if self.converged(test) else "budget",
+            "quality_half_width": quality,
+            "latency_half_width": latency,
+        }
+
+
+def _verdict(low: Optional[float], high: Optional[float], lower_is_better: bool) -> str:
+    if low is None or high is None:
+        return "n/a"
+    if low <= 0 <= high:
+        return "no significant change"
+    improved = high < 0 if lower_is_better else low > 0
+    return "better" if improved else "worse"
+
+
+def compare_benchmarks(baseline: Dict[str, Any], candidate: Dict[str, Any],
+                       confidence: float = 0.95, seed: int = 0) -> List[Dict[str, Any]]:
+    """A/B comparison of two benchmark reports, per test present in both
+
+    Latency is compared on the median and quality on the mean. A change is
+    significant when the bootstrap confidence interval of the difference
+    (candidate - baseline) excludes zero.
+    """
+    baseline_tests = {(t["agent"], t["test"]): t for t in baseline["tests"]}
+    rows = []
+    for test in candidate["tests"]:
+        before = baseline_tests.get((test["agent"], test["test"]))
+        if before is None:
+            continue
+        a_latency, b_latency = before["samples"]["response_time"], test["samples"]["response_time"]
+        a_quality, b_quality = before["samples"]["quality_score"], test["samples"]["quality_score"]
+        latency_ci = bootstrap_difference_ci(a_latency, b_latency, statistics.median, confidence, seed=seed)
+        quality_ci = bootstrap_difference_ci(a_quality, b_quality, statistics.fmean, confidence, seed=seed)
+        rows.append({
+            "agent": test["agent"],
+            "test": test["test"],
+            "latency_p50": (percentile(a_latency, 50), percentile(b_latency, 50)),
+            "latency_delta_ci": latency_ci,
+            "latency_verdict": _verdict(*latency_ci, lower_is_better=True),
+            "quality_mean": (statistics.fmean(a_quality), statistics.fmean(b_quality)),
+            "quality_delta_ci": quality_ci,
+            "quality_verdict": _verdict(*quality_ci, lower_is_better=False),
+        })
+    return rows
+
+
+def _ci(low: Optional[float], high: Optional[float], precision: int = 2) -> str:
+    if low is None or high is None:
+        return "-"
+    return f"[{low:+.{precision}f}, {high:+.{precision}f}]"
+
+
+def _seconds(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:.2f}s"
+
+
+def format_benchmark_table(report: Dict[str, Any]) -> str:
+    lines = [
+        f"{'test':<44} {'n':>3} {'p50':>7} {'p90':>7} {'p99':>7} {'stdev':>7} {'quality':>8} {'CI':>16} {'ok%':>5} {'err':>4}",
+        "-" * 117,
+    ]
+    for test in report["tests"]:
+        latency, quality = test["latency"], test["quality"]
+        ci = f"[{quality['ci_low']:.1f}, {quality['ci_high']:.1f}]"
+        lines.append(
+            f"{test['test']:<44} {test['trials']:>3} {_seconds(latency['p50']):>7} {_seconds(latency['p90']):>7} "
+            f"{_seconds(latency['p99']):>7} {latency['stdev']:>6.2f}s {quality['mean']:>8.1f} {ci:>16} "
+            f"{test['success_rate']:>5.0f} {test.get('errors', 0):>4}"
+        )
+    lines.append("\nLatency covers calls that returned a response; err counts timeouts and failed calls")
+    lines.append(
+        f"\nThroughput: {report['throughput_rps']:.2f} calls/s "
+        f"({report['total_calls']} calls in {report['wall_time']:.2f}s, concurrency {report['concurrency']})"
+    )
+    return "\n".join(lines)
+
+
+def format_comparison_table(rows: List[Dict[str, Any]]) -> str:
+    lines = [
+        f"{'test':<44} {'p50 A→B':>16} {'Δ CI':>18} {'latency':>22} {'quality A→B':>14} {'Δ CI':>16} {'quality':>22}",
+        "-" * 160,
+    ]
+    for row in rows:
+        (a_p50, b_p50), (a_q, b_q) = row["latency_p50"], row["quality_mean"]
+        p50 = f"{_seconds(a_p50)}→{_seconds(b_p50)}"
+        lines.append(
+            f"{row['test']:<44} {p50:>16} {_ci(*row['latency_delta_ci']):>18} "
+            f"{row['latency_verdict']:>22} {f'{a_q:.1f}→{b_q:.1f}':>14} {_ci(*row['quality_delta_ci'], 1):>16} "
+            f"{row['quality_verdict']:>22}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,174 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from typing import Dict, Any, Callable, NamedTuple, Optional
+
+from .options import CACHE_MODES, PASSTHROUGH, RECORD, REPLAY
+from .usage import TokenUsage
+
+CACHE_FORMAT_VERSION = 1
+
+
+class CacheMiss(LookupError):
+    """Raised in replay mode when a prompt has no recorded response"""
+
+
+class CachedResponse(NamedTuple):
+    """A response served from the cache, with the same fields the tester reads from live responses"""
+    text: str
+    cached: bool = True
+    stream_metrics: Optional[Dict[str, Any]] = None
+    aborted: bool = False
+    parsed_json: Optional[Dict[str, Any]] = None
+    usage: Optional[TokenUsage] = None
+
+
+class ResponseCache:
+    """On-disk, content-addressed cache of model responses
+
+    Entries are keyed by a SHA-256 of the model name, prompt and generation
+    config and stored one file per entry under `directory`. Modes:
+
+    - record: serve hits from disk, call the model on a miss and store the result
+    - replay: serve hits from disk only and raise CacheMiss otherwise (fully offline)
+    - passthrough: always call the model, never read or write the cache
+
+    `max_age_seconds` expires entries by when they were recorded (mtime).
+    `max_size_bytes` evicts the least recently used first: every hit sets
+    the entry's access time, whatever the file system's atime policy.
+    """
+
+    def __init__(self, directory: str, mode: str = RECORD,
+                 max_age_seconds: Optional[float] = None,
+                 max_size_bytes: Optional[int] = None):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown cache mode '{mode}', expected one of {', '.join(CACHE_MODES)}")
+        self.directory = directory
+        self.mode = mode
+        self.max_age_seconds = max_age_seconds
+        self.max_size_bytes = max_size_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(model: str, prompt: str, generation_config: Optional[Dict[str, Any]] = None) -> str:
+        """Hash everything that can change the model output into a stable key"""
+        material = json.dumps({
+            "version": CACHE_FORMAT_VERSION,
+            "model": model,
+            "prompt": prompt,
+            "generation_config": generation_config or {},
+        }, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the stored entry for key, or None when missing, expired or unreadable"""
+        path = self._path(key)
+        try:
+            stat = os.stat(path)
+            if self.max_age_seconds is not None and time.time() - stat.st_mtime > self.max_age_seconds:
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        try:
+            # Mark it used for prune(); the mtime keeps the recording time
+            os.utime(path, ns=(time.time_ns(), stat.st_mtime_ns))
+        except OSError:
+            pass
+        return entry
+
+    def put(self, key: str, entry: Dict[str, Any]) -> None:
+        """Atomically write an entry so concurrent readers never see a partial file"""
+        path = self._path(key)
+        import tempfile
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def get_or_generate(self, model: str, prompt: str, generation_config: Optional[Dict[str, Any]],
+                        generate: Callable[[], Any]) -> Any:
+        """Look up a response, falling back to `generate` according to the cache mode
+
+        `generate` returns any response object with a `.text` attribute; it is
+        returned as-is on a miss, while hits come back as CachedResponse.
+        """
+        if self.mode == PASSTHROUGH:
+            return generate()
+
+        key = self.make_key(model, prompt, generation_config)
+        entry = self.get(key)
+        if entry is not None:
+            with self._lock:
+                self.hits += 1
+            usage = entry.get("usage")
+            return CachedResponse(entry["text"], usage=TokenUsage(**usage) if usage else None)
+
+        with self._lock:
+            self.misses += 1
+        if self.mode == REPLAY:
+            raise CacheMiss(f"No recorded response for model '{model}' (key {key[:12]}) in {self.directory}")
+
+        response = generate()
+        # A stream cut short on purpose is not the model's real answer
+        if not getattr(response, "aborted", False):
+            self.put(key, {
+                "key": key,
+                "model": model,
+                "generation_config": generation_config or {},
+                "created_at": time.time(),
+                "text": response.text,
+                "usage": response.usage._asdict() if getattr(response, "usage", None) else None,
+            })
+        return response
+
+    def prune(self) -> int:
+        """Evict expired entries, then the least recently used until the cache fits in max_size_bytes"""
+        if not os.path.isdir(self.directory):
+            return 0
+
+        now = time.time()
+        entries = []
+        removed = 0
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if self.max_age_seconds is not None and now - stat.st_mtime > self.max_age_seconds:
+                    os.unlink(path)
+                    removed += 1
+                else:
+                    entries.append((stat.st_atime, stat.st_size, path))
+
+        if self.max_size_bytes is not None:
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_size_bytes:
+                    break
+                os.unlink(path)
+                total -= size
+                removed += 1
+
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        return {"mode": self.mode, "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,36 @@
+// Syntax check for the TypeScript/JavaScript artifacts of agent responses,
+// run by codecollab_harness/artifacts.py with the app's own typescript package.
+// usage: node check_typescript.js path/to/node_modules/typescript
+// stdin: [{"kind": "tsx", "text": "..."}, ...]
+// stdout: {"checker": "typescript 5.3.3", "errors": [["3:14 ';' expected."], [], ...]}
+
+// Errors reported per artifact; the first few say enough to see what broke
+const MAX_ERRORS = 5;
+
+const ts = require(process.argv[2]);
+
+function check({ kind, text }) {
+  const { diagnostics } = ts.transpileModule(text, {
+    fileName: `artifact.${kind}`,
+    reportDiagnostics: true,
+    compilerOptions: { jsx: ts.JsxEmit.Preserve, target: ts.ScriptTarget.ESNext },
+  });
+  return diagnostics.slice(0, MAX_ERRORS).map((diagnostic) => {
+    const message = ts.flattenDiagnosticMessageText(diagnostic.messageText, " ");
+    if (diagnostic.file === undefined || diagnostic.start === undefined) {
+      return message;
+    }
+    const { line, character } = diagnostic.file.getLineAndCharacterOfPosition(diagnostic.start);
+    return `${line + 1}:${character + 1} ${message}`;
+  });
+}
+
+let input = "";
+process.stdin.setEncoding("utf8");
+process.stdin.on("data", (chunk) => {
+  input += chunk;
+});
+process.stdin.on("end", () => {
+  const errors = JSON.parse(input).map(check);
+  process.stdout.write(JSON.stringify({ checker: `typescript ${ts.version}`, errors }));
+});
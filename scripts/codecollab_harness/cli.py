@@ -0,0 +1,857 @@
+import os
+import sys
+import json
+import math
+import time
+import argparse
+from typing import TYPE_CHECKING, Callable, Dict, Any, List, Optional, Tuple
+
+from .options import (ARRIVALS, CACHE_MODES, COMPRESSIONS, DEFAULT_MEMO_DIR, JSONL_SUFFIXES, METRICS_FORMATS, PASSTHROUGH,
+                      PROMETHEUS, REPLAY, SPEC_DIR, TREND_PERIODS, parse_shard, parse_temperature)
+
+
+if TYPE_CHECKING:
+    from .profiling import Profiler
+    from .matrix import MatrixAxes
+    from .tester import CodeCollabAITester
+    from .workflow import Workflow
+
+# Each subcommand imports what it needs when it runs, so the offline ones
+# (rescore, golden, report, diff, load, collab) never load the model-calling machinery,
+# and building the parser needs nothing beyond options.py
+
+# Environment variable holding the Gemini API key (as scripts/run-ai-tests.sh expects)
+API_KEY_ENV = "GEMINI_API_KEY"
+
+# The feature the ai-coordinator test plans, used as workflow input by default
+WORKFLOW_INPUT = ("Implement a new feature for CodeCollab AI: live code execution with shared output display, "
+                  "so multiple users can run code collaboratively and see results in real time.")
+
+
+def _save_profile(profiler: "Profiler") -> None:
+    """Write the run's Chrome trace and flat text profile next to its results"""
+    stem = f'codecollab_ai_profile_{time.strftime("%Y%m%d_%H%M%S")}'
+    profiler.write_chrome_trace(f"{stem}.trace.json")
+    profiler.write_flat_profile(f"{stem}.txt")
+    profiler.close()
+    print(f"\n🔬 Harness profile:\n{profiler.flat_profile()}")
+    print(f"\n💾 Trace saved to '{stem}.trace.json' (open in ui.perfetto.dev or chrome://tracing), "
+          f"flat profile to '{stem}.txt'")
+
+
+def _export_metrics(args: argparse.Namespace, summary: Dict[str, Any]) -> None:
+    """Fold a suite summary into the metrics file and report any sliding-window regression alerts"""
+    from .metrics import MetricsExporter, format_alerts
+    exporter = MetricsExporter(
+        state_path=args.metrics_state or f"{args.metrics_file}.state.json",
+        window=args.alert_window,
+        latency_threshold=args.alert_latency_increase,
+        quality_threshold=args.alert_quality_drop,
+    )
+    alerts = exporter.record_run(summary)
+    exporter.write(args.metrics_file, args.metrics_format)
+    print(f"\n📡 Metrics ({args.metrics_format}) written to '{args.metrics_file}'")
+    if alerts:
+        print(f"🚨 {len(alerts)} regression alerts over the last {args.alert_window} runs:")
+        print(format_alerts(alerts))
+
+
+def _record_history(store_path: str, results_file: str) -> None:
+    """Add a results file to the history store"""
+    from .history import ResultsStore
+    with ResultsStore(store_path) as store:
+        store.import_file(results_file)
+        stats = store.stats()
+    saved = 1 - stats["stored_bytes"] / stats["referenced_bytes"] if stats["referenced_bytes"] else 0.0
+    print(f"🗃️  Recorded in history '{store_path}': {stats['runs']} runs, {stats['calls']} calls, "
+          f"{stats['stored_bytes'] / 1024:.1f} KiB of prompts and responses ({saved:.0%} saved by dedup and compression)")
+
+
+def _csv(value: str) -> List[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def _shard(spec: str) -> Tuple[int, int]:
+    """argparse type for i/N"""
+    try:
+        return parse_shard(spec)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e)) from None
+
+
+def _rate_limit(spec: str) -> Tuple[str, float]:
+    """argparse type for MODEL=RPM"""
+    model, sep, rpm = spec.rpartition("=")
+    try:
+        if not sep or not model or float(rpm) <= 0:
+            raise ValueError
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected MODEL=RPM with a positive RPM, got '{spec}'") from None
+    return model, float(rpm)
+
+
+def _positive(cast: Callable[[str], Any]) -> Callable[[str], Any]:
+    """argparse type for a positive, finite int or float"""
+    def parse(value: str) -> Any:
+        try:
+            number = cast(value)
+            if not 0 < number < math.inf:
+                raise ValueError
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"expected a positive number, got '{value}'") from None
+        return number
+    return parse
+
+
+def _levels(cast: Callable[[str], Any]) -> Callable[[str], List[Any]]:
+    """argparse type for a comma-separated list of positive load levels"""
+    def parse(value: str) -> List[Any]:
+        levels = [_positive(cast)(item) for item in _csv(value)]
+        if not levels:
+            raise argparse.ArgumentTypeError("expected at least one level")
+        return levels
+    return parse
+
+
+def _suite_options() -> argparse.ArgumentParser:
+    """Options shared by the subcommands that call models (run, bench, workflow)"""
+    options = argparse.ArgumentParser(add_help=False)
+    options.add_argument(
+        "--concurrency", type=int, default=1,
+        help="maximum number of agent tests with a model call in flight (default: 1, sequential)"
+    )
+    options.add_argument(
+        "--cache-mode", choices=CACHE_MODES, default=PASSTHROUGH,
+        help="record: reuse and store responses, replay: recorded responses only (offline), "
+             "passthrough: no caching (default)"
+    )
+    options.add_argument("--cache-dir", default=".codecollab_cache", help="response cache directory")
+    options.add_argument("--cache-max-age-days", type=float, help="evict cached responses older than this")
+    options.add_argument("--cache-max-size-mb", type=float,
+                         help="evict least recently used cached responses above this size")
+    options.add_argument(
+        "--backend", choices=("live", "stub"), default="live",
+        help="live: Gemini/Claude APIs (default, key from GEMINI_API_KEY), stub: deterministic local stand-in, no network"
+    )
+    options.add_argument(
+        "--route-by-agent", action="store_true",
+        help="run each agent on the model and temperature from AI_AGENTS in lib/ai/config.ts"
+    )
+    _matrix_options(options)
+    options.add_argument("--stub-latency", type=float, default=0.0, help="stub backend latency per call in seconds")
+    options.add_argument("--stub-jitter", type=float, default=0.0, help="stub latency jitter as a fraction of --stub-latency")
+    options.add_argument("--stub-failure-rate", type=float, default=0.0, help="fraction of stub calls that fail")
+    options.add_argument("--stub-seed", type=int, default=0, help="seed for stub latency and failures")
+    options.add_argument("--stub-chunk-delay", type=float, default=0.0, help="stub delay between streamed chunks in seconds")
+    options.add_argument(
+        "--stream", action="store_true",
+        help="stream responses and score on time to first token and tokens/sec instead of total time"
+    )
+    options.add_argument(
+        "--abort-invalid-streams", action="store_true",
+        help="with --stream, stop reading a response as soon as its JSON is structurally broken"
+    )
+    options.add_argument(
+        "--structured", action="store_true",
+        help="send each test's response schema to the model as a structured-output constraint "
+             "(Gemini JSON mode, Claude forced tool call)"
+    )
+    options.add_argument(
+        "--pricing", metavar="FILE",
+        help='JSON file of {"model": [usd_per_million_input, usd_per_million_output]} overriding built-in prices'
+    )
+    options.add_argument(
+        "--rate-limit", action="append", type=_rate_limit, default=[], metavar="MODEL=RPM",
+        help="token-bucket budget of calls per minute for a model (repeatable), e.g. gemini-2.0-flash-exp=10"
+    )
+    options.add_argument("--max-attempts", type=int, default=3, help="attempts per model call on transient errors")
+    options.add_argument("--retry-base-delay", type=float, default=1.0, help="base of the jittered exponential backoff")
+    options.add_argument("--call-timeout", type=float, help="seconds before a model call is cancelled and retried")
+    options.add_argument("--test-timeout", type=float, help="seconds each test may take, retries included")
+    options.add_argument(
+        "--hedge", action="store_true",
+        help="send a duplicate request when a call runs past the observed p95 latency of its model"
+    )
+    options.add_argument(
+        "--artifact-workers", type=int,
+        help="processes checking generated code and config (default: one per CPU; 0 checks in the test's thread)"
+    )
+    options.add_argument(
+        "--artifact-memo", default=DEFAULT_MEMO_DIR, metavar="DIR",
+        help="directory of artifact check verdicts, memoized by content hash"
+    )
+    options.add_argument(
+        "--profile", action="store_true",
+        help="record per-phase spans and write a Chrome trace / Perfetto JSON file and a flat text profile"
+    )
+    options.add_argument(
+        "--profile-memory", action="store_true",
+        help="like --profile, plus tracemalloc peak memory per test (slower)"
+    )
+    return options
+
+
+def _matrix_options(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--specs", default=SPEC_DIR, metavar="DIR", help="directory of test scenario spec files")
+    parser.add_argument(
+        "--agents", type=_csv,
+        help="comma-separated agent IDs to run every scenario with, or 'all' for every agent in AI_AGENTS"
+    )
+    parser.add_argument("--models", type=_csv, help="comma-separated models to run every scenario on")
+    parser.add_argument(
+        "--temperatures", type=lambda value: [parse_temperature(t) for t in _csv(value)],
+        help="comma-separated temperatures to run every scenario at ('default' for the provider default)"
+    )
+    parser.add_argument("--variants", type=_csv, help="comma-separated prompt variants, e.g. default,concise")
+
+
+def _metrics_options(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--metrics-file", metavar="FILE",
+        help="write latency histograms, token/error counters and quality gauges for a Prometheus textfile collector"
+    )
+    parser.add_argument("--metrics-format", choices=METRICS_FORMATS, default=PROMETHEUS, help="metrics exposition format")
+    parser.add_argument(
+        "--metrics-state", metavar="FILE",
+        help="where cumulative counters and alert history persist between runs (default: FILE.state.json)"
+    )
+    parser.add_argument(
+        "--alert-window", type=int, default=5,
+        help="runs per sliding window; alerts compare the last N runs of a test with the N before them"
+    )
+    parser.add_argument(
+        "--alert-latency-increase", type=float, default=0.25,
+        help="fractional p90 latency increase between windows that raises an alert"
+    )
+    parser.add_argument(
+        "--alert-quality-drop", type=float, default=5.0,
+        help="drop in mean quality points between windows that raises an alert"
+    )
+    parser.add_argument(
+        "--history", metavar="DB",
+        help="SQLite results history: record the results in it (prompts and responses deduplicated and compressed)"
+    )
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="CodeCollab AI Agent Test Suite",
+        epilog="Without a command, 'run' is assumed: test-codecollab-agents.py --concurrency 8",
+    )
+    commands = parser.add_subparsers(dest="command", metavar="COMMAND")
+    suite = _suite_options()
+    
+    run = commands.add_parser("run", parents=[suite], help="run the agent test suite (default)")
+    run.add_argument(
+        "--suite-deadline", type=float,
+        help="seconds the whole run may take; unfinished tests are cancelled or skipped and results are partial"
+    )
+    run.add_argument(
+        "--output-format", choices=("jsonl", "json"), default="jsonl",
+        help="jsonl: stream one record per test as it finishes (default), json: single file at the end"
+    )
+    run.add_argument(
+        "--compress", choices=COMPRESSIONS, default="none",
+        help="compression for --output-format jsonl (zstd needs the zstandard package)"
+    )
+    run.add_argument(
+        "--shard", type=_shard, metavar="i/N",
+        help="run only the tests assigned to shard i of N (stable hash assignment, 1-based)"
+    )
+    run.add_argument(
+        "--checkpoint", metavar="FILE",
+        help="JSONL results file to write; if it exists, tests already completed in it are skipped"
+    )
+    _metrics_options(run)
+    
+    bench = commands.add_parser("bench", parents=[suite], help="run every test N times and report latency/quality statistics")
+    bench.add_argument("trials", type=int, metavar="N", help="measured runs per test (with --adaptive, the most per test)")
+    bench.add_argument("--warmup", type=int, default=1, help="discarded warmup rounds per test")
+    bench.add_argument("--confidence", type=float, default=0.95, help="confidence level for intervals")
+    bench.add_argument(
+        "--adaptive", action="store_true",
+        help="stop sampling each test once its quality and latency intervals meet the targets, "
+             "giving spare calls to the noisiest tests"
+    )
+    bench.add_argument("--min-trials", type=int, default=5, help="with --adaptive, trials before a test can stop")
+    bench.add_argument(
+        "--quality-precision", type=float, default=2.5,
+        help="with --adaptive, target half-width of the mean quality interval in points"
+    )
+    bench.add_argument(
+        "--latency-precision", type=float, default=0.1,
+        help="with --adaptive, target half-width of the mean latency interval as a fraction of the mean"
+    )
+    
+    rescore = commands.add_parser("rescore", help="re-score archived results files with the current scoring")
+    rescore.add_argument("directory", metavar="DIR", help="directory of codecollab_ai_test_results_* files")
+    rescore.add_argument("--workers", type=int, help="worker processes (default: CPU count)")
+    rescore.add_argument(
+        "--regression-threshold", type=float, default=5.0,
+        help="quality points a test's latest run must drop below its earlier runs to count as a regression"
+    )
+    
+    golden = commands.add_parser(
+        "golden", help="store passing responses from results files as golden answers for similarity scoring"
+    )
+    golden.add_argument("files", nargs="+", metavar="FILE", help="results files (.json or .jsonl[.gz|.zst])")
+    golden.add_argument("--tests", type=_csv, help="comma-separated scenarios to take answers for (default: all)")
+    golden.add_argument("--min-quality", type=float, default=0.0,
+                        help="only take responses whose stored quality score is at least this")
+    golden.add_argument("--max-references", type=int, default=5,
+                        help="newest golden answers kept per scenario")
+    golden.add_argument("--specs", default=SPEC_DIR, metavar="DIR",
+                        help="spec directory whose golden/ directory receives the answers")
+    
+    report = commands.add_parser(
+        "report", help="summarise results without calling models: merge shard outputs, export metrics, show history trends"
+    )
+    report.add_argument(
+        "files", nargs="*", metavar="FILE",
+        help="JSONL outputs of one run, or of every shard of a sharded run, to combine into one summary"
+    )
+    _matrix_options(report)
+    report.add_argument(
+        "--route-by-agent", action="store_true", help="order and default cells as the run did with --route-by-agent"
+    )
+    _metrics_options(report)
+    report.add_argument("--import", dest="history_import", metavar="DIR",
+                        help="record the archived results files in DIR into --history")
+    report.add_argument(
+        "--trend", choices=TREND_PERIODS,
+        help="latency/quality/cost trends per agent from --history (filtered by --agents/--models)"
+    )
+    report.add_argument("--trend-days", type=float, help="with --trend, only the last N days")
+    
+    # Its own copy of the suite options: set_defaults below would otherwise change the shared actions' defaults
+    workflow = commands.add_parser(
+        "workflow", parents=[_suite_options()],
+        help="run a multi-agent protocol or coordinator plan as a dependency graph and report its critical path"
+    )
+    source = workflow.add_mutually_exclusive_group()
+    source.add_argument(
+        "--protocol", action="append", metavar="NAME",
+        help="A2A protocol from lib/ai/a2a/protocols.ts to run (repeatable; default: all of them)"
+    )
+    source.add_argument("--plan", action="store_true",
+                        help="run the ai-coordinator test first and execute its project_breakdown")
+    source.add_argument("--breakdown", metavar="FILE",
+                        help="execute the project_breakdown of the ai-coordinator response in a saved results file")
+    workflow.add_argument("--input", default=WORKFLOW_INPUT, help="input every step works on")
+    # Steps always run on their own agent, and as many at once as the graph allows unless --concurrency caps it
+    workflow.set_defaults(route_by_agent=True, concurrency=None)
+    
+    load = commands.add_parser(
+        "load", help="load-test the app's /api/ai routes with the scenario prompts and find their saturation point"
+    )
+    load.add_argument("--url", default="http://localhost:3000", help="base URL of a running CodeCollab app")
+    load.add_argument(
+        "--routes", type=_csv, default=["ai"],
+        help="comma-separated routes to drive: ai (POST /api/ai), collaborate (POST /api/ai/collaborate)"
+    )
+    levels = load.add_mutually_exclusive_group(required=True)
+    levels.add_argument("--rate", type=_levels(float), metavar="RPS[,RPS...]",
+                        help="open loop: fixed arrival rates to step through, requests per second")
+    levels.add_argument("--users", type=_levels(int), metavar="N[,N...]",
+                        help="closed loop: virtual user counts to step through")
+    load.add_argument("--duration", type=float, default=30.0, help="measured seconds per step")
+    load.add_argument("--warmup", type=float, default=5.0, help="unmeasured seconds at the start of each step")
+    load.add_argument("--arrivals", choices=ARRIVALS, default="uniform", help="open-loop inter-arrival times")
+    load.add_argument("--think-time", type=float, default=0.0, help="closed loop: mean pause between a user's requests")
+    load.add_argument("--connections", type=_positive(int), default=64,
+                      help="open loop: keep-alive connections, the most requests in flight at once")
+    load.add_argument("--timeout", type=float, default=60.0, help="seconds before a request counts as timed out")
+    load.add_argument("--seed", type=int, default=0, help="seed for Poisson arrivals and think times")
+    load.add_argument("--specs", default=SPEC_DIR, metavar="DIR", help="directory of test scenario spec files")
+    
+    collab = commands.add_parser(
+        "collab", help="simulate many editors sharing projects over y-websocket and measure propagation and convergence"
+    )
+    target = collab.add_mutually_exclusive_group()
+    target.add_argument("--url", help="ws:// URL of a running stand-in server (default: start one in-process)")
+    target.add_argument("--serve", action="store_true",
+                        help="only run the stand-in y-websocket server on --port, for clients in another process")
+    collab.add_argument("--port", type=int, default=1234, help="--serve: port to listen on (the app's default)")
+    collab.add_argument("--clients", type=int, default=200, help="synthetic clients")
+    collab.add_argument("--rooms", type=int, default=10, help="projects the clients are spread over")
+    collab.add_argument("--files", type=int, default=3, help="shared files per project")
+    collab.add_argument("--edit-rate", type=float, default=1.0, help="edits per second per client")
+    collab.add_argument("--cursor-rate", type=float, default=2.0, help="cursor moves per second per client")
+    collab.add_argument("--awareness-rate", type=float, default=1 / 15,
+                        help="awareness renewals per second per client (y-protocols renews every 15s)")
+    collab.add_argument("--edit-mode", choices=("keystroke", "replace"), default="keystroke",
+                        help="keystroke: small inserts as y-monaco sends them; replace: whole-file rewrites "
+                             "as RealTimeSync.updateFile sends them")
+    collab.add_argument("--insert-chars", type=int, default=4, help="keystroke: most characters per insert")
+    collab.add_argument("--file-chars", type=int, default=2000, help="replace: characters per rewritten file")
+    collab.add_argument("--duration", type=float, default=30.0, help="seconds of traffic once every client joined")
+    collab.add_argument("--ramp", type=float, default=2.0, help="seconds over which the clients join")
+    collab.add_argument("--settle", type=float, default=10.0,
+                        help="seconds to wait after the traffic for every edit to reach every client")
+    collab.add_argument("--timeout", type=float, default=10.0, help="seconds to connect and sync before a join fails")
+    collab.add_argument("--seed", type=int, default=0, help="seed for client ids, op timing and content")
+    
+    diff = commands.add_parser("diff", help="compare two bench reports and flag significant changes")
+    diff.add_argument("baseline", metavar="BASELINE")
+    diff.add_argument("candidate", metavar="CANDIDATE")
+    diff.add_argument("--confidence", type=float, default=0.95, help="confidence level for intervals")
+    return parser
+
+
+def _build_tester(args: argparse.Namespace, profiler: Optional["Profiler"] = None) -> "CodeCollabAITester":
+    """A tester configured from the run/bench options"""
+    from .agent_config import load_agents
+    from .artifacts import ArtifactValidator
+    from .backends import StubBackend
+    from .cache import ResponseCache
+    from .scheduler import ModelScheduler, RetryPolicy
+    from .tester import CodeCollabAITester
+    from .usage import load_pricing
+    backend = None
+    if args.backend == "stub":
+        backend = StubBackend(
+            latency=args.stub_latency,
+            jitter=args.stub_jitter,
+            failure_rate=args.stub_failure_rate,
+            seed=args.stub_seed,
+            chunk_delay=args.stub_chunk_delay,
+        )
+    cache = None
+    if args.cache_mode != PASSTHROUGH:
+        cache = ResponseCache(
+            args.cache_dir,
+            mode=args.cache_mode,
+            max_age_seconds=args.cache_max_age_days * 86400 if args.cache_max_age_days is not None else None,
+            max_size_bytes=int(args.cache_max_size_mb * 1024 * 1024) if args.cache_max_size_mb is not None else None,
+        )
+    scheduler = ModelScheduler(
+        rate_limits=dict(args.rate_limit),
+        retry=RetryPolicy(max_attempts=args.max_attempts, base_delay=args.retry_base_delay),
+        call_timeout=args.call_timeout,
+        hedge=args.hedge,
+    )
+    return CodeCollabAITester(
+        os.environ.get(API_KEY_ENV), cache=cache, backend=backend,
+        agents=load_agents() if args.route_by_agent else None,
+        stream=args.stream, abort_invalid_streams=args.abort_invalid_streams,
+        pricing=load_pricing(args.pricing) if args.pricing else None, scheduler=scheduler,
+        test_timeout=args.test_timeout, spec_dir=args.specs, axes=_axes(args), profiler=profiler,
+        structured=args.structured,
+        artifact_validator=ArtifactValidator(workers=args.artifact_workers, memo_dir=args.artifact_memo)
+    )
+
+
+def _prune_cache(tester: "CodeCollabAITester") -> None:
+    """Enforce the response cache's age and size limits after a command that wrote to it, and report its use"""
+    cache = tester.cache
+    if cache is not None:
+        evicted = cache.prune()
+        print(f"\n🗄️  Response cache ({cache.mode}): {cache.hits} hits, {cache.misses} misses, {evicted} evicted")
+
+
+def _axes(args: argparse.Namespace) -> "MatrixAxes":
+    from .matrix import MatrixAxes
+    return MatrixAxes(agents=args.agents, models=args.models, temperatures=args.temperatures, variants=args.variants)
+
+
+def _print_banner() -> None:
+    print("🤖 CodeCollab AI Agent Test Suite")
+    print("=" * 50)
+    print("Testing AI agents for collaborative coding platform")
+    print("This suite validates the capabilities of our specialized AI agents\n")
+
+
+def _missing_api_key(args: argparse.Namespace) -> bool:
+    """Whether a run would call the Gemini API without a key"""
+    if args.backend != "live" or args.cache_mode == REPLAY or os.environ.get(API_KEY_ENV):
+        return False
+    print(f"❌ {API_KEY_ENV} is not set. Export your API key (export {API_KEY_ENV}=your-api-key-here), "
+          "or run offline with --backend stub or --cache-mode replay")
+    return True
+
+
+def cmd_run(args: argparse.Namespace) -> int:
+    if _missing_api_key(args):
+        return 2
+    if args.checkpoint and not args.checkpoint.endswith(JSONL_SUFFIXES):
+        print(f"❌ --checkpoint must be a JSONL file ({', '.join(JSONL_SUFFIXES)})")
+        return 2
+    from .profiling import Profiler
+    from .results_io import ResultWriter, jsonl_filename, strip_private
+    from .sharding import load_checkpoint
+    _print_banner()
+    profiler = Profiler(enabled=args.profile or args.profile_memory, trace_memory=args.profile_memory)
+    
+    # Save results to file with timestamp
+    timestamp = time.strftime("%Y%m%d_%H%M%S")
+    shard_suffix = f"_shard{args.shard[0]}of{args.shard[1]}" if args.shard else ""
+    writer = None
+    tester = None
+    if args.checkpoint:
+        filename = args.checkpoint
+    elif args.output_format == "jsonl":
+        filename = jsonl_filename(f'codecollab_ai_test_results_{timestamp}{shard_suffix}', args.compress)
+    else:
+        filename = f'codecollab_ai_test_results_{timestamp}{shard_suffix}.json'
+    resuming = bool(args.checkpoint) and os.path.exists(filename)
+    
+    try:
+        tester = _build_tester(args, profiler)
+        # A checkpoint is a JSONL results file: completed cells are read back, new ones appended
+        completed = load_checkpoint(filename) if resuming else {}
+        if args.output_format == "jsonl" or args.checkpoint:
+            writer = ResultWriter(filename, mode="a" if resuming else "w")
+            writer.write_run({
+                "started_at": time.time(),
+                "backend": args.backend,
+                "route_by_agent": args.route_by_agent,
+                "stream": args.stream,
+                "concurrency": args.concurrency,
+                "shard": list(args.shard) if args.shard else None,
+                "resumed": resuming,
+            })
+        results = tester.run_all_tests(
+            max_concurrency=args.concurrency, writer=writer, deadline=args.suite_deadline,
+            shard=args.shard, completed=completed
+        )
+        
+        _prune_cache(tester)
+        artifact_stats = tester.artifacts.stats()
+        if artifact_stats["checked"] or artifact_stats["memo_hits"]:
+            print(f"🧪 Artifact checks: {artifact_stats['checked']} run, {artifact_stats['memo_hits']} memoized")
+        
+        if writer is None:
+            detailed_results = [strip_private(result) for result in results["detailed_results"]]
+            with open(filename, 'w') as f:
+                json.dump({**results, "detailed_results": detailed_results}, f, indent=2)
+        
+        print(f"\n💾 Detailed results saved to '{filename}'")
+        if args.metrics_file:
+            _export_metrics(args, results)
+        
+        # Display recommendations
+        if results["recommendations"]:
+            print(f"\n💡 Recommendations:")
+            for i, rec in enumerate(results["recommendations"], 1):
+                print(f"   {i}. {rec}")
+        
+    except Exception as e:
+        print(f"❌ Error running CodeCollab AI tests: {e}")
+        print("\nTroubleshooting:")
+        print("1. Install required package: pip install google-generativeai")
+        print(f"2. Set your Gemini API key: export {API_KEY_ENV}=your-api-key-here")
+        print("3. Ensure stable internet connection")
+        print("4. Check that your API key has proper permissions")
+        if writer is not None and writer.records:
+            print(f"\n💾 Results of completed tests were kept in '{filename}'")
+        return 1
+    finally:
+        if tester is not None:
+            tester.close()
+        if writer is not None:
+            writer.close()
+        if profiler.enabled:
+            _save_profile(profiler)
+        if args.history and os.path.exists(filename):
+            _record_history(args.history, filename)
+    return 0
+
+
+def cmd_bench(args: argparse.Namespace) -> int:
+    if _missing_api_key(args):
+        return 2
+    from .bench import format_benchmark_table
+    from .matrix import format_fastest_table
+    from .profiling import Profiler
+    _print_banner()
+    if args.cache_mode != PASSTHROUGH:
+        print("⚠️  Response cache is enabled: cached trials measure the cache, not the model\n")
+    profiler = Profiler(enabled=args.profile or args.profile_memory, trace_memory=args.profile_memory)
+    tester = _build_tester(args, profiler)
+    try:
+        if args.adaptive:
+            report = tester.run_adaptive_benchmark(
+                max_trials=args.trials, min_trials=args.min_trials, quality_precision=args.quality_precision,
+                latency_precision=args.latency_precision, warmup=args.warmup, max_concurrency=args.concurrency,
+                confidence=args.confidence
+            )
+        else:
+            report = tester.run_benchmark(
+                trials=args.trials, warmup=args.warmup, max_concurrency=args.concurrency, confidence=args.confidence
+            )
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 2
+    finally:
+        tester.close()
+        _prune_cache(tester)
+    print()
+    print(format_benchmark_table(report))
+    if args.adaptive:
+        print(f"Adaptive: {report['converged']}/{len(report['tests'])} tests met the targets; "
+              f"{report['total_calls']} of {report['fixed_design_calls']} budgeted calls "
+              f"({report['calls_saved']:.0%} saved)")
+    if any(group["cells"] > 1 for group in report["fastest_passing"]):
+        print("\n🏁 Fastest configuration per agent that meets the quality bar (p50 latency, mean quality):")
+        print(format_fastest_table(report["fastest_passing"]))
+    
+    report_file = f'codecollab_ai_bench_{time.strftime("%Y%m%d_%H%M%S")}.json'
+    with open(report_file, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Benchmark report saved to '{report_file}'")
+    if profiler.enabled:
+        _save_profile(profiler)
+    return 0
+
+
+def cmd_rescore(args: argparse.Namespace) -> int:
+    from .rescore import format_regression_table
+    from .tester import rescore_results
+    print(f"🔁 Re-scoring archived results in '{args.directory}'...")
+    report = rescore_results(args.directory, workers=args.workers, threshold=args.regression_threshold)
+    print(f"Scored {report['results']} results from {report['files']} runs\n")
+    print(format_regression_table(report))
+    
+    report_file = f'codecollab_ai_rescore_report_{time.strftime("%Y%m%d_%H%M%S")}.json'
+    with open(report_file, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Re-scoring report saved to '{report_file}'")
+    return 0
+
+
+def cmd_golden(args: argparse.Namespace) -> int:
+    from .json_extract import extract_json
+    from .rescore import load_detailed_results
+    from .similarity import add_golden, golden_dir
+    answers: Dict[str, List[Dict[str, Any]]] = {}
+    for path in args.files:
+        for result in load_detailed_results(path):
+            scenario = result.get("scenario") or result["test"]
+            quality = (result.get("evaluation") or {}).get("quality_score", 0)
+            if not result.get("success") or "response" not in result or quality < args.min_quality:
+                continue
+            if args.tests and scenario not in args.tests:
+                continue
+            parsed = extract_json(result["response"])
+            if parsed:
+                answers.setdefault(scenario, []).append(parsed)
+    if not answers:
+        print("❌ No passing responses to store (slim merged summaries keep none: use the shard files)")
+        return 1
+    
+    directory = golden_dir(args.specs)
+    for scenario, references in sorted(answers.items()):
+        added = add_golden(directory, scenario, references, limit=args.max_references)
+        print(f"⭐ {scenario}: {added} new golden answers")
+    print(f"\n💾 Golden answers saved in '{directory}'")
+    return 0
+
+
+def cmd_report(args: argparse.Namespace) -> int:
+    if not (args.files or args.history_import or args.trend):
+        print("❌ Nothing to report: give results files, --import DIR or --trend PERIOD")
+        return 2
+    if (args.history_import or args.trend) and not args.history:
+        print("❌ --import and --trend need --history DB")
+        return 2
+    
+    if args.files:
+        from .agent_config import load_agents
+        from .tester import CodeCollabAITester
+        tester = CodeCollabAITester(
+            agents=load_agents() if args.route_by_agent else None, spec_dir=args.specs, axes=_axes(args)
+        )
+        print(f"🧩 Summarising {len(args.files)} results files...")
+        try:
+            summary = tester.merge_shards(args.files)
+        finally:
+            tester.close()
+        tester._print_summary(summary)
+        if summary.get("missing_shards"):
+            print(f"⚠️  Missing shards {summary['missing_shards']}: the merged report is partial")
+        
+        merged_file = f'codecollab_ai_test_results_{time.strftime("%Y%m%d_%H%M%S")}.json'
+        with open(merged_file, 'w') as f:
+            json.dump(summary, f, indent=2)
+        print(f"\n💾 Merged results saved to '{merged_file}'")
+        if args.metrics_file:
+            _export_metrics(args, summary)
+        if args.history:
+            _record_history(args.history, merged_file)
+    
+    if args.history_import or args.trend:
+        from .history import ResultsStore, format_trend_table
+        with ResultsStore(args.history) as store:
+            if args.history_import:
+                imported = store.import_directory(args.history_import)
+                stats = store.stats()
+                print(f"🗃️  Imported {imported} new or changed runs from '{args.history_import}' into '{args.history}'")
+                print(f"   {stats['runs']} runs, {stats['calls']} calls; prompts and responses: "
+                      f"{stats['referenced_bytes'] / 1024:.1f} KiB referenced, {stats['unique_bytes'] / 1024:.1f} KiB unique, "
+                      f"{stats['stored_bytes'] / 1024:.1f} KiB stored")
+            if args.trend:
+                since = time.time() - args.trend_days * 86400 if args.trend_days is not None else None
+                print(format_trend_table(store.trend(args.trend, agents=args.agents, models=args.models, since=since)))
+    return 0
+
+
+def cmd_load(args: argparse.Namespace) -> int:
+    from .agent_config import load_agents
+    from .loadgen import CLOSED_LOOP, OPEN_LOOP, LoadGenerator, format_load_table, load_targets, run_steps
+    from .matrix import load_specs
+    try:
+        targets = load_targets(load_specs(args.specs), load_agents(), args.routes)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 2
+    model, levels = (OPEN_LOOP, args.rate) if args.rate else (CLOSED_LOOP, args.users)
+    generator = LoadGenerator(args.url, targets, connections=args.connections, timeout=args.timeout, seed=args.seed)
+    print(f"🌊 {model}-loop load on {args.url} ({', '.join(args.routes)}): {len(levels)} steps of "
+          f"{args.warmup:g}s warmup + {args.duration:g}s, cycling through {len(targets)} requests")
+    
+    def progress(step: Dict[str, Any]) -> None:
+        level = f"{step['offered_rps']:g} req/s offered" if model == OPEN_LOOP else f"{step['users']} users"
+        print(f"   {level}: {step['throughput_rps']:.1f} ok/s, p99 "
+              f"{(step['latency']['p99'] or 0) * 1000:.0f} ms, {step['error_share']:.1%} errors")
+    
+    report = run_steps(generator, model, levels, args.duration, warmup=args.warmup, arrivals=args.arrivals,
+                       think_time=args.think_time, progress=progress)
+    print()
+    print(format_load_table(report))
+    
+    report_file = f'codecollab_ai_load_{time.strftime("%Y%m%d_%H%M%S")}.json'
+    with open(report_file, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Load report saved to '{report_file}'")
+    return 0
+
+
+def cmd_collab(args: argparse.Namespace) -> int:
+    import asyncio
+    from .collab_sim import CollabSimulator, RelayServer, format_collab_report
+    if args.serve:
+        server = RelayServer("0.0.0.0", args.port)
+        print(f"🛰️  Stand-in y-websocket server on ws://0.0.0.0:{args.port} (Ctrl+C to stop)")
+        try:
+            asyncio.run(server.serve())
+        except KeyboardInterrupt:
+            pass
+        return 0
+    try:
+        simulator = CollabSimulator(
+            args.url or "ws://placeholder", clients=args.clients, rooms=args.rooms, files=args.files,
+            edit_rate=args.edit_rate, cursor_rate=args.cursor_rate, awareness_rate=args.awareness_rate,
+            edit_mode=args.edit_mode, insert_chars=args.insert_chars, file_chars=args.file_chars,
+            timeout=args.timeout, seed=args.seed,
+        )
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 2
+    
+    async def simulate() -> Dict[str, Any]:
+        server = None
+        if args.url is None:
+            server = RelayServer()
+            await server.start()
+            simulator.url = server.url
+        print(f"👥 {args.clients} clients in {simulator.rooms} projects on {simulator.url}: "
+              f"{args.ramp:g}s ramp-up + {args.duration:g}s of {args.edit_mode} edits")
+        try:
+            return await simulator.run(args.duration, ramp=args.ramp, settle=args.settle)
+        finally:
+            if server is not None:
+                await server.stop()
+    
+    report = asyncio.run(simulate())
+    print()
+    print(format_collab_report(report))
+    
+    report_file = f'codecollab_ai_collab_{time.strftime("%Y%m%d_%H%M%S")}.json'
+    with open(report_file, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Collaboration report saved to '{report_file}'")
+    converged = report["convergence"]["converged"] and report["convergence"]["digests_match"]
+    return 0 if converged and not report["failed_connections"] else 1
+
+
+def cmd_diff(args: argparse.Namespace) -> int:
+    from .bench import compare_benchmarks, format_comparison_table
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+    print(f"⚖️  Comparing '{args.candidate}' against baseline '{args.baseline}'\n")
+    print(format_comparison_table(compare_benchmarks(baseline, candidate, confidence=args.confidence)))
+    return 0
+
+
+def _saved_breakdown(path: str, tester: "CodeCollabAITester") -> "Workflow":
+    """The workflow planned by the ai-coordinator response in a results file"""
+    from .rescore import load_detailed_results
+    from .workflow import workflow_from_breakdown
+    for result in load_detailed_results(path):
+        if result["agent"] == "ai-coordinator" and result.get("response"):
+            breakdown = tester._extract_json_from_response(result["response"]).get("project_breakdown")
+            if isinstance(breakdown, list) and breakdown:
+                return workflow_from_breakdown(breakdown, tester.agents, name=f"breakdown:{os.path.basename(path)}")
+    raise ValueError(f"{path}: no ai-coordinator response with a project_breakdown")
+
+
+def cmd_workflow(args: argparse.Namespace) -> int:
+    if _missing_api_key(args):
+        return 2
+    from .profiling import Profiler
+    from .workflow import format_workflow_report, load_protocols
+    _print_banner()
+    profiler = Profiler(enabled=args.profile or args.profile_memory, trace_memory=args.profile_memory)
+    tester = _build_tester(args, profiler)
+    try:
+        if args.plan:
+            workflow, plan = tester.plan_workflow()
+            print(f"📋 Coordinator planned {len(workflow.steps)} steps ({plan['response_time']:.2f}s)")
+            workflows = [workflow]
+        elif args.breakdown:
+            workflows = [_saved_breakdown(args.breakdown, tester)]
+        else:
+            protocols = load_protocols()
+            unknown = sorted(set(args.protocol or []) - set(protocols))
+            if unknown:
+                print(f"❌ Unknown protocols {unknown}; available: {', '.join(protocols)}")
+                return 2
+            workflows = [protocols[name] for name in args.protocol or protocols]
+        
+        reports = []
+        for workflow in workflows:
+            report = tester.run_workflow(workflow, args.input, max_concurrency=args.concurrency)
+            print(format_workflow_report(report) + "\n")
+            reports.append(report)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+    finally:
+        tester.close()
+        _prune_cache(tester)
+    
+    report_file = f'codecollab_ai_workflow_{time.strftime("%Y%m%d_%H%M%S")}.json'
+    with open(report_file, 'w') as f:
+        json.dump({"test_suite": "CodeCollab AI Agent Test Suite", "mode": "workflow", "workflows": reports}, f, indent=2)
+    print(f"💾 Workflow report saved to '{report_file}'")
+    if profiler.enabled:
+        _save_profile(profiler)
+    return 0 if all(r["successful_steps"] == len(r["steps"]) for r in reports) else 1
+
+
+COMMANDS = {
+    "run": cmd_run, "bench": cmd_bench, "workflow": cmd_workflow,
+    "load": cmd_load, "collab": cmd_collab, "rescore": cmd_rescore, "golden": cmd_golden,
+    "report": cmd_report, "diff": cmd_diff,
+}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    # Bare options keep working as before: they are the options of 'run'
+    if not argv or (argv[0].startswith("-") and argv[0] not in ("-h", "--help")):
+        argv = ["run"] + argv
+    args = build_parser().parse_args(argv)
+    return COMMANDS[args.command](args)
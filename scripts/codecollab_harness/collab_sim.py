@@ -0,0 +1,774 @@
+import json
+import time
+import base64
+import random
+import asyncio
+import hashlib
+from typing import Dict, Any, List, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+from .bench import percentile
+
+# y-protocols message types, as y-websocket frames them
+MESSAGE_SYNC = 0
+MESSAGE_AWARENESS = 1
+SYNC_STEP1 = 0
+SYNC_STEP2 = 1
+SYNC_UPDATE = 2
+
+# Traffic the synthetic clients generate
+EDIT = "edit"
+CURSOR = "cursor"
+AWARENESS = "awareness"
+OP_KINDS = (EDIT, CURSOR, AWARENESS)
+
+# How an edit changes a file: y-monaco sends each keystroke's insert,
+# RealTimeSync.updateFile deletes the whole text and inserts the new content
+KEYSTROKE = "keystroke"
+REPLACE = "replace"
+EDIT_MODES = (KEYSTROKE, REPLACE)
+
+# lib0 content ref of a Y.Text insert, and the info bit for an item with a left origin
+_CONTENT_STRING = 4
+_HAS_ORIGIN = 0x80
+
+_WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+_OP_BINARY, _OP_CLOSE, _OP_PING, _OP_PONG = 0x2, 0x8, 0x9, 0xA
+
+# Sleep granularity of the event loop probe; its overshoot is time the simulator itself kept messages waiting
+_LAG_PROBE_INTERVAL = 0.01
+
+
+def _write_var_uint(out: bytearray, value: int) -> None:
+    while value > 0x7F:
+        out.append(0x80 | (value & 0x7F))
+        value >>= 7
+    out.append(value)
+
+
+def _write_var_bytes(out: bytearray, data: bytes) -> None:
+    _write_var_uint(out, len(data))
+    out += data
+
+
+def _write_var_string(out: bytearray, text: str) -> None:
+    _write_var_bytes(out, text.encode("utf-8"))
+
+
+class _Decoder:
+    """Read lib0 variable-length fields from a message"""
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.pos = 0
+
+    def var_uint(self) -> int:
+        value, shift = 0, 0
+        while True:
+            byte = self.data[self.pos]
+            self.pos += 1
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return value
+            shift += 7
+
+    def var_bytes(self) -> bytes:
+        length = self.var_uint()
+        self.pos += length
+        return self.data[self.pos - length:self.pos]
+
+    def var_string(self) -> str:
+        return self.var_bytes().decode("utf-8")
+
+
+def sync_message(step: int, payload: bytes) -> bytes:
+    out = bytearray([MESSAGE_SYNC, step])
+    _write_var_bytes(out, payload)
+    return bytes(out)
+
+
+def awareness_message(entries: List[Tuple[int, int, str]]) -> bytes:
+    """An awareness update carrying (client id, clock, JSON state) entries"""
+    update = bytearray()
+    _write_var_uint(update, len(entries))
+    for client, clock, state in entries:
+        _write_var_uint(update, client)
+        _write_var_uint(update, clock)
+        _write_var_string(update, state)
+    out = bytearray([MESSAGE_AWARENESS])
+    _write_var_bytes(out, bytes(update))
+    return bytes(out)
+
+
+def read_awareness(update: bytes) -> List[Tuple[int, int, str]]:
+    decoder = _Decoder(update)
+    return [(decoder.var_uint(), decoder.var_uint(), decoder.var_string()) for _ in range(decoder.var_uint())]
+
+
+def edit_update(client: int, clock: int, file: str, text: str, origin: Optional[Tuple[int, int]] = None,
+                deleted: Optional[Tuple[int, int, int]] = None) -> bytes:
+    """A document update laid out like a Yjs v1 update holding one Y.Text insert
+
+    The insert is one item struct: its id, its left origin (or, for the
+    first item of a file, the root type's name) and the inserted string.
+    `deleted` is a (client, clock, length) range for the update's delete set.
+    """
+    out = bytearray()
+    _write_var_uint(out, 1)  # clients with structs
+    _write_var_uint(out, 1)  # structs of this client
+    _write_var_uint(out, client)
+    _write_var_uint(out, clock)
+    if origin is not None:
+        out.append(_HAS_ORIGIN | _CONTENT_STRING)
+        _write_var_uint(out, origin[0])
+        _write_var_uint(out, origin[1])
+    else:
+        out.append(_CONTENT_STRING)
+        _write_var_uint(out, 1)  # parent is a root type, named by its key
+        _write_var_string(out, file)
+    _write_var_string(out, text)
+    if deleted is None:
+        _write_var_uint(out, 0)
+    else:
+        _write_var_uint(out, 1)
+        _write_var_uint(out, deleted[0])
+        _write_var_uint(out, 1)
+        _write_var_uint(out, deleted[1])
+        _write_var_uint(out, deleted[2])
+    return bytes(out)
+
+
+def update_id(update: bytes) -> Tuple[int, int]:
+    """The (client id, clock) of an update's first struct"""
+    decoder = _Decoder(update)
+    decoder.var_uint()
+    decoder.var_uint()
+    return decoder.var_uint(), decoder.var_uint()
+
+
+def merge_updates(updates: List[bytes]) -> bytes:
+    """The document state sent in a sync step 2: every update so far, in order"""
+    out = bytearray()
+    _write_var_uint(out, len(updates))
+    for update in updates:
+        _write_var_bytes(out, update)
+    return bytes(out)
+
+
+def split_updates(state: bytes) -> List[bytes]:
+    decoder = _Decoder(state)
+    return [decoder.var_bytes() for _ in range(decoder.var_uint())]
+
+
+def _op_digest(op: Tuple[int, int]) -> int:
+    return int.from_bytes(hashlib.blake2b(f"{op[0]}:{op[1]}".encode(), digest_size=8).digest(), "big")
+
+
+class WebSocket:
+    """One side of an RFC 6455 connection carrying binary messages
+
+    Clients mask what they send, as the protocol requires; the server does not.
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, mask: bool):
+        self.reader = reader
+        self.writer = writer
+        self.mask = mask
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    def send(self, payload: bytes, opcode: int = _OP_BINARY) -> int:
+        """Queue one frame and return its size on the wire"""
+        header = bytearray([0x80 | opcode])
+        length = len(payload)
+        mask_bit = 0x80 if self.mask else 0
+        if length < 126:
+            header.append(mask_bit | length)
+        elif length < 1 << 16:
+            header.append(mask_bit | 126)
+            header += length.to_bytes(2, "big")
+        else:
+            header.append(mask_bit | 127)
+            header += length.to_bytes(8, "big")
+        if self.mask:
+            key = random.getrandbits(32).to_bytes(4, "big")
+            header += key
+            payload = _apply_mask(payload, key)
+        frame = bytes(header) + payload
+        self.writer.write(frame)
+        self.bytes_sent += len(frame)
+        return len(frame)
+
+    async def recv(self) -> Optional[Tuple[bytes, int]]:
+        """The next binary message and its size on the wire, or None once the connection closes"""
+        message, size = bytearray(), 0
+        try:
+            while True:
+                head = await self.reader.readexactly(2)
+                length = head[1] & 0x7F
+                size += 2
+                if length == 126:
+                    length = int.from_bytes(await self.reader.readexactly(2), "big")
+                    size += 2
+                elif length == 127:
+                    length = int.from_bytes(await self.reader.readexactly(8), "big")
+                    size += 8
+                key = await self.reader.readexactly(4) if head[1] & 0x80 else None
+                payload = await self.reader.readexactly(length)
+                size += (4 if key else 0) + length
+                if key:
+                    payload = _apply_mask(payload, key)
+                opcode = head[0] & 0x0F
+                if opcode == _OP_CLOSE:
+                    return None
+                if opcode == _OP_PING:
+                    self.send(payload, _OP_PONG)
+                    continue
+                if opcode == _OP_PONG:
+                    continue
+                message += payload
+                if head[0] & 0x80:
+                    self.bytes_received += size
+                    return bytes(message), size
+        except (asyncio.IncompleteReadError, ConnectionError):
+            return None
+
+    async def close(self) -> None:
+        try:
+            self.send(b"", _OP_CLOSE)
+            await self.writer.drain()
+        except ConnectionError:
+            pass
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+def _apply_mask(payload: bytes, key: bytes) -> bytes:
+    if not payload:
+        return payload
+    repeated = (key * (len(payload) // 4 + 1))[:len(payload)]
+    return (int.from_bytes(payload, "big") ^ int.from_bytes(repeated, "big")).to_bytes(len(payload), "big")
+
+
+def _accept_key(key: str) -> str:
+    return base64.b64encode(hashlib.sha1((key + _WEBSOCKET_GUID).encode()).digest()).decode()
+
+
+async def _read_head(reader: asyncio.StreamReader) -> Tuple[str, Dict[str, str]]:
+    lines = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+    return lines[0], headers
+
+
+async def connect(url: str, timeout: float = 10.0) -> WebSocket:
+    """Open a WebSocket to a ws:// URL"""
+    parts = urlsplit(url)
+    if parts.scheme != "ws":
+        raise ValueError(f"expected a ws:// URL, got '{url}'")
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(parts.hostname, parts.port or 80), timeout)
+    key = base64.b64encode(random.getrandbits(128).to_bytes(16, "big")).decode()
+    writer.write((
+        f"GET {parts.path or '/'} HTTP/1.1\r\nHost: {parts.netloc}\r\nUpgrade: websocket\r\n"
+        f"Connection: Upgrade\r\nSec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n"
+    ).encode())
+    status, headers = await asyncio.wait_for(_read_head(reader), timeout)
+    if " 101 " not in status + " " or headers.get("sec-websocket-accept") != _accept_key(key):
+        writer.close()
+        raise ConnectionError(f"{url}: WebSocket upgrade refused ({status})")
+    return WebSocket(reader, writer, mask=True)
+
+
+class _Room:
+    def __init__(self):
+        self.connections: Set[WebSocket] = set()
+        self.updates: List[bytes] = []
+        # client id -> (clock, JSON state) of every client present
+        self.awareness: Dict[int, Tuple[int, str]] = {}
+
+
+class RelayServer:
+    """Stand-in for the y-websocket server the editor connects to
+
+    Each URL path is a room, as `project-<id>` is for the app. Like
+    y-websocket's setupWSConnection it keeps the room's document updates
+    and awareness states, answers a sync step 1 with everything so far,
+    broadcasts every update and awareness change to all of the room's
+    connections (the sender included) and announces the removal of a
+    disconnected client's awareness state. Updates are stored, not
+    merged, so the relay works on any payload.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.host = host
+        self.port = port
+        self.rooms: Dict[str, _Room] = {}
+        self.connections = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port, backlog=4096)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve(self) -> None:
+        """Start and keep serving until cancelled"""
+        await self.start()
+        await self._server.serve_forever()
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request, headers = await _read_head(reader)
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            writer.close()
+            return
+        if "sec-websocket-key" not in headers:
+            writer.write(b"HTTP/1.1 426 Upgrade Required\r\nContent-Length: 0\r\n\r\n")
+            writer.close()
+            return
+        writer.write((
+            "HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {_accept_key(headers['sec-websocket-key'])}\r\n\r\n"
+        ).encode())
+        path = request.split(" ")[1] if " " in request else "/"
+        room = self.rooms.setdefault(path.lstrip("/"), _Room())
+        socket = WebSocket(reader, writer, mask=False)
+        room.connections.add(socket)
+        self.connections += 1
+        controlled: Set[int] = set()
+
+        # Greet the way y-websocket does: our sync step 1, then who is already here
+        socket.send(sync_message(SYNC_STEP1, b""))
+        if room.awareness:
+            socket.send(awareness_message([(c, clock, state) for c, (clock, state) in room.awareness.items()]))
+        try:
+            while True:
+                received = await socket.recv()
+                if received is None:
+                    break
+                message = received[0]
+                decoder = _Decoder(message)
+                kind = decoder.var_uint()
+                if kind == MESSAGE_SYNC:
+                    step = decoder.var_uint()
+                    payload = decoder.var_bytes()
+                    if step == SYNC_STEP1:
+                        socket.send(sync_message(SYNC_STEP2, merge_updates(room.updates)))
+                    elif step == SYNC_STEP2:
+                        for update in split_updates(payload):
+                            room.updates.append(update)
+                            self._broadcast(room, sync_message(SYNC_UPDATE, update))
+                    else:
+                        room.updates.append(payload)
+                        self._broadcast(room, message)
+                elif kind == MESSAGE_AWARENESS:
+                    for client, clock, state in read_awareness(decoder.var_bytes()):
+                        if state == "null":
+                            room.awareness.pop(client, None)
+                            controlled.discard(client)
+                        else:
+                            room.awareness[client] = (clock, state)
+                            controlled.add(client)
+                    self._broadcast(room, message)
+        finally:
+            room.connections.discard(socket)
+            removed = [(client, room.awareness.pop(client)[0] + 1, "null")
+                       for client in controlled if client in room.awareness]
+            if removed:
+                self._broadcast(room, awareness_message(removed))
+            writer.close()
+
+    @staticmethod
+    def _broadcast(room: _Room, message: bytes) -> None:
+        for connection in list(room.connections):
+            if connection.writer.is_closing():
+                room.connections.discard(connection)
+                continue
+            try:
+                connection.send(message)
+            except ConnectionError:
+                room.connections.discard(connection)
+
+
+class _Client:
+    """One synthetic editor session: a Y.Doc's worth of applied edits and an awareness state"""
+
+    def __init__(self, index: int, client_id: int, room: str, files: List[str], rng: random.Random):
+        self.index = index
+        self.id = client_id
+        self.room = room
+        self.files = files
+        self.rng = rng
+        self.socket: Optional[WebSocket] = None
+        self.clock = 0
+        self.awareness_clock = 0
+        self.state = {
+            "user": {"id": f"sim-user-{index}", "name": f"Sim User {index}", "color": f"#{rng.getrandbits(24):06x}"},
+        }
+        # Applied edits, as a set and an order-independent digest of it
+        self.applied: Set[Tuple[int, int]] = set()
+        self.digest = 0
+        # file -> (id, length) of the latest insert this client has seen
+        self.latest: Dict[str, Tuple[Tuple[int, int], int]] = {}
+        self.synced = asyncio.Event()
+
+    def apply(self, op: Tuple[int, int], file: Optional[str] = None, length: int = 0) -> bool:
+        if op in self.applied:
+            return False
+        self.applied.add(op)
+        self.digest ^= _op_digest(op)
+        if file is not None:
+            self.latest[file] = (op, length)
+        return True
+
+
+class CollabSimulator:
+    """Hundreds of synthetic collaborators editing shared projects through a y-websocket server
+
+    Clients are spread evenly over the rooms and join over the ramp-up,
+    each syncing the room's document first. Once every client is in,
+    each one sends edits, cursor moves and awareness renewals as Poisson
+    streams at its own rates for the measured duration, then stops; the
+    simulator waits for every edit to reach every peer.
+
+    All clients share one event loop, so send and receive times are on
+    one clock. The loop's own lag is measured alongside: when it is a
+    large share of the propagation latency, the simulator rather than
+    the server is the bottleneck.
+    """
+
+    def __init__(self, url: str, clients: int = 200, rooms: int = 10, files: int = 3,
+                 edit_rate: float = 1.0, cursor_rate: float = 2.0, awareness_rate: float = 1 / 15,
+                 edit_mode: str = KEYSTROKE, insert_chars: int = 4, file_chars: int = 2000,
+                 timeout: float = 10.0, seed: int = 0):
+        if edit_mode not in EDIT_MODES:
+            raise ValueError(f"unknown edit mode '{edit_mode}'; known: {', '.join(EDIT_MODES)}")
+        if clients < 1 or rooms < 1 or files < 1:
+            raise ValueError("clients, rooms and files must be at least 1")
+        if urlsplit(url).scheme != "ws":
+            raise ValueError(f"expected a ws:// URL, got '{url}'")
+        self.url = url.rstrip("/")
+        self.clients = clients
+        self.rooms = min(rooms, clients)
+        self.files = [f"src/file-{i}.ts" for i in range(files)]
+        self.rates = {EDIT: edit_rate, CURSOR: cursor_rate, AWARENESS: awareness_rate}
+        self.edit_mode = edit_mode
+        self.insert_chars = max(1, insert_chars)
+        self.file_chars = max(1, file_chars)
+        self.timeout = timeout
+        self.seed = seed
+        self._reset()
+
+    def _reset(self) -> None:
+        # (message type, client id, clock) -> (op kind, send time)
+        self._sent: Dict[Tuple[int, int, int], Tuple[str, float]] = {}
+        # edit -> [send time, peers still missing it]
+        self._pending: Dict[Tuple[int, int], List[Any]] = {}
+        self._room_ops: Dict[str, Set[Tuple[int, int]]] = {}
+        self._latencies: Dict[str, List[float]] = {kind: [] for kind in OP_KINDS}
+        self._fanout: List[float] = []
+        self._sent_bytes: Dict[str, int] = {kind: 0 for kind in OP_KINDS}
+        self._received_bytes: Dict[str, int] = {kind: 0 for kind in OP_KINDS}
+        self._counts: Dict[str, int] = {kind: 0 for kind in OP_KINDS}
+        # One delivery per peer in the sender's room
+        self._expected: Dict[str, int] = {kind: 0 for kind in OP_KINDS}
+        self._last_applied = 0.0
+        self._joins: List[float] = []
+        self._lag: List[float] = []
+        self._room_sizes: Dict[str, int] = {}
+        # Receive loops, held so they are not garbage-collected mid-run
+        self._listeners: List[asyncio.Task] = []
+
+    def _room_name(self, index: int) -> str:
+        return f"project-sim-{index}"
+
+    def _text(self, rng: random.Random, length: int) -> str:
+        return "".join(rng.choices("abcdefghijklmnopqrstuvwxyz (){};\n", k=length))
+
+    def _send_edit(self, client: _Client, measuring: bool) -> None:
+        file = client.rng.choice(self.files)
+        latest = client.latest.get(file)
+        if self.edit_mode == KEYSTROKE:
+            text = self._text(client.rng, client.rng.randint(1, self.insert_chars))
+            # Typing continues after the latest insert; a left origin names one character, its last (clock + length - 1)
+            origin = (latest[0][0], latest[0][1] + latest[1] - 1) if latest else None
+            update = edit_update(client.id, client.clock, file, text, origin=origin)
+        else:
+            text = self._text(client.rng, self.file_chars)
+            deleted = (latest[0][0], latest[0][1], latest[1]) if latest else None
+            update = edit_update(client.id, client.clock, file, text, deleted=deleted)
+        op = (client.id, client.clock)
+        # Yjs clocks count inserted characters
+        client.clock += len(text)
+        client.apply(op, file, len(text))
+        self._room_ops[client.room].add(op)
+        now = time.perf_counter()
+        size = client.socket.send(sync_message(SYNC_UPDATE, update))
+        if measuring:
+            self._sent[(MESSAGE_SYNC,) + op] = (EDIT, now)
+            self._pending[op] = [now, self._room_sizes[client.room] - 1]
+            self._sent_bytes[EDIT] += size
+            self._counts[EDIT] += 1
+            self._expected[EDIT] += self._room_sizes[client.room] - 1
+
+    def _send_awareness(self, client: _Client, kind: str, measuring: bool) -> None:
+        if kind == CURSOR:
+            client.state = {**client.state, "cursor": {
+                "file": client.rng.choice(self.files),
+                "line": client.rng.randint(1, 200),
+                "column": client.rng.randint(1, 80),
+            }}
+        # An unchanged state is re-sent with a new clock: how y-protocols keeps a client from timing out
+        client.awareness_clock += 1
+        now = time.perf_counter()
+        size = client.socket.send(awareness_message([(client.id, client.awareness_clock, json.dumps(client.state))]))
+        if measuring:
+            self._sent[(MESSAGE_AWARENESS, client.id, client.awareness_clock)] = (kind, now)
+            self._sent_bytes[kind] += size
+            self._counts[kind] += 1
+            self._expected[kind] += self._room_sizes[client.room] - 1
+
+    def _received(self, client: _Client, message: bytes, size: int) -> None:
+        now = time.perf_counter()
+        decoder = _Decoder(message)
+        message_type = decoder.var_uint()
+        if message_type == MESSAGE_SYNC:
+            step = decoder.var_uint()
+            payload = decoder.var_bytes()
+            if step == SYNC_STEP1:
+                # A new client has nothing the server lacks
+                client.socket.send(sync_message(SYNC_STEP2, merge_updates([])))
+                return
+            updates = split_updates(payload) if step == SYNC_STEP2 else [payload]
+            for update in updates:
+                op = update_id(update)
+                if op[0] == client.id or not client.apply(op):
+                    continue
+                sent = self._sent.get((MESSAGE_SYNC,) + op)
+                pending = self._pending.get(op)
+                if step == SYNC_UPDATE and sent is not None:
+                    self._latencies[EDIT].append(now - sent[1])
+                    self._received_bytes[EDIT] += size
+                    if pending is not None:
+                        pending[1] -= 1
+                        if pending[1] == 0:
+                            self._fanout.append(now - pending[0])
+                            del self._pending[op]
+                self._last_applied = now
+            if step == SYNC_STEP2:
+                client.synced.set()
+        elif message_type == MESSAGE_AWARENESS:
+            for peer, clock, _state in read_awareness(decoder.var_bytes()):
+                sent = self._sent.get((MESSAGE_AWARENESS, peer, clock))
+                if peer != client.id and sent is not None:
+                    self._latencies[sent[0]].append(now - sent[1])
+                    self._received_bytes[sent[0]] += size
+
+    async def _join(self, client: _Client, delay: float) -> bool:
+        await asyncio.sleep(delay)
+        started = time.perf_counter()
+        try:
+            client.socket = await connect(f"{self.url}/{client.room}", self.timeout)
+        except (OSError, asyncio.TimeoutError):
+            return False
+        listener = asyncio.get_running_loop().create_task(self._listen(client))
+        self._listeners.append(listener)
+        client.socket.send(sync_message(SYNC_STEP1, b""))
+        self._send_awareness(client, AWARENESS, measuring=False)
+        try:
+            await asyncio.wait_for(client.synced.wait(), self.timeout)
+        except asyncio.TimeoutError:
+            # Leave the room so the server stops counting and relaying to it
+            listener.cancel()
+            await client.socket.close()
+            return False
+        self._joins.append(time.perf_counter() - started)
+        return True
+
+    async def _listen(self, client: _Client) -> None:
+        while True:
+            received = await client.socket.recv()
+            if received is None:
+                return
+            self._received(client, *received)
+
+    async def _traffic(self, client: _Client, kind: str, end: float) -> None:
+        rate = self.rates[kind]
+        if rate <= 0:
+            return
+        while True:
+            # Rare ops (awareness renewals) can draw a gap far past the end of the run
+            await asyncio.sleep(min(client.rng.expovariate(rate), max(0.0, end - time.perf_counter())))
+            if time.perf_counter() >= end or client.socket.writer.is_closing():
+                return
+            if kind == EDIT:
+                self._send_edit(client, measuring=True)
+            else:
+                self._send_awareness(client, kind, measuring=True)
+            try:
+                await client.socket.writer.drain()
+            except ConnectionError:
+                return
+
+    async def _probe_lag(self, end: float) -> None:
+        while time.perf_counter() < end:
+            before = time.perf_counter()
+            await asyncio.sleep(_LAG_PROBE_INTERVAL)
+            self._lag.append(time.perf_counter() - before - _LAG_PROBE_INTERVAL)
+
+    async def run(self, duration: float, ramp: float = 2.0, settle: float = 10.0) -> Dict[str, Any]:
+        """Join every client, run the traffic for `duration` seconds and wait up to `settle` for convergence"""
+        self._reset()
+        rng = random.Random(self.seed)
+        ids: Set[int] = set()
+        clients = []
+        for index in range(self.clients):
+            client_id = rng.getrandbits(32)
+            while client_id in ids:
+                client_id = rng.getrandbits(32)
+            ids.add(client_id)
+            room = self._room_name(index % self.rooms)
+            clients.append(_Client(index, client_id, room, self.files, random.Random(f"{self.seed}:{index}")))
+            self._room_ops.setdefault(room, set())
+        connected: List[_Client] = []
+        try:
+            # Stagger the joins so the sync handshakes do not all land at once
+            joined = await asyncio.gather(*(self._join(c, ramp * c.index / self.clients) for c in clients))
+            connected = [client for client, ok in zip(clients, joined) if ok]
+            for client in connected:
+                self._room_sizes[client.room] = self._room_sizes.get(client.room, 0) + 1
+
+            started = time.perf_counter()
+            end = started + duration
+            tasks = [self._traffic(client, kind, end) for client in connected for kind in OP_KINDS]
+            await asyncio.gather(self._probe_lag(end), *tasks)
+            stopped = time.perf_counter()
+            deadline = stopped + settle
+            while self._pending and time.perf_counter() < deadline:
+                await asyncio.sleep(0.005)
+            converged_at = time.perf_counter() if not self._pending else None
+            # A little longer for the awareness messages still in flight
+            await asyncio.sleep(min(0.2, settle))
+        finally:
+            for client in connected:
+                await client.socket.close()
+            for listener in self._listeners:
+                listener.cancel()
+            await asyncio.gather(*self._listeners, return_exceptions=True)
+
+        unconverged = [client.index for client in connected
+                       if client.applied < self._room_ops[client.room]]
+        return self._summarize(connected, stopped - started, stopped, converged_at, unconverged)
+
+    def _summarize(self, connected: List[_Client], duration: float, stopped: float,
+                   converged_at: Optional[float], unconverged: List[int]) -> Dict[str, Any]:
+        ops = {}
+        for kind in OP_KINDS:
+            sent = self._counts[kind]
+            latencies = self._latencies[kind]
+            ops[kind] = {
+                "sent": sent,
+                "ops_per_second": sent / duration if duration > 0 else 0.0,
+                "deliveries": len(latencies),
+                "expected_deliveries": self._expected[kind],
+                "latency": _latency_stats(latencies),
+                # Frames on the wire: the sender's upload, then every peer's download of the server's broadcast
+                "bytes_per_op": self._sent_bytes[kind] / sent if sent else None,
+                "fanout_bytes_per_op": self._received_bytes[kind] / sent if sent else None,
+            }
+        return {
+            "test_suite": "CodeCollab AI Agent Test Suite",
+            "mode": "collab",
+            "url": self.url,
+            "config": {
+                "clients": self.clients, "rooms": self.rooms, "files": len(self.files),
+                "rates": self.rates, "edit_mode": self.edit_mode,
+                "insert_chars": self.insert_chars, "file_chars": self.file_chars, "seed": self.seed,
+            },
+            "connected": len(connected),
+            "failed_connections": self.clients - len(connected),
+            "join": _latency_stats(self._joins),
+            "duration": duration,
+            "ops": ops,
+            # Per edit: from its send until the last peer in the room applied it
+            "edit_fanout": _latency_stats(self._fanout),
+            "convergence": {
+                "converged": bool(connected) and converged_at is not None and not unconverged,
+                # From the end of traffic until every client held every edit of its room
+                "time": max(0.0, self._last_applied - stopped) if converged_at is not None else None,
+                "undelivered_edits": len(self._pending),
+                "unconverged_clients": len(unconverged),
+                "digests_match": self._digests_match(connected),
+            },
+            "loop_lag": _latency_stats(self._lag),
+        }
+
+    @staticmethod
+    def _digests_match(connected: List[_Client]) -> bool:
+        digests: Dict[str, Set[int]] = {}
+        for client in connected:
+            digests.setdefault(client.room, set()).add(client.digest)
+        return all(len(found) == 1 for found in digests.values())
+
+
+def _latency_stats(values: List[float]) -> Dict[str, Optional[float]]:
+    return {
+        "p50": percentile(values, 50),
+        "p90": percentile(values, 90),
+        "p99": percentile(values, 99),
+        "max": max(values) if values else None,
+    }
+
+
+def _ms(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value * 1000:.1f}"
+
+
+def _bytes(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:.0f}"
+
+
+def format_collab_report(report: Dict[str, Any]) -> str:
+    lines = [
+        f"{'op':<10} {'sent':>7} {'ops/s':>8} {'delivered':>10} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} "
+        f"{'max ms':>8} {'B/op':>7} {'fan-out B/op':>13}",
+        "-" * 100,
+    ]
+    for kind, op in report["ops"].items():
+        latency = op["latency"]
+        lines.append(
+            f"{kind:<10} {op['sent']:>7} {op['ops_per_second']:>8.1f} "
+            f"{op['deliveries']:>5}/{op['expected_deliveries']:<4} {_ms(latency['p50']):>8} {_ms(latency['p90']):>8} "
+            f"{_ms(latency['p99']):>8} {_ms(latency['max']):>8} {_bytes(op['bytes_per_op']):>7} "
+            f"{_bytes(op['fanout_bytes_per_op']):>13}"
+        )
+    fanout, join, lag = report["edit_fanout"], report["join"], report["loop_lag"]
+    convergence = report["convergence"]
+    lines += [
+        "",
+        f"Edit reached every peer: p50 {_ms(fanout['p50'])} ms, p99 {_ms(fanout['p99'])} ms, max {_ms(fanout['max'])} ms",
+        f"Join (connect + initial sync): p50 {_ms(join['p50'])} ms, p99 {_ms(join['p99'])} ms; "
+        f"{report['connected']} connected, {report['failed_connections']} failed",
+    ]
+    if convergence["converged"] and convergence["digests_match"]:
+        lines.append(f"Converged {_ms(convergence['time'])} ms after the last op was sent")
+    else:
+        lines.append(f"Did not converge: {convergence['undelivered_edits']} edits undelivered, "
+                     f"{convergence['unconverged_clients']} clients behind")
+    lines.append(f"Simulator event loop lag: p50 {_ms(lag['p50'])} ms, p99 {_ms(lag['p99'])} ms "
+                 f"(latencies near this are the simulator's, not the server's)")
+    return "\n".join(lines)
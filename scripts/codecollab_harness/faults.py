@@ -0,0 +1,81 @@
+from typing import Dict, Any, Optional
+
+from .backends import BackendError
+
+# Error kinds recorded on failed results
+TIMEOUT = "timeout"
+QUOTA = "quota"
+PARSE = "parse"
+TRANSPORT = "transport"
+INTERNAL = "internal"
+ERROR_KINDS = (TIMEOUT, QUOTA, PARSE, TRANSPORT, INTERNAL)
+
+# Kinds caused by the provider or the network rather than the agent or the harness
+TRANSIENT_KINDS = frozenset({TIMEOUT, QUOTA, TRANSPORT})
+
+QUOTA_STATUS_CODES = frozenset({429})
+TIMEOUT_STATUS_CODES = frozenset({408, 504})
+TRANSPORT_STATUS_CODES = frozenset({500, 502, 503, 529})
+
+# Exception class names used by google-api-core, the anthropic SDK and httpx;
+# matched by name so no SDK has to be imported
+QUOTA_ERROR_NAMES = frozenset({"ResourceExhausted", "TooManyRequests", "RateLimitError"})
+TIMEOUT_ERROR_NAMES = frozenset({"DeadlineExceeded", "APITimeoutError", "ReadTimeout"})
+TRANSPORT_ERROR_NAMES = frozenset({
+    "ServiceUnavailable", "InternalServerError", "APIConnectionError", "OverloadedError",
+    "ConnectError", "RemoteProtocolError",
+})
+
+
+class DeadlineReached(TimeoutError):
+    """Raised when a test's or the suite's deadline passes; never retried"""
+
+
+def _status(exc: BaseException) -> Optional[int]:
+    for attribute in ("status_code", "code", "status"):
+        status = getattr(exc, attribute, None)
+        if isinstance(status, int):
+            return status
+    return None
+
+
+def classify_error(exc: BaseException) -> str:
+    """Map an exception raised by a test to one of ERROR_KINDS"""
+    names = {cls.__name__ for cls in type(exc).__mro__}
+    status = _status(exc)
+    if status in QUOTA_STATUS_CODES or names & QUOTA_ERROR_NAMES:
+        return QUOTA
+    if isinstance(exc, TimeoutError) or status in TIMEOUT_STATUS_CODES or names & TIMEOUT_ERROR_NAMES:
+        return TIMEOUT
+    if isinstance(exc, BackendError):
+        return TRANSPORT if exc.transient else INTERNAL
+    if isinstance(exc, ConnectionError) or status in TRANSPORT_STATUS_CODES or names & TRANSPORT_ERROR_NAMES:
+        return TRANSPORT
+    return INTERNAL
+
+
+def error_record(kind: str, message: str, exc: Optional[BaseException] = None) -> Dict[str, Any]:
+    return {
+        "kind": kind,
+        "type": type(exc).__name__ if exc is not None else None,
+        "message": message,
+    }
+
+
+def error_result(agent: str, test: str, model: str, exc: BaseException, response_time: float) -> Dict[str, Any]:
+    """A failed result for a test that raised, shaped like a normal result so it flows into the summary"""
+    return {
+        "agent": agent,
+        "test": test,
+        "model": model,
+        "prompt": "",
+        "response": "",
+        "response_time": response_time,
+        "stream_metrics": None,
+        "cached": False,
+        "scheduling": getattr(exc, "scheduling", None),
+        "usage": None,
+        "success": False,
+        "error": error_record(classify_error(exc), str(exc) or type(exc).__name__, exc),
+        "evaluation_criteria": [],
+    }
@@ -0,0 +1,279 @@
+import os
+import json
+import zlib
+import hashlib
+from typing import Dict, Any, Iterable, List, Optional
+
+from .bench import percentile
+from .rescore import iter_result_files, load_detailed_results, run_timestamp
+from .results_io import HEAVY_FIELDS, strip_private
+
+HISTORY_SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    source TEXT UNIQUE,
+    source_mtime REAL,
+    started_at REAL NOT NULL,
+    metadata TEXT
+);
+CREATE TABLE IF NOT EXISTS calls (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    timestamp REAL NOT NULL,
+    agent TEXT NOT NULL,
+    test TEXT NOT NULL,
+    model TEXT NOT NULL,
+    response_time REAL NOT NULL,
+    quality_score REAL,
+    success INTEGER NOT NULL,
+    error_kind TEXT,
+    prompt_tokens INTEGER,
+    completion_tokens INTEGER,
+    estimated_cost REAL,
+    prompt_hash TEXT REFERENCES blobs(hash),
+    response_hash TEXT REFERENCES blobs(hash),
+    details TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS calls_series ON calls (agent, test, model, timestamp);
+CREATE INDEX IF NOT EXISTS calls_model ON calls (model, timestamp);
+CREATE INDEX IF NOT EXISTS calls_timestamp ON calls (timestamp);
+CREATE INDEX IF NOT EXISTS calls_run ON calls (run_id);
+"""
+
+# Calendar buckets for trend reports, in local time like the results file names
+_PERIOD_SQL = {
+    "run": "CAST(run_id AS TEXT)",
+    "day": "strftime('%Y-%m-%d', timestamp, 'unixepoch', 'localtime')",
+    "week": "strftime('%Y-W%W', timestamp, 'unixepoch', 'localtime')",
+}
+
+
+class ResultsStore:
+    """SQLite results history with content-addressed, compressed prompt and response blobs
+
+    Prompts and responses are stored once each, keyed by the SHA-256 of their
+    text and zlib-compressed. The static suite prompts are identical across
+    runs, so they cost nothing after the first run. Every call gets a row in
+    `calls`, indexed by (agent, test, model, timestamp), holding the metrics
+    that history and trend queries read. The rest of the result is kept as
+    JSON, so `load_run` can rebuild the complete records.
+    """
+
+    def __init__(self, path: str):
+        import sqlite3
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA foreign_keys = ON")
+        self.db.execute("PRAGMA journal_mode = WAL")
+        self.db.executescript(_SCHEMA)
+        version = self.db.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()
+        if version is None:
+            self.db.execute("INSERT INTO meta VALUES ('schema_version', ?)", (str(HISTORY_SCHEMA_VERSION),))
+            self.db.commit()
+        elif int(version["value"]) != HISTORY_SCHEMA_VERSION:
+            raise RuntimeError(f"{path}: history schema v{version['value']}, this harness reads v{HISTORY_SCHEMA_VERSION}")
+
+    def close(self) -> None:
+        self.db.close()
+
+    def __enter__(self) -> "ResultsStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def put_blob(self, text: Optional[str]) -> Optional[str]:
+        """Store text once and return its content hash"""
+        if text is None:
+            return None
+        data = text.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        self.db.execute(
+            "INSERT OR IGNORE INTO blobs (hash, size, data) VALUES (?, ?, ?)",
+            (digest, len(data), zlib.compress(data, 6)),
+        )
+        return digest
+
+    def get_blob(self, digest: Optional[str]) -> Optional[str]:
+        if digest is None:
+            return None
+        row = self.db.execute("SELECT data FROM blobs WHERE hash = ?", (digest,)).fetchone()
+        return zlib.decompress(row["data"]).decode("utf-8") if row else None
+
+    def add_run(self, results: Iterable[Dict[str, Any]], started_at: float, source: Optional[str] = None,
+                source_mtime: Optional[float] = None, metadata: Optional[Dict[str, Any]] = None) -> int:
+        """Record one run's results (full records, with prompt and response) and return its run id
+
+        A run with an already recorded `source` replaces the earlier copy,
+        and blobs only the earlier copy referenced are dropped.
+        """
+        with self.db:
+            replaced = source is not None and self.db.execute("DELETE FROM runs WHERE source = ?", (source,)).rowcount
+            run_id = self.db.execute(
+                "INSERT INTO runs (source, source_mtime, started_at, metadata) VALUES (?, ?, ?, ?)",
+                (source, source_mtime, started_at, json.dumps(metadata) if metadata else None),
+            ).lastrowid
+            self.db.executemany(
+                "INSERT INTO calls (run_id, timestamp, agent, test, model, response_time, quality_score, success, "
+                "error_kind, prompt_tokens, completion_tokens, estimated_cost, prompt_hash, response_hash, details) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [self._call_row(run_id, started_at, result) for result in results],
+            )
+            if replaced:
+                self.db.execute(
+                    "DELETE FROM blobs WHERE hash NOT IN (SELECT prompt_hash FROM calls WHERE prompt_hash IS NOT NULL) "
+                    "AND hash NOT IN (SELECT response_hash FROM calls WHERE response_hash IS NOT NULL)"
+                )
+        return run_id
+
+    def _call_row(self, run_id: int, started_at: float, result: Dict[str, Any]) -> tuple:
+        result = strip_private(result)
+        usage = result.get("usage") or {}
+        error = result.get("error")
+        details = {key: value for key, value in result.items() if key not in HEAVY_FIELDS}
+        return (
+            run_id,
+            started_at,
+            result["agent"],
+            result["test"],
+            result.get("model") or "unknown",
+            result["response_time"],
+            (result.get("evaluation") or {}).get("quality_score"),
+            int(bool(result.get("success"))),
+            error["kind"] if error else None,
+            usage.get("prompt_tokens"),
+            usage.get("completion_tokens"),
+            usage.get("estimated_cost"),
+            self.put_blob(result.get("prompt")),
+            self.put_blob(result.get("response")),
+            json.dumps(details),
+        )
+
+    def import_file(self, path: str) -> Optional[int]:
+        """Record an archived results file, unless it is already recorded and unchanged since"""
+        source = os.path.abspath(path)
+        mtime = os.path.getmtime(path)
+        row = self.db.execute("SELECT source_mtime FROM runs WHERE source = ?", (source,)).fetchone()
+        if row is not None and row["source_mtime"] == mtime:
+            return None
+        return self.add_run(load_detailed_results(path), run_timestamp(path), source=source, source_mtime=mtime)
+
+    def import_directory(self, directory: str) -> int:
+        """Record every archived run in a directory; returns how many were new or changed"""
+        return sum(1 for path in iter_result_files(directory) if self.import_file(path) is not None)
+
+    def load_run(self, run_id: int) -> List[Dict[str, Any]]:
+        """The complete results of one run, prompts and responses included"""
+        rows = self.db.execute(
+            "SELECT prompt_hash, response_hash, details FROM calls WHERE run_id = ? ORDER BY id", (run_id,)
+        )
+        return [
+            {**json.loads(row["details"]), "prompt": self.get_blob(row["prompt_hash"]),
+             "response": self.get_blob(row["response_hash"])}
+            for row in rows.fetchall()
+        ]
+
+    @staticmethod
+    def _filters(agents: Optional[List[str]], tests: Optional[List[str]], models: Optional[List[str]],
+                 since: Optional[float]) -> tuple:
+        clauses, params = [], []
+        for column, values in (("agent", agents), ("test", tests), ("model", models)):
+            if values:
+                clauses.append(f"{column} IN ({', '.join('?' * len(values))})")
+                params += values
+        if since is not None:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def history(self, agents: Optional[List[str]] = None, tests: Optional[List[str]] = None,
+                models: Optional[List[str]] = None, since: Optional[float] = None,
+                limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Per-call metrics, newest first"""
+        where, params = self._filters(agents, tests, models, since)
+        query = (
+            "SELECT run_id, timestamp, agent, test, model, response_time, quality_score, success, error_kind, "
+            f"prompt_tokens, completion_tokens, estimated_cost FROM calls{where} ORDER BY timestamp DESC, id"
+        )
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        return [dict(row) for row in self.db.execute(query, params)]
+
+    def trend(self, period: str = "day", agents: Optional[List[str]] = None, tests: Optional[List[str]] = None,
+              models: Optional[List[str]] = None, since: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Latency, quality, success and token trends per agent and period, oldest period first"""
+        where, params = self._filters(agents, tests, models, since)
+        rows = self.db.execute(
+            f"SELECT {_PERIOD_SQL[period]} AS period, timestamp AS started, agent, response_time, quality_score, "
+            f"success, completion_tokens, estimated_cost FROM calls{where} ORDER BY timestamp, id",
+            params,
+        )
+        groups: Dict[tuple, Dict[str, Any]] = {}
+        for row in rows:
+            group = groups.setdefault((row["period"], row["agent"]), {
+                "period": row["period"], "started": row["started"], "agent": row["agent"],
+                "latencies": [], "qualities": [], "successes": 0, "completion_tokens": 0, "estimated_cost": 0.0,
+            })
+            group["latencies"].append(row["response_time"])
+            if row["quality_score"] is not None:
+                group["qualities"].append(row["quality_score"])
+            group["successes"] += row["success"]
+            group["completion_tokens"] += row["completion_tokens"] or 0
+            group["estimated_cost"] += row["estimated_cost"] or 0.0
+
+        report = []
+        for group in groups.values():
+            latencies, qualities = group.pop("latencies"), group.pop("qualities")
+            report.append({
+                **group,
+                "calls": len(latencies),
+                "latency_p50": percentile(latencies, 50),
+                "latency_p90": percentile(latencies, 90),
+                "mean_quality": sum(qualities) / len(qualities) if qualities else None,
+                "success_rate": 100 * group["successes"] / len(latencies),
+            })
+        return sorted(report, key=lambda row: (row["agent"], row["started"]))
+
+    def stats(self) -> Dict[str, Any]:
+        """Row counts and how much deduplication and compression save"""
+        runs = self.db.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+        calls = self.db.execute("SELECT COUNT(*) FROM calls").fetchone()[0]
+        blobs, unique_bytes, stored_bytes = self.db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(LENGTH(data)), 0) FROM blobs"
+        ).fetchone()
+        referenced_bytes = self.db.execute(
+            "SELECT COALESCE(SUM(b.size), 0) FROM calls c JOIN blobs b ON b.hash IN (c.prompt_hash, c.response_hash)"
+        ).fetchone()[0]
+        return {
+            "runs": runs,
+            "calls": calls,
+            "blobs": blobs,
+            "referenced_bytes": referenced_bytes,
+            "unique_bytes": unique_bytes,
+            "stored_bytes": stored_bytes,
+            "database_bytes": os.path.getsize(self.path),
+        }
+
+
+def format_trend_table(report: List[Dict[str, Any]]) -> str:
+    lines = [
+        f"{'agent':<28} {'period':<12} {'calls':>6} {'p50(s)':>8} {'p90(s)':>8} {'quality':>8} {'success':>8} {'cost($)':>9}",
+        "-" * 94,
+    ]
+    for row in report:
+        quality = "-" if row["mean_quality"] is None else f"{row['mean_quality']:.1f}"
+        lines.append(
+            f"{row['agent']:<28} {row['period']:<12} {row['calls']:>6} {row['latency_p50']:>8.2f} "
+            f"{row['latency_p90']:>8.2f} {quality:>8} {row['success_rate']:>7.1f}% {row['estimated_cost']:>9.4f}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,251 @@
+import re
+import json
+import hashlib
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+# What may precede the object a response is made of
+_LEAD_IN = re.compile(r"\s*(```[\w-]*\s*)?")
+# Only these characters can change the scanner state, so everything else is
+# skipped by the regex engine instead of a Python-level loop
+_STRUCTURAL = re.compile(r'[{}\[\]"\\]')
+_STRING_SPECIAL = re.compile(r'["\\]')
+_CLOSERS = {"}": "{", "]": "["}
+# A `{` whose first token is a key or `}`: where the fallback tries to decode
+_OBJECT_START = re.compile(r'\{\s*["}]')
+_DECODER = json.JSONDecoder()
+
+
+class JSONExtractor:
+    """Locate and parse the first non-empty JSON object in text that may arrive in chunks
+
+    The scanner follows strings, escapes and bracket nesting from each `{`.
+    When a candidate object closes, it is parsed exactly once with
+    raw_decode. That handles prose around the object, ```json fences, and
+    stray braces before or after it, none of which survive the old
+    first-`{`/last-`}` slice.
+
+    `error` records the first candidate that clearly started as a JSON
+    object (`{` followed by a key or `}`) and turned out to be structurally
+    broken. The scanner often recovers from that, e.g. from braces in prose
+    before the real object, so a stream consumer should stop early only once
+    `broken` is set: the response's own object (nothing but whitespace or a
+    ``` fence before it) is broken and no candidate that could replace it is
+    still open.
+    """
+
+    def __init__(self):
+        self.value: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        # Chunks are kept as they arrive, with the offset of each in the whole
+        # text; only the new tail is scanned, and joins span one candidate
+        self._chunks: List[str] = []
+        self._offsets: List[int] = []
+        self._length = 0
+        self._pos = 0
+        self._start = -1
+        self._stack: List[str] = []
+        self._in_string = False
+        # (start, end) of every candidate that closed or broke without a
+        # usable object; nothing nested inside one is ever returned
+        self._failed: List[Tuple[int, int]] = []
+        self._lead_broken = False
+
+    @property
+    def done(self) -> bool:
+        return self.value is not None
+
+    @property
+    def broken(self) -> bool:
+        """True once no candidate object can still complete the response"""
+        return self._lead_broken and self._start == -1 and not self.done
+
+    def feed(self, chunk: str) -> Optional[Dict[str, Any]]:
+        """Add a chunk and return the parsed object once it is complete"""
+        if self.done:
+            return self.value
+        if chunk:
+            self._offsets.append(self._length)
+            self._chunks.append(chunk)
+            self._length += len(chunk)
+            self._scan()
+        return self.value
+
+    def finish(self) -> Optional[Dict[str, Any]]:
+        """Mark the end of input and return the parsed object, or None if there is none"""
+        if self.done:
+            return self.value
+        self._scan()
+        if self.value is None:
+            self._fallback()
+        return self.value
+
+    def _text(self, start: int, end: Optional[int] = None) -> str:
+        """The input between two offsets, joining only the chunks they span"""
+        first = bisect_right(self._offsets, start) - 1
+        last = len(self._chunks) if end is None else bisect_left(self._offsets, end)
+        base = self._offsets[first]
+        text = "".join(self._chunks[first:last])
+        return text[start - base:None if end is None else end - base]
+
+    def _reset_candidate(self) -> None:
+        self._start = -1
+        self._stack = []
+        self._in_string = False
+
+    def _committed(self) -> bool:
+        """True once the candidate's first token shows it is meant to be JSON"""
+        head = self._text(self._start + 1, min(self._start + 64, self._length)).lstrip()
+        return head[:1] in ('"', "}")
+
+    def _try_parse(self, end: int) -> None:
+        try:
+            value, _ = _DECODER.raw_decode(self._text(self._start))
+        except (ValueError, RecursionError):
+            value = None
+        if isinstance(value, dict) and value:
+            self.value = value
+            return
+        self._fail(end)
+
+    def _fail(self, end: int) -> None:
+        """Drop the candidate and resume scanning past its end, never inside it"""
+        self._failed.append((self._start, end))
+        self._pos = end
+        self._reset_candidate()
+
+    def _scan(self) -> None:
+        while self.value is None and self._pos < self._length:
+            index = bisect_right(self._offsets, self._pos) - 1
+            self._scan_chunk(self._chunks[index], self._offsets[index])
+
+    def _scan_chunk(self, text: str, base: int) -> None:
+        """Scan one chunk from the saved position, up to its end or until a candidate ends"""
+        pos = self._pos - base
+        while pos < len(text):
+            if self._start == -1:
+                start = text.find("{", pos)
+                if start == -1:
+                    break
+                self._start = base + start
+                self._stack = ["{"]
+                pos = start + 1
+                continue
+
+            if self._in_string:
+                match = _STRING_SPECIAL.search(text, pos)
+                if match is None:
+                    break
+                if match.group() == "\\":
+                    # Skip the escaped character, even if it has not arrived yet
+                    pos = match.end() + 1
+                else:
+                    self._in_string = False
+                    pos = match.end()
+                continue
+
+            match = _STRUCTURAL.search(text, pos)
+            if match is None:
+                break
+            char = match.group()
+            pos = match.end()
+            if char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._stack.append(char)
+            elif char in _CLOSERS:
+                if self._stack[-1] != _CLOSERS[char]:
+                    if self.error is None and self._committed():
+                        self.error = f"unexpected '{char}' at offset {base + match.start()}"
+                        self._lead_broken = _LEAD_IN.fullmatch(self._text(0, self._start)) is not None
+                    self._fail(base + pos)
+                    return
+                self._stack.pop()
+                if not self._stack:
+                    self._try_parse(base + pos)
+                    return
+        self._pos = base + max(pos, len(text))
+
+    def _fallback(self) -> None:
+        """Last resort for text the scanner lost track of, e.g. an unclosed `{` in leading prose
+
+        Each object start is decoded at most once, and a start that fails
+        skips everything up to the point where decoding gave up, so objects
+        nested inside a broken one are not mistaken for the answer.
+        """
+        text = "".join(self._chunks)
+        failed = iter(self._failed)
+        span = next(failed, None)
+        match = _OBJECT_START.search(text)
+        while match is not None:
+            start = match.start()
+            while span is not None and span[1] <= start:
+                span = next(failed, None)
+            if span is not None and span[0] <= start:
+                match = _OBJECT_START.search(text, span[1])
+                continue
+            try:
+                value, end = _DECODER.raw_decode(text, start)
+            except json.JSONDecodeError as exc:
+                value, end = None, max(exc.pos, start + 1)
+            except RecursionError:
+                return
+            if isinstance(value, dict) and value:
+                self.value = value
+                return
+            match = _OBJECT_START.search(text, end)
+
+
+def extract_json(text: str) -> Optional[Dict[str, Any]]:
+    """Parse the first non-empty JSON object embedded in text, or None"""
+    extractor = JSONExtractor()
+    extractor.feed(text)
+    return extractor.finish()
+
+
+class ParseCache:
+    """Thread-safe memo of extract_json results keyed by a sha256 of the response text
+
+    Validation, extraction and scoring all ask for the parsed form of the
+    same response; this makes sure it is parsed once. Stream consumers can
+    store the object their extractor already produced. Texts are not kept:
+    entries are charged the length of their text, a fair proxy for the size
+    of the parsed tree, and the least recently used go once the total
+    passes `max_bytes`.
+    """
+
+    def __init__(self, max_bytes: int = 8 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: "OrderedDict[bytes, Tuple[int, Optional[Dict[str, Any]]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(text: str) -> bytes:
+        return hashlib.sha256(text.encode("utf-8", "surrogatepass")).digest()
+
+    def _store(self, key: bytes, cost: int, value: Optional[Dict[str, Any]]) -> None:
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= previous[0]
+            self._entries[key] = (cost, value)
+            self.size += cost
+            while self.size > self.max_bytes and self._entries:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self.size -= evicted
+
+    def put(self, text: str, value: Optional[Dict[str, Any]]) -> None:
+        self._store(self._key(text), len(text), value)
+
+    def get(self, text: str) -> Optional[Dict[str, Any]]:
+        key = self._key(text)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key][1]
+        value = extract_json(text)
+        self._store(key, len(text), value)
+        return value
@@ -0,0 +1,383 @@
+import json
+import time
+import random
+import threading
+from typing import Dict, Any, Callable, List, NamedTuple, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+from .agent_config import AgentConfig, resolve_agent
+from .bench import percentile
+from .matrix import TestSpec
+
+AI_ROUTE = "ai"
+COLLABORATE_ROUTE = "collaborate"
+ROUTE_PATHS = {AI_ROUTE: "/api/ai", COLLABORATE_ROUTE: "/api/ai/collaborate"}
+
+OPEN_LOOP = "open"
+CLOSED_LOOP = "closed"
+
+# Outcomes that are not an HTTP status
+CONNECTION_ERROR = "connection"
+TIMEOUT_ERROR = "timeout"
+
+# An open-loop step keeps up when it completes this share of the offered
+# rate with at most this share of requests lost to timeouts or connection errors
+KEEP_UP_SHARE = 0.95
+MAX_TRANSPORT_ERROR_SHARE = 0.01
+# A closed-loop step adds capacity when the response rate grows by at least this much
+MIN_THROUGHPUT_GAIN = 0.05
+
+
+class LoadTarget(NamedTuple):
+    """One request the load generator can send"""
+    route: str
+    label: str
+    body: bytes
+
+
+def load_targets(specs: List[TestSpec], agents: Dict[str, AgentConfig], routes: Sequence[str]) -> List[LoadTarget]:
+    """Requests for each route, in the order they are cycled through
+
+    /api/ai gets each scenario prompt as a user message to the scenario's
+    agent, exactly as the editor sends it; scenarios whose agent is not in
+    AI_AGENTS would only measure the route's 500 path and are left out.
+    /api/ai/collaborate takes no input.
+    """
+    targets = []
+    for route in routes:
+        if route == AI_ROUTE:
+            for spec in specs:
+                agent = resolve_agent(agents, spec.agent)
+                if agent is None:
+                    continue
+                body = {"agentId": agent.id, "messages": [{"role": "user", "content": spec.prompt}]}
+                targets.append(LoadTarget(route, spec.test, json.dumps(body).encode("utf-8")))
+        elif route == COLLABORATE_ROUTE:
+            targets.append(LoadTarget(route, COLLABORATE_ROUTE, b"{}"))
+        else:
+            raise ValueError(f"unknown route '{route}'; known: {', '.join(ROUTE_PATHS)}")
+    if not targets:
+        raise ValueError("no requests to send: no scenario's agent is in AI_AGENTS")
+    return targets
+
+
+class ConnectionPool:
+    """Keep-alive HTTP/1.1 connections to one server, each used by one request at a time
+
+    Connections are reused most-recently-released first, so a light load
+    keeps a few warm connections instead of cycling through all of them.
+    """
+
+    def __init__(self, base_url: str, size: int, timeout: float):
+        from http.client import HTTPConnection, HTTPSConnection
+        parts = urlsplit(base_url)
+        if parts.scheme not in ("http", "https"):
+            raise ValueError(f"expected an http(s) URL, got '{base_url}'")
+        connection_class = HTTPSConnection if parts.scheme == "https" else HTTPConnection
+        self._connect = lambda: connection_class(parts.hostname, parts.port, timeout=timeout)
+        self.prefix = parts.path.rstrip("/")
+        self.host = parts.netloc
+        self._idle: List[Any] = []
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self.opened = 0
+
+    def acquire(self) -> Tuple[Any, bool]:
+        """A connection, and whether it is a kept-alive one that served an earlier request"""
+        self._slots.acquire()
+        with self._lock:
+            if self._idle:
+                return self._idle.pop(), True
+            self.opened += 1
+        return self._connect(), False
+
+    def release(self, connection: Any, reusable: bool = True) -> None:
+        if reusable:
+            with self._lock:
+                self._idle.append(connection)
+        else:
+            connection.close()
+        self._slots.release()
+
+    def renew(self, connection: Any) -> Any:
+        """Replace a connection the server closed while it sat idle"""
+        connection.close()
+        with self._lock:
+            self.opened += 1
+        return self._connect()
+
+    def close(self) -> None:
+        with self._lock:
+            for connection in self._idle:
+                connection.close()
+            self._idle = []
+
+
+class LoadGenerator:
+    """Drive the app's AI routes with open-loop or closed-loop load and record every request
+
+    Open loop sends requests at a fixed arrival rate whether or not earlier
+    ones have finished, the way independent users arrive. Latency is measured
+    from each request's scheduled send time, so time spent waiting for a
+    free connection counts and a saturated server cannot hide its queue.
+    Closed loop runs N virtual users, each sending its next request when
+    the previous one returns (after an optional think time); throughput then
+    shows how much work N concurrent users get through.
+    """
+
+    def __init__(self, base_url: str, targets: List[LoadTarget], connections: int = 64,
+                 timeout: float = 60.0, seed: int = 0):
+        if connections < 1:
+            raise ValueError(f"need at least one connection, got {connections}")
+        self.base_url = base_url
+        self.targets = targets
+        self.connections = connections
+        self.timeout = timeout
+        self.seed = seed
+        self._next_target = 0
+        self._target_lock = threading.Lock()
+
+    def _target(self) -> LoadTarget:
+        with self._target_lock:
+            target = self.targets[self._next_target % len(self.targets)]
+            self._next_target += 1
+        return target
+
+    def _send(self, pool: ConnectionPool, target: LoadTarget, scheduled_at: float) -> Dict[str, Any]:
+        """One POST on a pooled connection; never raises"""
+        import socket
+        from http.client import HTTPException, RemoteDisconnected
+
+        connection, kept_alive = pool.acquire()
+        started_at = time.perf_counter()
+        reusable, status = False, None
+        headers = {"Content-Type": "application/json", "Host": pool.host}
+        try:
+            while True:
+                try:
+                    connection.request("POST", pool.prefix + ROUTE_PATHS[target.route], body=target.body, headers=headers)
+                    response = connection.getresponse()
+                    response.read()
+                    status = response.status
+                    reusable = not response.will_close
+                    break
+                except (RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                    # The server closed the idle keep-alive connection before this request
+                    # arrived (what HTTP clients retry on); once on a fresh one is an error
+                    if not kept_alive:
+                        raise
+                    connection, kept_alive = pool.renew(connection), False
+        except socket.timeout:
+            status = TIMEOUT_ERROR
+        except (OSError, HTTPException):
+            status = CONNECTION_ERROR
+        finally:
+            pool.release(connection, reusable)
+        finished_at = time.perf_counter()
+        return {
+            "route": target.route,
+            "label": target.label,
+            "status": status,
+            "scheduled_at": scheduled_at,
+            "finished_at": finished_at,
+            # From the scheduled send time: includes waiting for a connection
+            "latency": finished_at - scheduled_at,
+            "service_time": finished_at - started_at,
+        }
+
+    def open_loop(self, rate: float, duration: float, warmup: float = 0.0,
+                  arrivals: str = "uniform") -> Dict[str, Any]:
+        """Send `rate` requests per second for warmup + duration seconds; only the last `duration` is measured"""
+        from concurrent.futures import ThreadPoolExecutor
+        if rate <= 0:
+            raise ValueError(f"arrival rate must be positive, got {rate}")
+        rng = random.Random(self.seed)
+        pool = ConnectionPool(self.base_url, self.connections, self.timeout)
+        futures = []
+        started_at = time.perf_counter()
+        end = started_at + warmup + duration
+        with ThreadPoolExecutor(max_workers=self.connections, thread_name_prefix="load") as executor:
+            scheduled_at = started_at
+            while True:
+                scheduled_at += rng.expovariate(rate) if arrivals == "poisson" else 1.0 / rate
+                if scheduled_at >= end:
+                    break
+                delay = scheduled_at - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                futures.append(executor.submit(self._send, pool, self._target(), scheduled_at))
+        pool.close()
+        records = [future.result() for future in futures]
+        step = summarize_load(records, started_at + warmup, end)
+        return {"model": OPEN_LOOP, "offered_rps": rate, "arrivals": arrivals,
+                "connections_opened": pool.opened, **step}
+
+    def closed_loop(self, users: int, duration: float, warmup: float = 0.0,
+                    think_time: float = 0.0) -> Dict[str, Any]:
+        """Run `users` virtual users back to back for warmup + duration seconds"""
+        if users < 1:
+            raise ValueError(f"need at least one user, got {users}")
+        pool = ConnectionPool(self.base_url, users, self.timeout)
+        records: List[Dict[str, Any]] = []
+        started_at = time.perf_counter()
+        end = started_at + warmup + duration
+
+        def user(index: int) -> None:
+            rng = random.Random(f"{self.seed}:{index}")
+            while True:
+                now = time.perf_counter()
+                if now >= end:
+                    return
+                records.append(self._send(pool, self._target(), now))
+                if think_time > 0:
+                    # Exponential think times keep users from moving in lockstep
+                    time.sleep(rng.expovariate(1.0 / think_time))
+
+        threads = [threading.Thread(target=user, args=(i,), name=f"load-user-{i}", daemon=True) for i in range(users)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        pool.close()
+        step = summarize_load(records, started_at + warmup, end)
+        return {"model": CLOSED_LOOP, "users": users, "think_time": think_time,
+                "connections_opened": pool.opened, **step}
+
+
+def _succeeded(record: Dict[str, Any]) -> bool:
+    return isinstance(record["status"], int) and 200 <= record["status"] < 300
+
+
+def _latency_stats(records: List[Dict[str, Any]]) -> Dict[str, Optional[float]]:
+    latencies = [record["latency"] for record in records]
+    return {
+        "p50": percentile(latencies, 50),
+        "p90": percentile(latencies, 90),
+        "p99": percentile(latencies, 99),
+        "max": max(latencies) if latencies else None,
+        "mean_service_time": sum(r["service_time"] for r in records) / len(records) if records else None,
+    }
+
+
+def summarize_load(records: List[Dict[str, Any]], window_start: float, window_end: float) -> Dict[str, Any]:
+    """Throughput, latency percentiles and status mix over the measurement window
+
+    Latency and statuses cover the requests scheduled inside the window,
+    however late they finished. Throughput counts the responses that
+    arrived inside it, so a growing backlog cannot pass for capacity.
+    """
+    measured = [record for record in records if record["scheduled_at"] >= window_start]
+    window = window_end - window_start
+    answered = [record for record in records
+                if window_start <= record["finished_at"] < window_end and isinstance(record["status"], int)]
+    statuses: Dict[str, int] = {}
+    for record in measured:
+        statuses[str(record["status"])] = statuses.get(str(record["status"]), 0) + 1
+    ok = [record for record in measured if _succeeded(record)]
+    routes = {}
+    for route in sorted({record["route"] for record in measured}):
+        in_route = [record for record in measured if record["route"] == route]
+        route_ok = [record for record in in_route if _succeeded(record)]
+        routes[route] = {
+            "requests": len(in_route),
+            "errors": len(in_route) - len(route_ok),
+            "latency": _latency_stats(route_ok),
+        }
+    return {
+        "duration": window,
+        "requests": len(measured),
+        "succeeded": len(ok),
+        "arrival_rps": len(measured) / window if window > 0 else 0.0,
+        # Any HTTP response, including the app's deliberate 4xx/5xx answers
+        "response_rps": len(answered) / window if window > 0 else 0.0,
+        "throughput_rps": sum(1 for record in answered if _succeeded(record)) / window if window > 0 else 0.0,
+        "error_share": (len(measured) - len(ok)) / len(measured) if measured else 0.0,
+        "transport_error_share": (sum(1 for record in measured if record["status"] in (CONNECTION_ERROR, TIMEOUT_ERROR))
+                                  / len(measured) if measured else 0.0),
+        "statuses": dict(sorted(statuses.items())),
+        # Successful requests only: fast error responses would flatter the percentiles
+        "latency": _latency_stats(ok),
+        "routes": routes,
+    }
+
+
+def saturation_point(steps: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """The first load step the API layer could not absorb, and the best throughput reached by then
+
+    An open-loop step saturates when the app answers less than 95% of the
+    requests that arrived in the window. A closed-loop step saturates when
+    adding users no longer adds 5% to the response rate. Either saturates
+    when more than 1% of requests time out or cannot connect. Error
+    responses the app sends on purpose, such as a 503 for a missing API
+    key, still count as answers; they show up in the status mix. Returns
+    None when every step kept up.
+    """
+    previous = None
+    for step in steps:
+        if step["transport_error_share"] > MAX_TRANSPORT_ERROR_SHARE:
+            saturated = True
+        elif step["model"] == OPEN_LOOP:
+            saturated = step["response_rps"] < KEEP_UP_SHARE * step["arrival_rps"]
+        else:
+            saturated = (previous is not None
+                         and step["response_rps"] < (1 + MIN_THROUGHPUT_GAIN) * previous["response_rps"])
+        if saturated:
+            return {
+                "step": step.get("offered_rps", step.get("users")),
+                "capacity_rps": max(s["throughput_rps"] for s in steps[:steps.index(step) + 1]),
+            }
+        previous = step
+    return None
+
+
+def run_steps(generator: LoadGenerator, model: str, levels: Sequence[float], duration: float,
+              warmup: float = 0.0, arrivals: str = "uniform", think_time: float = 0.0,
+              progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """Run one load step per level (arrival rate or user count), lightest first"""
+    steps = []
+    for level in sorted(levels):
+        if model == OPEN_LOOP:
+            step = generator.open_loop(level, duration, warmup, arrivals)
+        else:
+            step = generator.closed_loop(int(level), duration, warmup, think_time)
+        steps.append(step)
+        if progress is not None:
+            progress(step)
+    return {
+        "test_suite": "CodeCollab AI Agent Test Suite",
+        "mode": "load",
+        "url": generator.base_url,
+        "model": model,
+        "routes": sorted({target.route for target in generator.targets}),
+        "steps": steps,
+        "saturation": saturation_point(steps),
+    }
+
+
+def _ms(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value * 1000:.0f}"
+
+
+def format_load_table(report: Dict[str, Any]) -> str:
+    level = "offered/s" if report["model"] == OPEN_LOOP else "users"
+    lines = [
+        f"{level:>9} {'req':>6} {'ok/s':>8} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8} "
+        f"{'err%':>6} {'conns':>6}  statuses",
+        "-" * 100,
+    ]
+    for step in report["steps"]:
+        value = step["offered_rps"] if report["model"] == OPEN_LOOP else step["users"]
+        latency = step["latency"]
+        statuses = ", ".join(f"{status}: {count}" for status, count in step["statuses"].items())
+        lines.append(
+            f"{value:>9g} {step['requests']:>6} {step['throughput_rps']:>8.1f} {_ms(latency['p50']):>8} "
+            f"{_ms(latency['p90']):>8} {_ms(latency['p99']):>8} {_ms(latency['max']):>8} "
+            f"{step['error_share'] * 100:>5.1f}% {step['connections_opened']:>6}  {statuses}"
+        )
+    saturation = report["saturation"]
+    if saturation is None:
+        lines.append("\nNo saturation: every step kept up (add heavier steps to find the limit)")
+    else:
+        lines.append(f"\nSaturated at {level} = {saturation['step']:g}; "
+                     f"capacity ≈ {saturation['capacity_rps']:.1f} successful req/s")
+    return "\n".join(lines)
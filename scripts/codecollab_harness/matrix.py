@@ -0,0 +1,211 @@
+import os
+import json
+import math
+import itertools
+from typing import Dict, Any, Callable, List, NamedTuple, Optional, Sequence, Tuple
+
+from .artifacts import ARTIFACT_KINDS
+from .options import DEFAULT_VARIANT, SPEC_DIR
+from .schema import compile_schema, prompt_template, schema_from_template
+
+DEFAULT_QUALITY_BAR = 70.0
+ALL_AGENTS = "all"
+
+# Stands for the base prompt inside a variant
+PROMPT_PLACEHOLDER = "{prompt}"
+
+
+class TestSpec(NamedTuple):
+    """One declarative test scenario, loaded from a spec file"""
+    agent: str
+    test: str
+    description: str
+    prompt: str
+    variants: Dict[str, str]
+    evaluation_criteria: List[str]
+    quality_bar: float
+    matrix: Dict[str, Any]
+    path: str
+    # JSON Schema a response must match; None when the prompt asks for no particular shape
+    response_schema: Optional[Dict[str, Any]] = None
+    # Response fields holding code or config to check, by artifact kind (see artifacts.py)
+    artifacts: Optional[Dict[str, str]] = None
+
+
+class TestCase(NamedTuple):
+    """One cell of the test matrix: a scenario run by one agent on one model, temperature and prompt variant
+
+    `test` is the scenario name, suffixed with the axis values that differ
+    from the agent's defaults, so every cell reports under its own name.
+    """
+    agent: str
+    scenario: str
+    test: str
+    prompt: str
+    evaluation_criteria: List[str]
+    quality_bar: float
+    model: str
+    temperature: Optional[float]
+    variant: str
+    response_schema: Optional[Dict[str, Any]] = None
+
+    @property
+    def generation_config(self) -> Dict[str, Any]:
+        return {"temperature": self.temperature} if self.temperature is not None else {}
+
+
+class MatrixAxes(NamedTuple):
+    """Axis values that override every spec's own matrix (None keeps the spec's)"""
+    agents: Optional[List[str]] = None
+    models: Optional[List[str]] = None
+    temperatures: Optional[List[Optional[float]]] = None
+    variants: Optional[List[str]] = None
+
+
+def _text(value: Any) -> str:
+    """Spec text fields are a string or a list of lines"""
+    return "\n".join(value) if isinstance(value, list) else value
+
+
+def load_spec(path: str) -> TestSpec:
+    """Load a spec file
+
+    The response schema is the spec's "response_schema" if it declares one,
+    otherwise it is derived from the JSON format example in the prompt.
+    "artifacts" maps response fields to the kind of code or config they hold.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    prompt = _text(data["prompt"])
+    variants = {DEFAULT_VARIANT: prompt}
+    for name, text in data.get("variants", {}).items():
+        variants[name] = _text(text).replace(PROMPT_PLACEHOLDER, prompt)
+    schema = data.get("response_schema")
+    if schema is None:
+        template = prompt_template(prompt)
+        schema = schema_from_template(template) if template is not None else None
+    if schema is not None:
+        try:
+            # Compiled now, so a broken schema fails the run before any model is called
+            compile_schema(schema)
+        except ValueError as e:
+            raise ValueError(f"{path}: response_schema {e}") from None
+    artifacts = data.get("artifacts", {})
+    unknown = sorted(set(artifacts.values()) - set(ARTIFACT_KINDS))
+    if unknown:
+        raise ValueError(f"{path}: unknown artifact kinds {unknown}; expected one of {', '.join(ARTIFACT_KINDS)}")
+    return TestSpec(
+        agent=data["agent"],
+        test=data["test"],
+        description=data.get("description", ""),
+        prompt=prompt,
+        variants=variants,
+        evaluation_criteria=list(data.get("evaluation_criteria", [])),
+        quality_bar=float(data.get("quality_bar", DEFAULT_QUALITY_BAR)),
+        matrix=data.get("matrix", {}),
+        path=path,
+        response_schema=schema,
+        artifacts=artifacts,
+    )
+
+
+def load_specs(directory: str = SPEC_DIR) -> List[TestSpec]:
+    """Every *.json spec in a directory, in file name order (the suite's reporting order)"""
+    names = sorted(name for name in os.listdir(directory) if name.endswith(".json"))
+    return [load_spec(os.path.join(directory, name)) for name in names]
+
+
+def _cell_name(scenario: str, parts: Sequence[str]) -> str:
+    return f"{scenario}[{'|'.join(parts)}]" if parts else scenario
+
+
+def expand_matrix(specs: List[TestSpec], agent_defaults: Callable[[str], Tuple[str, Optional[float]]],
+                  agent_ids: Sequence[str] = (), axes: MatrixAxes = MatrixAxes()) -> List[TestCase]:
+    """Expand specs into test cells: agents × models × temperatures × prompt variants
+
+    Each axis comes from `axes` when set, else from the spec's own "matrix"
+    block, else defaults to the spec's agent, that agent's model and
+    temperature (`agent_defaults`) and the base prompt. The agent value
+    "all" expands to `agent_ids`, the agents defined in lib/ai/config.ts.
+    """
+    cases = []
+    for spec in specs:
+        agents = axes.agents or spec.matrix.get("agents") or [spec.agent]
+        if ALL_AGENTS in agents:
+            agents = list(agent_ids)
+        variants = axes.variants or spec.matrix.get("variants") or [DEFAULT_VARIANT]
+        unknown = [variant for variant in variants if variant not in spec.variants]
+        if unknown:
+            raise ValueError(f"{spec.path}: unknown prompt variants {unknown}; defined: {sorted(spec.variants)}")
+
+        for agent in agents:
+            default_model, default_temperature = agent_defaults(agent)
+            models = axes.models or spec.matrix.get("models") or [default_model]
+            temperatures = axes.temperatures or spec.matrix.get("temperatures") or [default_temperature]
+            for model, temperature, variant in itertools.product(models, temperatures, variants):
+                parts = []
+                if agent != spec.agent:
+                    parts.append(agent)
+                if model != default_model:
+                    parts.append(model)
+                if temperature != default_temperature:
+                    parts.append(f"t={temperature if temperature is not None else 'default'}")
+                if variant != DEFAULT_VARIANT:
+                    parts.append(variant)
+                cases.append(TestCase(
+                    agent=agent,
+                    scenario=spec.test,
+                    test=_cell_name(spec.test, parts),
+                    prompt=spec.variants[variant],
+                    evaluation_criteria=spec.evaluation_criteria,
+                    quality_bar=spec.quality_bar,
+                    model=model,
+                    temperature=temperature,
+                    variant=variant,
+                    response_schema=spec.response_schema,
+                ))
+    return cases
+
+
+def fastest_passing(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Per agent and scenario, the fastest cell whose quality meets the scenario's bar
+
+    `rows` carry agent, scenario, test, model, temperature, variant, latency,
+    quality and quality_bar. Groups where no cell passes are reported with
+    `best` set to None and the highest-quality cell as `closest`.
+    """
+    groups: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+    for row in rows:
+        groups.setdefault((row["agent"], row["scenario"]), []).append(row)
+
+    report = []
+    for (agent, scenario), cells in groups.items():
+        passing = [cell for cell in cells if cell["quality"] >= cell["quality_bar"]]
+        report.append({
+            "agent": agent,
+            "scenario": scenario,
+            "cells": len(cells),
+            "passing": len(passing),
+            "best": min(passing, key=lambda cell: math.inf if cell["latency"] is None else cell["latency"])
+            if passing else None,
+            "closest": None if passing else max(cells, key=lambda cell: cell["quality"]),
+        })
+    return report
+
+
+def format_fastest_table(report: List[Dict[str, Any]]) -> str:
+    lines = [
+        f"{'agent':<28} {'scenario':<38} {'pass':>6} {'model':<26} {'temp':>5} {'variant':<10} {'latency':>8} {'quality':>7}",
+        "-" * 136,
+    ]
+    for group in report:
+        cell = group["best"] or group["closest"]
+        temperature = "-" if cell["temperature"] is None else f"{cell['temperature']:g}"
+        flag = "" if group["best"] else "  ✗ none meet the bar"
+        latency = "-" if cell["latency"] is None else f"{cell['latency']:.2f}s"
+        lines.append(
+            f"{group['agent']:<28} {group['scenario']:<38} {group['passing']:>2}/{group['cells']:<3} "
+            f"{cell['model']:<26} {temperature:>5} {cell['variant']:<10} {latency:>8} "
+            f"{cell['quality']:>7.1f}{flag}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,258 @@
+import os
+import json
+import time
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+from .bench import answered, percentile
+from .options import OPENMETRICS, PROMETHEUS
+
+METRICS_STATE_VERSION = 1
+
+# Seconds; spans a cached reply up to the slowest acceptable generation
+LATENCY_BUCKETS = (0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+
+SERIES_LABELS = ("agent", "test", "model")
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Dict[str, Any]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(str(value))}"' for key, value in labels.items()) + "}"
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Family:
+    """One metric family and its samples, rendered in Prometheus text or OpenMetrics format"""
+
+    def __init__(self, name: str, kind: str, help_text: str, unit: str = ""):
+        self.name = name
+        self.kind = kind
+        self.help = help_text
+        self.unit = unit
+        self.samples: List[Tuple[str, Dict[str, Any], float]] = []
+
+    def add(self, value: float, labels: Dict[str, Any], suffix: str = "") -> None:
+        self.samples.append((suffix, labels, value))
+
+    def render(self, fmt: str) -> List[str]:
+        # OpenMetrics names a counter family without its _total suffix
+        family = self.name[:-len("_total")] if fmt == OPENMETRICS and self.kind == "counter" else self.name
+        lines = [f"# HELP {family} {self.help}", f"# TYPE {family} {self.kind}"]
+        if fmt == OPENMETRICS and self.unit:
+            lines.append(f"# UNIT {family} {self.unit}")
+        for suffix, labels, value in self.samples:
+            lines.append(f"{self.name}{suffix}{_labels(labels)} {_number(value)}")
+        return lines
+
+
+class MetricsExporter:
+    """Prometheus textfile / OpenMetrics exporter with sliding-window regression alerts
+
+    State kept in a small JSON file makes counters and histograms cumulative
+    across scheduled runs, as Prometheus expects, and holds the recent
+    per-series history the alerts compare against. A series is one
+    (agent, test, model). After each run, the p90 latency and mean quality
+    of the last `window` runs are compared with the `window` runs before
+    them. An alert fires when p90 latency grows by more than
+    `latency_threshold` (a fraction) or mean quality drops by more than
+    `quality_threshold` points. Latency covers the calls that returned a
+    response; timeouts and failed calls count only as errors.
+    """
+
+    def __init__(self, state_path: Optional[str] = None, window: int = 5, latency_threshold: float = 0.25,
+                 quality_threshold: float = 5.0, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.state_path = state_path
+        self.window = window
+        self.latency_threshold = latency_threshold
+        self.quality_threshold = quality_threshold
+        self.buckets = tuple(buckets)
+        self.state = self._load_state()
+        self.alerts: List[Dict[str, Any]] = []
+        self._summary: Dict[str, Any] = {}
+
+    def _load_state(self) -> Dict[str, Any]:
+        if self.state_path and os.path.exists(self.state_path):
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            if state.get("version") == METRICS_STATE_VERSION and tuple(state.get("buckets", ())) == self.buckets:
+                return state
+        return {"version": METRICS_STATE_VERSION, "buckets": list(self.buckets), "runs_total": 0, "series": {}}
+
+    def _series(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        labels = {label: result.get(label) or "unknown" for label in SERIES_LABELS}
+        key = "|".join(labels[label] for label in SERIES_LABELS)
+        return self.state["series"].setdefault(key, {
+            "labels": labels,
+            "bucket_counts": [0] * len(self.buckets),
+            "latency_sum": 0.0,
+            "latency_count": 0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "estimated_cost": 0.0,
+            "errors": {},
+            "runs": [],
+        })
+
+    def record_run(self, summary: Dict[str, Any], timestamp: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Fold one suite summary into the cumulative metrics and return the alerts it raises"""
+        timestamp = timestamp if timestamp is not None else time.time()
+        self.state["runs_total"] += 1
+        self._summary = {key: summary.get(key) for key in ("success_rate", "average_quality_score", "average_response_time")}
+        self._summary["timestamp"] = timestamp
+
+        run_samples: Dict[str, Dict[str, List[float]]] = {}
+        for result in summary["detailed_results"]:
+            series = self._series(result)
+            error = result.get("error")
+            if error:
+                series["errors"][error["kind"]] = series["errors"].get(error["kind"], 0) + 1
+            if result.get("skipped"):
+                continue
+            usage = result.get("usage") or {}
+            series["prompt_tokens"] += usage.get("prompt_tokens", 0)
+            series["completion_tokens"] += usage.get("completion_tokens", 0)
+            series["estimated_cost"] += usage.get("estimated_cost") or 0.0
+
+            samples = run_samples.setdefault(self._key(series), {"latencies": [], "qualities": []})
+            samples["qualities"].append(result["evaluation"]["quality_score"])
+            # A timeout's response_time is the deadline, not a latency
+            if not answered(result):
+                continue
+            latency = result["response_time"]
+            series["latency_sum"] += latency
+            series["latency_count"] += 1
+            for i, bound in enumerate(self.buckets):
+                if latency <= bound:
+                    series["bucket_counts"][i] += 1
+            samples["latencies"].append(latency)
+
+        for key, samples in run_samples.items():
+            series = self.state["series"][key]
+            series["last"] = {
+                "quality": sum(samples["qualities"]) / len(samples["qualities"]),
+                "latency": samples["latencies"][-1] if samples["latencies"] else None,
+                "timestamp": timestamp,
+            }
+            series["runs"] = (series["runs"] + [{"timestamp": timestamp, **samples}])[-2 * self.window:]
+
+        self.alerts = self._evaluate_alerts()
+        return self.alerts
+
+    @staticmethod
+    def _key(series: Dict[str, Any]) -> str:
+        return "|".join(series["labels"][label] for label in SERIES_LABELS)
+
+    def _evaluate_alerts(self) -> List[Dict[str, Any]]:
+        alerts = []
+        for series in self.state["series"].values():
+            runs = series["runs"]
+            if len(runs) < 2 * self.window:
+                continue
+            baseline, recent = runs[:self.window], runs[self.window:]
+            pool = lambda window, field: [value for run in window for value in run[field]]
+            baseline_p90, recent_p90 = percentile(pool(baseline, "latencies"), 90), percentile(pool(recent, "latencies"), 90)
+            baseline_quality = sum(pool(baseline, "qualities")) / len(pool(baseline, "qualities"))
+            recent_quality = sum(pool(recent, "qualities")) / len(pool(recent, "qualities"))
+            if baseline_p90 and recent_p90 is not None and recent_p90 > baseline_p90 * (1 + self.latency_threshold):
+                alerts.append({**series["labels"], "metric": "p90_latency", "baseline": baseline_p90, "current": recent_p90})
+            if recent_quality < baseline_quality - self.quality_threshold:
+                alerts.append({**series["labels"], "metric": "quality", "baseline": baseline_quality, "current": recent_quality})
+        return alerts
+
+    def render(self, fmt: str = PROMETHEUS) -> str:
+        latency = _Family("codecollab_agent_response_seconds", "histogram",
+                          "End-to-end model call latency per agent test, calls that returned a response", "seconds")
+        tokens = _Family("codecollab_agent_tokens_total", "counter", "Tokens used by agent tests")
+        cost = _Family("codecollab_agent_estimated_cost_usd_total", "counter", "Estimated model cost of agent tests in USD")
+        errors = _Family("codecollab_agent_errors_total", "counter", "Failed agent tests by error kind")
+        quality = _Family("codecollab_agent_quality_score", "gauge", "Quality score (0-100) from the latest run")
+        last_latency = _Family("codecollab_agent_last_response_seconds", "gauge",
+                               "Latency of the latest run", "seconds")
+        alert = _Family("codecollab_agent_regression_alert", "gauge",
+                        "1 when the sliding-window regression check fires for a series and metric")
+        window_p90 = _Family("codecollab_agent_window_p90_response_seconds", "gauge",
+                             "p90 latency over the recent alert window", "seconds")
+
+        firing = {(tuple(a[label] for label in SERIES_LABELS), a["metric"]) for a in self.alerts}
+        for series in self.state["series"].values():
+            labels = series["labels"]
+            # bucket_counts are already cumulative: record_run counts a latency in every bucket it fits
+            for bound, count in zip(self.buckets, series["bucket_counts"]):
+                latency.add(count, {**labels, "le": _number(bound)}, "_bucket")
+            latency.add(series["latency_count"], {**labels, "le": "+Inf"}, "_bucket")
+            latency.add(series["latency_sum"], labels, "_sum")
+            latency.add(series["latency_count"], labels, "_count")
+            tokens.add(series["prompt_tokens"], {**labels, "kind": "prompt"})
+            tokens.add(series["completion_tokens"], {**labels, "kind": "completion"})
+            cost.add(series["estimated_cost"], labels)
+            for kind, count in sorted(series["errors"].items()):
+                errors.add(count, {**labels, "kind": kind})
+            if "last" in series:
+                quality.add(series["last"]["quality"], labels)
+                if series["last"]["latency"] is not None:
+                    last_latency.add(series["last"]["latency"], labels)
+            recent = [value for run in series["runs"][-self.window:] for value in run["latencies"]]
+            if recent:
+                window_p90.add(percentile(recent, 90), labels)
+            series_id = tuple(labels[label] for label in SERIES_LABELS)
+            for metric in ("p90_latency", "quality"):
+                alert.add(1 if (series_id, metric) in firing else 0, {**labels, "metric": metric})
+
+        suite = [
+            _Family("codecollab_suite_runs_total", "counter", "Suite runs folded into these metrics"),
+            _Family("codecollab_suite_success_rate", "gauge", "Share of tests that passed in the latest run (0-1)"),
+            _Family("codecollab_suite_average_quality_score", "gauge", "Average quality score of the latest run"),
+            _Family("codecollab_suite_last_run_timestamp_seconds", "gauge", "Unix time of the latest run", "seconds"),
+        ]
+        suite[0].add(self.state["runs_total"], {})
+        if self._summary:
+            suite[1].add((self._summary["success_rate"] or 0.0) / 100, {})
+            suite[2].add(self._summary["average_quality_score"] or 0.0, {})
+            suite[3].add(self._summary["timestamp"], {})
+
+        lines: List[str] = []
+        for family in [latency, tokens, cost, errors, quality, last_latency, window_p90, alert] + suite:
+            if family.samples:
+                lines += family.render(fmt)
+        if fmt == OPENMETRICS:
+            lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str, fmt: str = PROMETHEUS) -> None:
+        """Atomically replace the metrics file, so a collector never reads a half-written one"""
+        _atomic_write(path, self.render(fmt))
+        if self.state_path:
+            _atomic_write(self.state_path, json.dumps(self.state))
+
+
+def _atomic_write(path: str, content: str) -> None:
+    import tempfile
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".metrics")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def format_alerts(alerts: List[Dict[str, Any]]) -> str:
+    lines = []
+    for alert in alerts:
+        if alert["metric"] == "p90_latency":
+            change = f"p90 latency {alert['baseline']:.2f}s → {alert['current']:.2f}s"
+        else:
+            change = f"mean quality {alert['baseline']:.1f} → {alert['current']:.1f}"
+        lines.append(f"🚨 {alert['agent']} / {alert['test']} on {alert['model']}: {change}")
+    return "\n".join(lines)
@@ -0,0 +1,54 @@
+"""Values the command line needs before any subcommand runs
+
+build_parser() only needs choices, defaults and argument parsers, so they
+live here, free of imports, and the modules that use them import them from
+here. cli.py imports nothing else at startup; each subcommand loads the
+rest of the harness when it runs (tests/test_cli.py checks this).
+"""
+import os
+from typing import Optional, Tuple
+
+# Response cache modes (cache.py)
+RECORD = "record"
+REPLAY = "replay"
+PASSTHROUGH = "passthrough"
+CACHE_MODES = (RECORD, REPLAY, PASSTHROUGH)
+
+# Results store trend buckets (history.py)
+TREND_PERIODS = ("run", "day", "week")
+
+# Artifact check verdicts (artifacts.py)
+DEFAULT_MEMO_DIR = ".codecollab_artifacts"
+
+# Load generator inter-arrival times (loadgen.py)
+ARRIVALS = ("uniform", "poisson")
+
+# Test scenario specs (matrix.py)
+SPEC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "test-specs")
+DEFAULT_VARIANT = "default"
+
+# Metrics exposition formats (metrics.py)
+PROMETHEUS = "prometheus"
+OPENMETRICS = "openmetrics"
+METRICS_FORMATS = (PROMETHEUS, OPENMETRICS)
+
+# Results files (results_io.py)
+JSONL_SUFFIXES = (".jsonl", ".jsonl.gz", ".jsonl.zst")
+COMPRESSIONS = ("none", "gzip", "zstd")
+
+
+def parse_temperature(value: str) -> Optional[float]:
+    """A temperature axis value; 'default' leaves the provider default"""
+    return None if value == DEFAULT_VARIANT else float(value)
+
+
+def parse_shard(spec: str) -> Tuple[int, int]:
+    """Parse 'i/N' (1-based, like CI matrix indices) into (i, N)"""
+    index, sep, count = spec.partition("/")
+    try:
+        index, count = int(index), int(count)
+    except ValueError:
+        raise ValueError(f"expected a shard as i/N, got '{spec}'") from None
+    if not sep or count < 1 or not 1 <= index <= count:
+        raise ValueError(f"shard index must be between 1 and N, got '{spec}'")
+    return index, count
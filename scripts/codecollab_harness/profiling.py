@@ -0,0 +1,157 @@
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Any, Iterator, List, Optional
+
+from .bench import percentile
+
+_DISABLED = nullcontext()
+
+
+class Profiler:
+    """Opt-in span recorder for harness phases, exportable as a Chrome trace and a flat text profile
+
+    Spans are recorded from any thread. When disabled, `span` returns a shared
+    no-op context manager, so instrumented code pays almost nothing. With
+    `trace_memory`, tracemalloc runs for the whole profile and `memory_window`
+    records the peak traced memory of each test. Windows overlap when tests
+    run concurrently, so per-test peaks are exact only at concurrency 1.
+    """
+
+    def __init__(self, enabled: bool = False, trace_memory: bool = False):
+        self.enabled = enabled
+        self.trace_memory = enabled and trace_memory
+        self._origin = time.perf_counter()
+        self._events: List[Dict[str, Any]] = []
+        self._memory_peaks: Dict[str, int] = {}
+        self._threads: Dict[int, str] = {}
+        self._lock = threading.Lock()
+        if self.trace_memory:
+            # Only memory profiling needs tracemalloc, which is slow to import
+            import tracemalloc
+            self._tracemalloc = tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+
+    def _micros(self, perf_time: float) -> float:
+        return (perf_time - self._origin) * 1e6
+
+    def _record(self, event: Dict[str, Any]) -> None:
+        thread = threading.current_thread()
+        with self._lock:
+            self._threads.setdefault(thread.ident, thread.name)
+            self._events.append({"pid": os.getpid(), "tid": thread.ident, **event})
+
+    def add_span(self, name: str, start: float, end: float, category: str = "harness", **args: Any) -> None:
+        """Record a span measured elsewhere, from two perf_counter() readings"""
+        if not self.enabled:
+            return
+        self._record({
+            "name": name, "cat": category, "ph": "X",
+            "ts": self._micros(start), "dur": (end - start) * 1e6, "args": args,
+        })
+
+    @contextmanager
+    def _span(self, name: str, category: str, args: Dict[str, Any]) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_span(name, start, time.perf_counter(), category, **args)
+
+    def span(self, name: str, category: str = "harness", **args: Any):
+        """Context manager timing one phase"""
+        if not self.enabled:
+            return _DISABLED
+        return self._span(name, category, args)
+
+    @contextmanager
+    def _memory_window(self, label: str) -> Iterator[None]:
+        try:
+            yield
+        finally:
+            current, peak = self._tracemalloc.get_traced_memory()
+            self._tracemalloc.reset_peak()
+            with self._lock:
+                self._memory_peaks[label] = max(peak, self._memory_peaks.get(label, 0))
+            self._record({
+                "name": "traced_memory", "ph": "C", "ts": self._micros(time.perf_counter()),
+                "args": {"current_bytes": current, "peak_bytes": peak},
+            })
+
+    def memory_window(self, label: str):
+        """Context manager recording the peak traced memory while `label` runs"""
+        if not self.trace_memory:
+            return _DISABLED
+        return self._memory_window(label)
+
+    def chrome_trace(self) -> Dict[str, Any]:
+        """Trace Event Format JSON, loadable in chrome://tracing and ui.perfetto.dev"""
+        with self._lock:
+            events = list(self._events)
+            threads = dict(self._threads)
+        metadata = [
+            {"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid, "args": {"name": name}}
+            for tid, name in threads.items()
+        ]
+        return {"traceEvents": metadata + events, "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(), f)
+
+    def phase_stats(self) -> List[Dict[str, Any]]:
+        """Per-span-name totals and latency percentiles, largest total first"""
+        durations: Dict[str, List[float]] = {}
+        with self._lock:
+            for event in self._events:
+                if event["ph"] == "X":
+                    durations.setdefault(event["name"], []).append(event["dur"] / 1e6)
+        return sorted(
+            (
+                {
+                    "phase": name,
+                    "calls": len(values),
+                    "total": sum(values),
+                    "mean": sum(values) / len(values),
+                    "p50": percentile(values, 50),
+                    "p95": percentile(values, 95),
+                    "max": max(values),
+                }
+                for name, values in durations.items()
+            ),
+            key=lambda row: row["total"],
+            reverse=True,
+        )
+
+    def flat_profile(self, top_memory: int = 10) -> str:
+        wall = time.perf_counter() - self._origin
+        lines = [
+            f"Profile over {wall:.3f}s wall time (phases overlap when tests run concurrently)",
+            "",
+            f"{'phase':<16} {'calls':>6} {'total(s)':>9} {'mean(ms)':>9} {'p50(ms)':>9} {'p95(ms)':>9} "
+            f"{'max(ms)':>9} {'% wall':>7}",
+            "-" * 82,
+        ]
+        for row in self.phase_stats():
+            lines.append(
+                f"{row['phase']:<16} {row['calls']:>6} {row['total']:>9.3f} {row['mean'] * 1e3:>9.2f} "
+                f"{row['p50'] * 1e3:>9.2f} {row['p95'] * 1e3:>9.2f} {row['max'] * 1e3:>9.2f} "
+                f"{100 * row['total'] / wall if wall > 0 else 0:>6.1f}%"
+            )
+        if self._memory_peaks:
+            lines += ["", f"{'test':<60} {'peak traced memory':>20}", "-" * 82]
+            peaks = sorted(self._memory_peaks.items(), key=lambda item: item[1], reverse=True)
+            for label, peak in peaks[:top_memory]:
+                lines.append(f"{label:<60} {peak / 1024:>17.1f} KiB")
+        return "\n".join(lines)
+
+    def write_flat_profile(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.flat_profile() + "\n")
+
+    def close(self) -> None:
+        if self.trace_memory and self._tracemalloc.is_tracing():
+            self._tracemalloc.stop()
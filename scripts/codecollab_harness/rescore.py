@@ -0,0 +1,151 @@
+import os
+import re
+import json
+from datetime import datetime
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+from .bench import percentile
+from .options import JSONL_SUFFIXES
+from .results_io import iter_records
+
+RESULT_FILE_PREFIX = "codecollab_ai_test_results_"
+_TIMESTAMP = re.compile(r"(\d{8}_\d{6})")
+
+
+def run_timestamp(path: str) -> float:
+    """Run time from a results file name, falling back to the file's mtime"""
+    match = _TIMESTAMP.search(os.path.basename(path))
+    if match:
+        try:
+            return datetime.strptime(match.group(1), "%Y%m%d_%H%M%S").timestamp()
+        except ValueError:
+            pass
+    return os.path.getmtime(path)
+
+
+def iter_result_files(directory: str) -> List[str]:
+    """Archived results files in a directory, oldest run first"""
+    paths = [
+        entry.path for entry in os.scandir(directory)
+        if entry.is_file() and entry.name.startswith(RESULT_FILE_PREFIX)
+        and entry.name.endswith((".json",) + JSONL_SUFFIXES)
+    ]
+    return sorted(paths, key=run_timestamp)
+
+
+def load_detailed_results(path: str) -> Iterator[Dict[str, Any]]:
+    """Per-test results stored in one archived run
+
+    JSONL runs are streamed record by record; legacy .json runs are loaded whole.
+    """
+    if path.endswith(JSONL_SUFFIXES):
+        for record in iter_records(path):
+            if record.get("type") == "result":
+                record.pop("type")
+                yield record
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        summary = json.load(f)
+    yield from summary.get("detailed_results", [])
+
+
+def _mean(values: List[float]) -> Optional[float]:
+    return sum(values) / len(values) if values else None
+
+
+def _delta(current: Optional[float], baseline: Optional[float]) -> Optional[float]:
+    if current is None or baseline is None:
+        return None
+    return current - baseline
+
+
+def aggregate_regressions(file_summaries: List[Dict[str, Any]], threshold: float = 5.0) -> Dict[str, Any]:
+    """Compare each test's latest run against its earlier runs, under the current scoring
+
+    `file_summaries` are the per-file outputs of the rescoring workers, in
+    run order. For every (agent, test) the latest rescored quality is compared
+    with the mean of its earlier runs; a drop of `threshold` points or more is
+    a regression. `scoring_delta` shows how far the current scoring moves the
+    archived scores on its own.
+    """
+    by_test: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+    for summary in file_summaries:
+        for record in summary["records"]:
+            by_test.setdefault((record["agent"], record["test"]), []).append(record)
+
+    rows = []
+    for (agent, test), records in sorted(by_test.items()):
+        latest, earlier = records[-1], records[:-1]
+        baseline_quality = _mean([r["quality_score"] for r in earlier])
+        baseline_latency = percentile([r["response_time"] for r in earlier], 50) if earlier else None
+        stored = [r["stored_quality_score"] for r in records if r["stored_quality_score"] is not None]
+        quality_delta = _delta(latest["quality_score"], baseline_quality)
+        rows.append({
+            "agent": agent,
+            "test": test,
+            "runs": len(records),
+            "stored_quality": _mean(stored),
+            "rescored_quality": _mean([r["quality_score"] for r in records]),
+            "scoring_delta": _delta(_mean([r["quality_score"] for r in records]), _mean(stored)),
+            "latest_quality": latest["quality_score"],
+            "baseline_quality": baseline_quality,
+            "quality_delta": quality_delta,
+            "latest_response_time": latest["response_time"],
+            "latency_delta": _delta(latest["response_time"], baseline_latency),
+            "success_rate": 100.0 * sum(1 for r in records if r["success"]) / len(records),
+            "regression": quality_delta is not None and quality_delta <= -threshold,
+        })
+
+    agents: Dict[str, List[Dict[str, Any]]] = {}
+    for row in rows:
+        agents.setdefault(row["agent"], []).append(row)
+    agent_rows = [
+        {
+            "agent": agent,
+            "tests": len(agent_tests),
+            "rescored_quality": _mean([r["rescored_quality"] for r in agent_tests]),
+            "quality_delta": _mean([r["quality_delta"] for r in agent_tests if r["quality_delta"] is not None]),
+            "regressions": sum(1 for r in agent_tests if r["regression"]),
+        }
+        for agent, agent_tests in sorted(agents.items())
+    ]
+
+    return {
+        "files": len(file_summaries),
+        "results": sum(len(summary["records"]) for summary in file_summaries),
+        "threshold": threshold,
+        "by_test": rows,
+        "by_agent": agent_rows,
+        "runs": [
+            {key: summary[key] for key in ("path", "timestamp", "stored_average", "rescored_average", "performance_rating")}
+            for summary in file_summaries
+        ],
+    }
+
+
+def _fmt(value: Optional[float], signed: bool = False) -> str:
+    if value is None:
+        return "-"
+    return f"{value:+.1f}" if signed else f"{value:.1f}"
+
+
+def format_regression_table(report: Dict[str, Any]) -> str:
+    """Plain-text tables of per-test and per-agent regressions"""
+    lines = [
+        f"{'agent':<28} {'test':<38} {'runs':>4} {'stored':>7} {'now':>7} {'latest':>7} {'Δ':>7} {'Δt(s)':>7}",
+        "-" * 112,
+    ]
+    for row in report["by_test"]:
+        flag = "  ⚠️ regression" if row["regression"] else ""
+        lines.append(
+            f"{row['agent']:<28} {row['test']:<38} {row['runs']:>4} {_fmt(row['stored_quality']):>7} "
+            f"{_fmt(row['rescored_quality']):>7} {_fmt(row['latest_quality']):>7} "
+            f"{_fmt(row['quality_delta'], signed=True):>7} {_fmt(row['latency_delta'], signed=True):>7}{flag}"
+        )
+    lines += ["", f"{'agent':<28} {'tests':>5} {'quality':>8} {'Δ':>7} {'regressions':>12}", "-" * 64]
+    for row in report["by_agent"]:
+        lines.append(
+            f"{row['agent']:<28} {row['tests']:>5} {_fmt(row['rescored_quality']):>8} "
+            f"{_fmt(row['quality_delta'], signed=True):>7} {row['regressions']:>12}"
+        )
+    return "\n".join(lines)
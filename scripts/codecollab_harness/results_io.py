@@ -0,0 +1,104 @@
+import io
+import json
+import gzip
+import threading
+from typing import Dict, Any, IO, Iterator
+
+# Heavy fields dropped from results kept in memory once they are on disk
+HEAVY_FIELDS = ("prompt", "response")
+
+
+def strip_private(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Drop in-memory-only fields (underscore-prefixed, e.g. `_parsed_json`) before serialising"""
+    return {key: value for key, value in result.items() if not key.startswith("_")}
+
+
+def slim_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """A result without its prompt, response and private fields, for in-memory summaries"""
+    return {key: value for key, value in strip_private(result).items() if key not in HEAVY_FIELDS}
+
+
+def jsonl_filename(stem: str, compression: str = "none") -> str:
+    return stem + {"none": ".jsonl", "gzip": ".jsonl.gz", "zstd": ".jsonl.zst"}[compression]
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("zstd compression needs the zstandard package: pip install zstandard") from None
+    return zstandard
+
+
+def open_text(path: str, mode: str) -> IO[str]:
+    """Open a results file for text reading ('r'), writing ('w') or appending ('a'), compressed by suffix"""
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    if path.endswith(".zst"):
+        zstandard = _zstandard()
+        if mode == "r":
+            # Appending to a .zst file (resumed runs) adds a frame; read all of them
+            raw = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True, read_across_frames=True)
+        else:
+            raw = zstandard.ZstdCompressor().stream_writer(open(path, mode + "b"), closefd=True)
+        return io.TextIOWrapper(raw, encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class ResultWriter:
+    """Append-only JSONL writer: one compact record per finished test, then a summary record
+
+    Records are flushed as they are written, so a run that crashes half way
+    still leaves every completed test on disk. Safe to call from the worker
+    threads of a concurrent run.
+    """
+
+    def __init__(self, path: str, mode: str = "w"):
+        self.path = path
+        self._file = open_text(path, mode)
+        self._lock = threading.Lock()
+        self.records = 0
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+            self.records += 1
+
+    def write_run(self, metadata: Dict[str, Any]) -> None:
+        self._write({"type": "run", **metadata})
+
+    def write_result(self, result: Dict[str, Any]) -> None:
+        self._write({"type": "result", **strip_private(result)})
+
+    def write_summary(self, summary: Dict[str, Any]) -> None:
+        self._write({"type": "summary", **{k: v for k, v in summary.items() if k != "detailed_results"}})
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self) -> "ResultWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def iter_records(path: str) -> Iterator[Dict[str, Any]]:
+    """Stream records from a JSONL results file, tolerating a run that was cut off mid-write"""
+    try:
+        with open_text(path, "r") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # Only the final line of an interrupted run can be partial
+                    return
+    except EOFError:
+        # Truncated compressed stream from an interrupted run
+        return
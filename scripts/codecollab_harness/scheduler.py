@@ -0,0 +1,247 @@
+import time
+import random
+import threading
+from collections import deque
+from typing import Dict, Any, Callable, Deque, List, NamedTuple, Optional, Tuple, TypeVar
+
+from .bench import percentile
+from .faults import TRANSIENT_KINDS, DeadlineReached, classify_error
+
+T = TypeVar("T")
+
+
+class CallTimeout(TimeoutError):
+    """Raised when a model call does not finish within the scheduler's per-call timeout"""
+
+
+def is_transient(exc: BaseException) -> bool:
+    """Whether a failed model call is worth retrying: timeouts, quota errors and transport failures"""
+    if isinstance(exc, DeadlineReached):
+        return False
+    return classify_error(exc) in TRANSIENT_KINDS
+
+
+class TokenBucket:
+    """Thread-safe token bucket allowing `rate_per_minute` calls with bursts of up to `burst`"""
+
+    def __init__(self, rate_per_minute: float, burst: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = burst if burst is not None else max(1.0, min(rate_per_minute, 10.0))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+    def acquire(self, deadline: Optional[float] = None) -> float:
+        """Block until a token is available; returns the time spent waiting
+
+        Raises DeadlineReached instead of waiting past `deadline` (a time.monotonic() reading).
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            if deadline is not None and time.monotonic() + delay > deadline:
+                raise DeadlineReached("Deadline reached while waiting for the rate limit")
+            time.sleep(delay)
+            waited += delay
+
+
+class RetryPolicy(NamedTuple):
+    max_attempts: int = 3
+    base_delay: float = 1.0
+    max_delay: float = 30.0
+
+    def delay(self, attempt: int, exc: BaseException, rng: random.Random) -> float:
+        """Full-jitter exponential backoff, never shorter than a server-provided retry-after"""
+        backoff = rng.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        retry_after = getattr(exc, "retry_after", None)
+        if isinstance(retry_after, (int, float)):
+            backoff = max(backoff, float(retry_after))
+        return backoff
+
+
+class ModelScheduler:
+    """Gatekeeper in front of every model call: rate limits, retries, timeouts and hedging
+
+    - Each model has an optional token bucket (`rate_limits`, calls per minute).
+    - Transient failures (429s, 5xx, timeouts, dropped connections) are retried
+      with jittered exponential backoff; anything else is raised straight away.
+    - `call_timeout` bounds each attempt. On timeout the call's cancel event is
+      set, so streaming calls close their connection, and the caller moves on.
+      A caller's `deadline` bounds the call as a whole, retries included.
+    - With `hedge`, once an attempt runs past the observed p95 latency for its
+      model a duplicate request is sent (if the budget has a token to spare)
+      and the first to succeed wins; the loser is cancelled.
+
+    An attempt with nothing to wait on (no timeout, deadline or hedge) runs
+    on the caller's thread. Otherwise each attempt gets its own daemon thread,
+    so the caller can wait on it with a deadline. Concurrency is then bounded
+    only by the callers, and an attempt abandoned on timeout never holds up
+    interpreter exit. `shutdown` cancels every attempt still running.
+    """
+
+    def __init__(self, rate_limits: Optional[Dict[str, float]] = None, retry: RetryPolicy = RetryPolicy(),
+                 call_timeout: Optional[float] = None, hedge: bool = False, hedge_quantile: float = 95.0,
+                 hedge_min_samples: int = 20, seed: Optional[int] = None):
+        self.retry = retry
+        self.call_timeout = call_timeout
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self._buckets = {model: TokenBucket(rpm) for model, rpm in (rate_limits or {}).items()}
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        # Cancel events of the attempts running on their own threads
+        self._running: set = set()
+
+    def _start(self, fn: Callable[[threading.Event], T], cancel: threading.Event):
+        """Run fn(cancel) on a daemon thread and return a Future for its outcome"""
+        from concurrent.futures import Future
+        future: Future = Future()
+        future.set_running_or_notify_cancel()
+
+        def run() -> None:
+            try:
+                future.set_result(fn(cancel))
+            except BaseException as exc:
+                future.set_exception(exc)
+            finally:
+                with self._lock:
+                    self._running.discard(cancel)
+
+        with self._lock:
+            self._running.add(cancel)
+        threading.Thread(target=run, name="model-call", daemon=True).start()
+        return future
+
+    def _observe(self, model: str, latency: float) -> None:
+        with self._lock:
+            self._latencies.setdefault(model, deque(maxlen=200)).append(latency)
+
+    def _hedge_delay(self, model: str) -> Optional[float]:
+        if not self.hedge:
+            return None
+        with self._lock:
+            samples = list(self._latencies.get(model, ()))
+        if len(samples) < self.hedge_min_samples:
+            return None
+        return percentile(samples, self.hedge_quantile)
+
+    def _attempt(self, model: str, fn: Callable[[threading.Event], T], stats: Dict[str, Any],
+                 outer_deadline: Optional[float]) -> T:
+        from concurrent.futures import FIRST_COMPLETED, wait
+        bucket = self._buckets.get(model)
+        if bucket is not None:
+            stats["rate_limit_wait"] += bucket.acquire(outer_deadline)
+
+        started = time.monotonic()
+        deadline = started + self.call_timeout if self.call_timeout else None
+        if outer_deadline is not None and (deadline is None or outer_deadline < deadline):
+            deadline = outer_deadline
+        primary_cancel = threading.Event()
+        hedge_after = self._hedge_delay(model)
+        if deadline is None and hedge_after is None:
+            result = fn(primary_cancel)
+            self._observe(model, time.monotonic() - started)
+            return result
+        primary = self._start(fn, primary_cancel)
+        calls = {primary: primary_cancel}
+
+        if hedge_after is not None and (deadline is None or started + hedge_after < deadline):
+            done, _ = wait([primary], timeout=hedge_after)
+            if not done and (bucket is None or bucket.try_acquire()):
+                hedge_cancel = threading.Event()
+                calls[self._start(fn, hedge_cancel)] = hedge_cancel
+                stats["hedged"] = True
+
+        pending = set(calls)
+        first_error: Optional[BaseException] = None
+        while pending:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            if not done:
+                for cancel in calls.values():
+                    cancel.set()
+                if deadline == outer_deadline:
+                    raise DeadlineReached(f"Deadline reached during call to '{model}'")
+                raise CallTimeout(f"Call to '{model}' did not finish within {self.call_timeout:.1f}s")
+            for future in done:
+                error = future.exception()
+                if error is None:
+                    for other, cancel in calls.items():
+                        if other is not future:
+                            cancel.set()
+                    self._observe(model, time.monotonic() - started)
+                    if stats["hedged"]:
+                        stats["hedge_won"] = future is not primary
+                    return future.result()
+                first_error = first_error or error
+        raise first_error
+
+    def call(self, model: str, fn: Callable[[threading.Event], T],
+             deadline: Optional[float] = None) -> Tuple[T, Dict[str, Any]]:
+        """Run fn(cancel_event) under the model's budget and retry policy; returns (result, stats)
+
+        `deadline` is a time.monotonic() reading after which the call is
+        cancelled and no further retries are made. The exception raised when
+        the call finally fails carries the stats as its `scheduling` attribute.
+        """
+        stats: Dict[str, Any] = {"attempts": 0, "retries": 0, "rate_limit_wait": 0.0, "hedged": False}
+        for attempt in range(self.retry.max_attempts):
+            if deadline is not None and time.monotonic() >= deadline:
+                raise DeadlineReached(f"Deadline reached before calling '{model}'")
+            stats["attempts"] += 1
+            try:
+                return self._attempt(model, fn, stats, deadline), stats
+            except Exception as exc:
+                exc.scheduling = stats
+                if attempt + 1 >= self.retry.max_attempts or not is_transient(exc):
+                    raise
+                with self._lock:
+                    delay = self.retry.delay(attempt, exc, self._rng)
+                # Backing off past the deadline would only delay the same failure
+                if deadline is not None and time.monotonic() + delay >= deadline:
+                    raise
+                stats["retries"] += 1
+                time.sleep(delay)
+        raise AssertionError("unreachable")
+
+    def shutdown(self) -> None:
+        """Cancel every attempt still running, without waiting for it to return"""
+        with self._lock:
+            running = list(self._running)
+        for cancel in running:
+            cancel.set()
+
+
+def summarize_scheduling(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Retry, hedging and rate-limit totals for a run"""
+    totals = {"calls": 0, "retries": 0, "hedged_calls": 0, "hedge_wins": 0, "rate_limit_wait": 0.0}
+    for result in results:
+        scheduling = result.get("scheduling")
+        if not scheduling:
+            continue
+        totals["calls"] += 1
+        totals["retries"] += scheduling["retries"]
+        totals["hedged_calls"] += 1 if scheduling["hedged"] else 0
+        totals["hedge_wins"] += 1 if scheduling.get("hedge_won") else 0
+        totals["rate_limit_wait"] += scheduling["rate_limit_wait"]
+    return totals
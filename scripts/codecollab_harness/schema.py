@@ -0,0 +1,243 @@
+import json
+from functools import lru_cache
+from typing import Dict, Any, Callable, List, Optional
+
+# Structured-output constraint a test passes in its generation config; each
+# backend translates it into its provider's mechanism
+RESPONSE_SCHEMA_KEY = "response_schema"
+
+# Errors kept on a result; the first few say enough to fix a prompt or schema
+MAX_SCHEMA_ERRORS = 10
+
+_TYPES = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "number": (int, float),
+    "integer": int,
+    "boolean": bool,
+    "null": type(None),
+}
+_ANNOTATIONS = {"title", "description", "$schema"}
+_KEYWORDS = _ANNOTATIONS | {
+    "type", "enum", "properties", "required", "additionalProperties", "items",
+    "minItems", "maxItems", "minLength", "maxLength", "minimum", "maximum",
+}
+_BOUNDS = {
+    "minItems": (list, len, lambda value, bound: value >= bound, "at least {} items"),
+    "maxItems": (list, len, lambda value, bound: value <= bound, "at most {} items"),
+    "minLength": (str, len, lambda value, bound: value >= bound, "at least {} characters"),
+    "maxLength": (str, len, lambda value, bound: value <= bound, "at most {} characters"),
+    "minimum": ((int, float), lambda value: value, lambda value, bound: value >= bound, "at least {}"),
+    "maximum": ((int, float), lambda value: value, lambda value, bound: value <= bound, "at most {}"),
+}
+
+# value, JSON path of the value, error list -> whether the value is valid
+Check = Callable[[Any, str, List[str]], bool]
+
+
+def prompt_template(prompt: str) -> Optional[Dict[str, Any]]:
+    """The example object a prompt asks for ("Return your response in this exact JSON format: {...}")"""
+    start = prompt.find("{", prompt.find("JSON format"))
+    end = prompt.rfind("}") + 1
+    if start != -1 and end > start:
+        try:
+            value = json.loads(prompt[start:end])
+        except ValueError:
+            return None
+        return value if isinstance(value, dict) else None
+    return None
+
+
+def schema_from_template(template: Any) -> Dict[str, Any]:
+    """JSON Schema for the shape of an example value
+
+    Every key of an example object is required, and the first element of an
+    example array describes all of its items. The example's strings are
+    placeholders, so only their type is kept.
+    """
+    if isinstance(template, dict):
+        return {
+            "type": "object",
+            "properties": {key: schema_from_template(value) for key, value in template.items()},
+            "required": list(template),
+        }
+    if isinstance(template, list):
+        return {"type": "array", "items": schema_from_template(template[0])} if template else {"type": "array"}
+    if isinstance(template, bool):
+        return {"type": "boolean"}
+    if isinstance(template, (int, float)):
+        return {"type": "number"}
+    if isinstance(template, str):
+        return {"type": "string"}
+    return {}
+
+
+def _is_type(value: Any, name: str) -> bool:
+    # bool is an int in Python but not a number in JSON
+    if isinstance(value, bool) and name in ("number", "integer"):
+        return False
+    return isinstance(value, _TYPES[name])
+
+
+def _type_name(value: Any) -> str:
+    for name in ("null", "boolean", "integer", "number", "string", "array", "object"):
+        if _is_type(value, name):
+            return name
+    return type(value).__name__
+
+
+def _compile(schema: Any, where: str) -> Check:
+    """Turn a schema into a tree of closures, checking the schema itself once up front"""
+    if schema is True or schema == {}:
+        return lambda value, path, errors: True
+    if not isinstance(schema, dict):
+        raise ValueError(f"{where}: a schema must be an object, got {schema!r}")
+    unsupported = sorted(set(schema) - _KEYWORDS)
+    if unsupported:
+        raise ValueError(f"{where}: unsupported schema keywords {unsupported}")
+
+    checks: List[Check] = []
+    check_type: Optional[Check] = None
+    if "type" in schema:
+        types = [schema["type"]] if isinstance(schema["type"], str) else list(schema["type"])
+        unknown = [name for name in types if name not in _TYPES]
+        if unknown:
+            raise ValueError(f"{where}: unknown types {unknown}")
+        check_type = _type_check(types)
+
+    if "enum" in schema:
+        options = list(schema["enum"])
+
+        def check_enum(value, path, errors):
+            if value in options:
+                return True
+            errors.append(f"{path}: {value!r} is not one of {options}")
+            return False
+        checks.append(check_enum)
+
+    for keyword, (applies_to, measure, within, message) in _BOUNDS.items():
+        if keyword in schema:
+            checks.append(_bound_check(schema[keyword], applies_to, measure, within, message))
+
+    if {"properties", "required", "additionalProperties"} & set(schema):
+        properties = {name: _compile(sub, f"{where}.{name}") for name, sub in schema.get("properties", {}).items()}
+        required = list(schema.get("required", []))
+        extra = schema.get("additionalProperties", True)
+        check_extra = _compile(extra, f"{where}.*") if isinstance(extra, dict) else None
+
+        def check_object(value, path, errors):
+            if not isinstance(value, dict):
+                return True
+            valid = True
+            for name in required:
+                if name not in value:
+                    errors.append(f"{path}: missing required property '{name}'")
+                    valid = False
+            for name, item in value.items():
+                check = properties.get(name, check_extra)
+                if check is not None:
+                    valid = check(item, f"{path}.{name}", errors) and valid
+                elif extra is False:
+                    errors.append(f"{path}: unexpected property '{name}'")
+                    valid = False
+            return valid
+        checks.append(check_object)
+
+    if "items" in schema:
+        check_item = _compile(schema["items"], f"{where}[]")
+
+        def check_array(value, path, errors):
+            if not isinstance(value, list):
+                return True
+            valid = True
+            for i, item in enumerate(value):
+                valid = check_item(item, f"{path}[{i}]", errors) and valid
+            return valid
+        checks.append(check_array)
+
+    def check(value, path, errors):
+        # A type mismatch makes the remaining checks meaningless; the others all report
+        if check_type is not None and not check_type(value, path, errors):
+            return False
+        valid = True
+        for step in checks:
+            valid = step(value, path, errors) and valid
+        return valid
+    return check
+
+
+def _type_check(types: List[str]) -> Check:
+    def check(value, path, errors):
+        if any(_is_type(value, name) for name in types):
+            return True
+        errors.append(f"{path}: expected {' or '.join(types)}, got {_type_name(value)}")
+        return False
+    return check
+
+
+def _bound_check(bound: float, applies_to: Any, measure: Callable, within: Callable, message: str) -> Check:
+    def check(value, path, errors):
+        if not isinstance(value, applies_to) or isinstance(value, bool) or within(measure(value), bound):
+            return True
+        errors.append(f"{path}: expected {message.format(bound)}, got {measure(value)}")
+        return False
+    return check
+
+
+class SchemaValidator:
+    """A JSON Schema compiled once into closures, then applied to any number of responses
+
+    Covers the subset of JSON Schema that describes response shapes (type,
+    enum, properties, required, additionalProperties, items and length and
+    range bounds). Unsupported keywords are rejected at compile time
+    rather than silently ignored.
+    """
+
+    def __init__(self, schema: Dict[str, Any]):
+        self.schema = schema
+        self._check = _compile(schema, "$")
+
+    def errors(self, value: Any) -> List[str]:
+        """Every way the value breaks the schema, as `$.path: problem` messages"""
+        errors: List[str] = []
+        self._check(value, "$", errors)
+        return errors
+
+    def is_valid(self, value: Any) -> bool:
+        return self._check(value, "$", [])
+
+
+@lru_cache(maxsize=256)
+def _compiled(canonical: str) -> SchemaValidator:
+    return SchemaValidator(json.loads(canonical))
+
+
+def compile_schema(schema: Dict[str, Any]) -> SchemaValidator:
+    """The compiled validator for a schema, shared by every caller using an equal schema"""
+    return _compiled(json.dumps(schema, sort_keys=True))
+
+
+def to_gemini_schema(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """The same shape in the OpenAPI subset Gemini's response_schema accepts
+
+    Gemini has no additionalProperties or length bounds; those are still
+    enforced by the validator after the call.
+    """
+    converted: Dict[str, Any] = {}
+    types = schema.get("type")
+    if isinstance(types, list):
+        non_null = [name for name in types if name != "null"]
+        if len(non_null) != len(types):
+            converted["nullable"] = True
+        types = non_null[0] if non_null else None
+    if types is not None:
+        converted["type"] = types.upper()
+    for keyword in ("description", "enum", "required", "minItems", "maxItems"):
+        if keyword in schema:
+            converted[keyword] = schema[keyword]
+    if "properties" in schema:
+        converted["properties"] = {name: to_gemini_schema(sub) for name, sub in schema["properties"].items()}
+    if "items" in schema:
+        converted["items"] = to_gemini_schema(schema["items"])
+    return converted
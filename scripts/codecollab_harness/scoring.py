@@ -0,0 +1,107 @@
+import re
+from functools import lru_cache
+from typing import Dict, Any, List, NamedTuple, Sequence, Tuple
+
+# Words that appear in almost every criterion or response and say nothing
+# about whether the criterion is met
+STOP_WORDS = frozenset("""
+    a an and are as at be by for from has have in includes include including into is it
+    its of on or proper properly provides the to uses use using with contains
+""".split())
+
+# Offsets kept per criterion; hit counts are always exact
+MAX_POSITIONS = 10
+
+_WORD = re.compile(r"[a-z0-9]+(?:[-'][a-z0-9]+)*")
+
+
+class CriterionMatch(NamedTuple):
+    criterion: str
+    keywords: Tuple[str, ...]
+    hits: int
+    positions: List[int]
+
+    @property
+    def met(self) -> bool:
+        return self.hits > 0
+
+
+def words(text: str) -> List[str]:
+    """Lowercased words of a text; hyphenated words and contractions stay whole"""
+    return _WORD.findall(text.lower())
+
+
+def criterion_keywords(criterion: str) -> Tuple[str, ...]:
+    """Significant words of a criterion, falling back to all of them if every word is a stop word"""
+    found = words(criterion)
+    keywords = tuple(dict.fromkeys(word for word in found if word not in STOP_WORDS))
+    return keywords or tuple(dict.fromkeys(found))
+
+
+class CriteriaMatcher:
+    """Match every keyword of a test's evaluation criteria in a single pass over a response
+
+    All keywords are compiled into one case-insensitive alternation anchored
+    at word starts, longest first. A keyword matches as a word prefix, so
+    "test" also counts "tests" and "testing". When a longer keyword wins at a
+    position, every shorter keyword that is a prefix of it is credited too.
+    The response is scanned once however many criteria there are.
+    """
+
+    def __init__(self, criteria: Sequence[str]):
+        self.criteria = tuple(criteria)
+        self.keywords = [criterion_keywords(criterion) for criterion in self.criteria]
+
+        owners: Dict[str, set] = {}
+        for index, keywords in enumerate(self.keywords):
+            for keyword in keywords:
+                owners.setdefault(keyword, set()).add(index)
+
+        # For each keyword, the criteria satisfied when it matches: its own
+        # plus those of any shorter keyword it starts with
+        self._credits: Dict[str, Tuple[int, ...]] = {}
+        for keyword in owners:
+            credited = set()
+            for other, indexes in owners.items():
+                if keyword.startswith(other):
+                    credited |= indexes
+            self._credits[keyword] = tuple(sorted(credited))
+
+        alternatives = sorted(owners, key=len, reverse=True)
+        self._pattern = (
+            re.compile(r"(?<![a-z0-9])(?:" + "|".join(map(re.escape, alternatives)) + ")", re.IGNORECASE)
+            if alternatives else None
+        )
+
+    def match(self, text: str) -> List[CriterionMatch]:
+        hits = [0] * len(self.criteria)
+        positions: List[List[int]] = [[] for _ in self.criteria]
+        if self._pattern is not None:
+            credits = self._credits
+            for found in self._pattern.finditer(text):
+                for index in credits[found.group().lower()]:
+                    hits[index] += 1
+                    if len(positions[index]) < MAX_POSITIONS:
+                        positions[index].append(found.start())
+        return [
+            CriterionMatch(criterion, keywords, count, offsets)
+            for criterion, keywords, count, offsets in zip(self.criteria, self.keywords, hits, positions)
+        ]
+
+
+@lru_cache(maxsize=256)
+def compile_criteria(criteria: Tuple[str, ...]) -> CriteriaMatcher:
+    """Shared, compiled matcher for a set of criteria (tests reuse the same list on every run)"""
+    return CriteriaMatcher(criteria)
+
+
+def match_criteria(criteria: Sequence[str], text: str) -> List[CriterionMatch]:
+    return compile_criteria(tuple(criteria)).match(text)
+
+
+def summarize_matches(matches: List[CriterionMatch]) -> List[Dict[str, Any]]:
+    """JSON-friendly per-criterion hit counts and positions"""
+    return [
+        {"criterion": m.criterion, "hits": m.hits, "positions": m.positions, "met": m.met}
+        for m in matches
+    ]
@@ -0,0 +1,73 @@
+import hashlib
+from typing import Dict, Any, Iterable, List, Optional, Set, Tuple
+
+from .faults import PARSE
+from .results_io import iter_records
+
+
+def cell_key(agent: str, test: str) -> str:
+    """Identity of a test cell across runs, shards and checkpoints"""
+    return f"{agent}/{test}"
+
+
+def shard_of(key: str, count: int) -> int:
+    """1-based shard a cell belongs to
+
+    Assignment hashes the cell's identity, so it does not depend on the order
+    or number of other cells: adding a scenario never moves existing cells.
+    """
+    digest = hashlib.sha256(key.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % count + 1
+
+
+def select_shard(cases: Iterable[Any], index: int, count: int) -> List[Any]:
+    """The cases (anything with .agent and .test) that belong to shard index of count"""
+    return [case for case in cases if shard_of(cell_key(case.agent, case.test), count) == index]
+
+
+def is_complete(result: Dict[str, Any]) -> bool:
+    """Whether a checkpointed result stands, or its cell should run again on resume
+
+    Answers count even when they are unparseable; timeouts, quota and
+    transport errors and skipped cells are retried.
+    """
+    error = result.get("error")
+    return not result.get("skipped") and (error is None or error["kind"] == PARSE)
+
+
+def load_checkpoint(path: str) -> Dict[str, Dict[str, Any]]:
+    """Completed results in a JSONL results file, by cell key; later records win"""
+    completed = {}
+    for record in iter_records(path):
+        if record.get("type") != "result":
+            continue
+        record.pop("type")
+        key = cell_key(record["agent"], record["test"])
+        if is_complete(record):
+            completed[key] = record
+        else:
+            completed.pop(key, None)
+    return completed
+
+
+def collect_shards(paths: Iterable[str]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], List[int]]:
+    """Results and run records from shard output files, plus the shard indices that are missing
+
+    Results are deduplicated by cell key, the last record of a cell winning
+    (a resumed shard appends its reruns after the original attempts).
+    """
+    results: Dict[str, Dict[str, Any]] = {}
+    runs = []
+    for path in paths:
+        for record in iter_records(path):
+            kind = record.pop("type", None)
+            if kind == "run":
+                runs.append({**record, "path": path})
+            elif kind == "result":
+                results[cell_key(record["agent"], record["test"])] = record
+
+    counts: Set[int] = {run["shard"][1] for run in runs if run.get("shard")}
+    seen = {run["shard"][0] for run in runs if run.get("shard")}
+    shard_count: Optional[int] = max(counts) if counts else None
+    missing = [i for i in range(1, shard_count + 1) if i not in seen] if shard_count else []
+    return list(results.values()), runs, missing
@@ -0,0 +1,235 @@
+import os
+import json
+import zlib
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+from .scoring import words
+
+# Golden reference answers live next to the specs: golden/<scenario>.json
+GOLDEN_DIR_NAME = "golden"
+
+# Hashed feature space: word unigrams and bigrams folded into this many columns
+DIMENSIONS = 1 << 13
+# Response rows vectorized and compared per matrix product, bounding memory to ~32 MB
+CHUNK_ROWS = 1024
+# Field name of the row holding a whole response
+DOCUMENT = ""
+# Odd 64-bit constant mixing a bigram's first word hash before combining it with the second
+_BIGRAM_MULTIPLIER = 0x9E3779B97F4A7C15
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise RuntimeError("reference similarity scoring needs numpy: pip install numpy") from None
+    return numpy
+
+
+def golden_dir(spec_dir: str) -> str:
+    return os.path.join(spec_dir, GOLDEN_DIR_NAME)
+
+
+def flatten_text(value: Any) -> str:
+    """The text of a JSON value: its strings, numbers and booleans, one per line"""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, dict):
+        return "\n".join(flatten_text(item) for item in value.values())
+    if isinstance(value, list):
+        return "\n".join(flatten_text(item) for item in value)
+    return "" if value is None else json.dumps(value)
+
+
+@lru_cache(maxsize=1 << 16)
+def _word_hash(word: str) -> int:
+    # crc32 is stable across processes, unlike hash() on str
+    return zlib.crc32(word.encode("utf-8"))
+
+
+def features(text: str):
+    """Hashed column of every word and word bigram in a text, as a NumPy array
+
+    Words are hashed once each (and memoized); bigram hashes are combined
+    from their words' hashes in NumPy.
+    """
+    np = _numpy()
+    tokens = words(text)
+    hashes = np.fromiter(map(_word_hash, tokens), dtype=np.uint64, count=len(tokens))
+    bigrams = (hashes[:-1] * _BIGRAM_MULTIPLIER) ^ hashes[1:]
+    return np.concatenate((hashes, bigrams)) % DIMENSIONS
+
+
+def load_golden(directory: str) -> Dict[str, List[Any]]:
+    """Reference answers per scenario, from every golden/<scenario>.json file"""
+    if not os.path.isdir(directory):
+        return {}
+    golden = {}
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".json"):
+            with open(os.path.join(directory, name), "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("references"):
+                golden[data["test"]] = data["references"]
+    return golden
+
+
+def add_golden(directory: str, scenario: str, references: Sequence[Any], limit: Optional[int] = None) -> int:
+    """Append reference answers to a scenario's golden file, skipping duplicates; returns how many were added
+
+    With `limit` only the newest `limit` references are kept.
+    """
+    path = os.path.join(directory, f"{scenario}.json")
+    existing: List[Any] = []
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            existing = json.load(f).get("references", [])
+    seen = {json.dumps(reference, sort_keys=True) for reference in existing}
+    added = 0
+    for reference in references:
+        canonical = json.dumps(reference, sort_keys=True)
+        if canonical not in seen:
+            seen.add(canonical)
+            existing.append(reference)
+            added += 1
+    if limit is not None:
+        existing = existing[-limit:]
+    os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"test": scenario, "references": existing}, f, indent=2)
+        f.write("\n")
+    return added
+
+
+def _field_features(value: Any, fields: Sequence[str]) -> Dict[str, Any]:
+    """Features of each reference field a response has (top-level JSON keys), and of the whole response
+
+    An object's whole-response row reuses the features of all its keys'
+    values rather than tokenizing the response a second time.
+    """
+    if not isinstance(value, dict):
+        return {DOCUMENT: features(flatten_text(value))}
+    np = _numpy()
+    by_key = {key: features(flatten_text(item)) for key, item in value.items()}
+    found = {field: by_key[field] for field in fields if field != DOCUMENT and field in by_key}
+    found[DOCUMENT] = np.concatenate(list(by_key.values())) if by_key else features("")
+    return found
+
+
+class ReferenceIndex:
+    """Golden answers vectorized once into a TF-IDF matrix, compared to responses in batches
+
+    Every reference contributes one row for the whole answer and one per
+    top-level JSON field. Rows are sublinear term counts over hashed word
+    unigrams and bigrams, weighted by inverse document frequency across all
+    reference rows and L2-normalized, so a matrix product gives cosine
+    similarities. The references are one float32 matrix with each
+    (scenario, field) in a contiguous block; responses are vectorized in
+    chunks, and each chunk's rows are multiplied with their block only.
+    Each response field keeps its best match among the same scenario's
+    references for the same field.
+    """
+
+    def __init__(self, golden: Dict[str, List[Any]]):
+        np = _numpy()
+        self.fields: Dict[str, List[str]] = {}
+        self._keys: Dict[Tuple[str, str], int] = {}
+        rows, keys = [], []
+        for scenario, references in golden.items():
+            fields = [DOCUMENT] + sorted({key for reference in references if isinstance(reference, dict)
+                                         for key in reference})
+            self.fields[scenario] = fields
+            for field in fields:
+                self._keys[(scenario, field)] = len(self._keys)
+            for reference in references:
+                for field, row in _field_features(reference, fields).items():
+                    rows.append(row)
+                    keys.append(self._keys[(scenario, field)])
+
+        document_frequency = np.zeros(DIMENSIONS, dtype=np.float32)
+        for row in rows:
+            document_frequency[np.unique(row)] += 1
+        self.idf = (np.log((1 + len(rows)) / (1 + document_frequency)) + 1).astype(np.float32)
+        # Rows grouped by (scenario, field), so each group's references are one contiguous block
+        order = np.argsort(np.array(keys, dtype=np.int32), kind="stable")
+        self.matrix = self._vectorize([rows[i] for i in order])
+        self.row_keys = np.array(keys, dtype=np.int32)[order]
+        self._bounds = np.searchsorted(self.row_keys, np.arange(len(self._keys) + 1))
+
+    def __contains__(self, scenario: str) -> bool:
+        return scenario in self.fields
+
+    def _vectorize(self, rows: List[Any]):
+        """L2-normalized TF-IDF rows (float32) for arrays of hashed features
+
+        Weights are computed on the distinct (row, column) cells only and
+        scattered into a zeroed matrix, so the cost follows the text length,
+        not rows × DIMENSIONS.
+        """
+        np = _numpy()
+        row_index = np.repeat(np.arange(len(rows), dtype=np.int64), [len(row) for row in rows])
+        columns = np.concatenate(rows).astype(np.int64) if rows else np.zeros(0, dtype=np.int64)
+        cells, counts = np.unique(row_index * DIMENSIONS + columns, return_counts=True)
+        weights = np.log1p(counts, dtype=np.float32) * self.idf[cells % DIMENSIONS]
+        norms = np.sqrt(np.bincount(cells // DIMENSIONS, weights=weights * weights, minlength=len(rows)))
+        weights /= norms[cells // DIMENSIONS].astype(np.float32)
+        matrix = np.zeros((len(rows), DIMENSIONS), dtype=np.float32)
+        matrix.ravel()[cells] = weights
+        return matrix
+
+    def score(self, items: Sequence[Tuple[str, Any]]) -> List[Optional[Dict[str, Any]]]:
+        """Similarity of each (scenario, parsed response) to the scenario's references
+
+        Returns, per item, the best cosine similarity of the whole response
+        and of each reference field (0 for a field the response lacks), and
+        `score`, the mean over the fields, or the whole-response similarity
+        when the references are not JSON objects. Items whose scenario has
+        no references get None.
+        """
+        np = _numpy()
+        rows, keys, owners = [], [], []
+        for index, (scenario, value) in enumerate(items):
+            if scenario not in self.fields:
+                continue
+            for field, row in _field_features(value, self.fields[scenario]).items():
+                rows.append(row)
+                keys.append(self._keys[(scenario, field)])
+                owners.append((index, field))
+
+        # Only the same scenario's references for the same field count, so rows are
+        # sorted by (scenario, field) and each run of them is multiplied by its own block
+        order = np.argsort(np.array(keys, dtype=np.int32), kind="stable")
+        sorted_keys = np.array(keys, dtype=np.int32)[order]
+        best = np.empty(len(rows), dtype=np.float32)
+        for start in range(0, len(rows), CHUNK_ROWS):
+            chunk = self._vectorize([rows[i] for i in order[start:start + CHUNK_ROWS]])
+            chunk_keys = sorted_keys[start:start + CHUNK_ROWS]
+            runs = np.flatnonzero(np.diff(chunk_keys)) + 1
+            for first, end in zip(np.concatenate(([0], runs)), np.concatenate((runs, [len(chunk)]))):
+                key = chunk_keys[first]
+                references = self.matrix[self._bounds[key]:self._bounds[key + 1]]
+                best[order[start + first:start + end]] = (chunk[first:end] @ references.T).max(axis=1)
+
+        scores: List[Optional[Dict[str, Any]]] = [None] * len(items)
+        for (index, field), value in zip(owners, best.tolist()):
+            if scores[index] is None:
+                scenario = items[index][0]
+                scores[index] = {"document": 0.0, "fields": {f: 0.0 for f in self.fields[scenario] if f != DOCUMENT}}
+            similarity = round(max(value, 0.0), 4)
+            if field == DOCUMENT:
+                scores[index]["document"] = similarity
+            else:
+                scores[index]["fields"][field] = similarity
+        for score in scores:
+            if score is not None:
+                fields = score["fields"]
+                score["score"] = round(sum(fields.values()) / len(fields), 4) if fields else score["document"]
+        return scores
+
+
+@lru_cache(maxsize=8)
+def load_index(directory: str) -> Optional[ReferenceIndex]:
+    """The reference index of a golden directory, built once per process; None when it has no references"""
+    golden = load_golden(directory)
+    return ReferenceIndex(golden) if golden else None
@@ -0,0 +1,71 @@
+import time
+import threading
+from typing import Dict, Any, Iterable, List, Optional
+
+from .backends import ModelResponse, StreamItem
+from .json_extract import JSONExtractor
+from .usage import TokenUsage, estimate_tokens
+
+
+def _stream_metrics(started_at: float, chunk_times: List[float], completion_tokens: int) -> Dict[str, Any]:
+    finished_at = chunk_times[-1] if chunk_times else time.perf_counter()
+    gaps = [later - earlier for earlier, later in zip(chunk_times, chunk_times[1:])]
+    generation_time = finished_at - chunk_times[0] if chunk_times else 0.0
+
+    return {
+        "time_to_first_token": chunk_times[0] - started_at if chunk_times else None,
+        "generation_time": generation_time,
+        "total_time": finished_at - started_at,
+        "chunk_count": len(chunk_times),
+        "mean_inter_chunk_gap": sum(gaps) / len(gaps) if gaps else 0.0,
+        "max_inter_chunk_gap": max(gaps) if gaps else 0.0,
+        # A single-chunk response has no measurable generation phase
+        "tokens_per_second": completion_tokens / generation_time if generation_time > 0 else None,
+    }
+
+
+def consume_stream(chunks: Iterable[StreamItem], model: str, started_at: float,
+                   abort_on_invalid: bool = False, cancel: Optional[threading.Event] = None) -> ModelResponse:
+    """Read a response stream, timing every chunk and extracting its JSON object as it arrives
+
+    `started_at` is the perf_counter() reading taken before the request was
+    sent, so time_to_first_token includes connection and queueing time.
+    With abort_on_invalid the stream is closed as soon as the response's JSON
+    object is provably broken and nothing later in it could replace that
+    object, saving the rest of the generation. The parsed object is
+    returned on the response so nothing downstream has to parse it again.
+    Setting `cancel` (the scheduler does on timeout or a lost hedge) stops
+    reading and closes the stream at the next chunk.
+    """
+    extractor = JSONExtractor()
+    parts: List[str] = []
+    chunk_times: List[float] = []
+    usage = None
+    aborted = False
+
+    iterator = iter(chunks)
+    try:
+        for chunk in iterator:
+            if cancel is not None and cancel.is_set():
+                aborted = True
+                break
+            if isinstance(chunk, TokenUsage):
+                usage = chunk
+                continue
+            chunk_times.append(time.perf_counter())
+            parts.append(chunk)
+            extractor.feed(chunk)
+            if abort_on_invalid and extractor.broken:
+                aborted = True
+                break
+    finally:
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            close()
+
+    text = "".join(parts)
+    # Throughput uses the provider's token count when it reports one
+    metrics = _stream_metrics(started_at, chunk_times, usage.completion_tokens if usage else estimate_tokens(text))
+    metrics["json_structure_error"] = extractor.error
+    metrics["aborted"] = aborted
+    return ModelResponse(text, model, stream_metrics=metrics, aborted=aborted, parsed_json=extractor.finish(), usage=usage)
@@ -0,0 +1,953 @@
+import time
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+
+from .agent_config import AgentConfig, DEFAULT_MODEL, load_agents, resolve_agent
+from .artifacts import ArtifactValidator, extract_artifacts, summarize_artifacts
+from .backends import ModelBackend, create_live_backend
+from .bench import AdaptiveSampler, answered, summarize_trials
+from .cache import ResponseCache
+from .faults import ERROR_KINDS, INTERNAL, PARSE, QUOTA, TIMEOUT, TRANSPORT, DeadlineReached, error_record, error_result
+from .json_extract import ParseCache
+from .matrix import SPEC_DIR, MatrixAxes, TestCase, TestSpec, expand_matrix, fastest_passing, format_fastest_table, load_specs
+from .profiling import Profiler
+from .schema import MAX_SCHEMA_ERRORS, RESPONSE_SCHEMA_KEY, compile_schema
+from .rescore import aggregate_regressions, iter_result_files, load_detailed_results, run_timestamp
+from .results_io import ResultWriter, slim_result
+from .scheduler import ModelScheduler, summarize_scheduling
+from .scoring import match_criteria, summarize_matches
+from .sharding import cell_key, collect_shards, select_shard
+from .similarity import ReferenceIndex, golden_dir, load_index
+from .streaming import consume_stream
+from .usage import MODEL_PRICING, estimate_usage, summarize_usage, usage_record
+from .workflow import Workflow, WorkflowStep, execute_workflow, summarize_workflow, workflow_from_breakdown
+
+
+# Latency budgets used when scoring responses. Streaming runs are judged on
+# time to first token and generation throughput, which do not penalise an
+# agent for producing a long answer; blocking runs only have the total time.
+RESPONSE_TIME_THRESHOLD = 30.0
+TIME_TO_FIRST_TOKEN_THRESHOLD = 5.0
+MIN_TOKENS_PER_SECOND = 20.0
+
+# A streamed call is output-bound when generating tokens takes at least this
+# share of its latency and it produced at least this many output tokens
+OUTPUT_BOUND_SHARE = 0.6
+OUTPUT_HEAVY_TOKENS = 1000
+
+
+class CodeCollabAITester:
+    def __init__(self, api_key: Optional[str] = None, cache: Optional[ResponseCache] = None,
+                 backend: Optional[ModelBackend] = None, agents: Optional[Dict[str, AgentConfig]] = None,
+                 stream: bool = False, abort_invalid_streams: bool = False,
+                 pricing: Optional[Dict[str, Tuple[float, float]]] = None,
+                 scheduler: Optional[ModelScheduler] = None, test_timeout: Optional[float] = None,
+                 spec_dir: str = SPEC_DIR, axes: MatrixAxes = MatrixAxes(),
+                 profiler: Optional[Profiler] = None, structured: bool = False,
+                 artifact_validator: Optional[ArtifactValidator] = None):
+        """Initialize the tester with a model backend (Gemini by default) and an optional response cache
+        
+        Tests are the scenarios in `spec_dir`, expanded into a matrix of
+        agents × models × temperatures × prompt variants (`axes` overrides
+        the axes set in the spec files).
+        
+        `agents` is the agent table from lib/ai/config.ts. When given, each test
+        runs on its agent's model and temperature by default; otherwise every
+        test uses DEFAULT_MODEL with the provider's default generation config.
+        
+        With `stream` every call consumes the response as a stream and records
+        time to first token, inter-chunk gaps and throughput. Adding
+        `abort_invalid_streams` stops reading once the JSON is provably broken.
+        
+        `pricing` maps model names to USD per million input/output tokens for
+        cost estimates (defaults to MODEL_PRICING).
+        
+        Every backend call goes through `scheduler`, which applies per-model
+        rate limits, retries transient errors and enforces call timeouts. The
+        default scheduler only retries.
+        
+        `test_timeout` bounds each test, retries included; a test that runs
+        out of time is cancelled and recorded as a timeout error result.
+        
+        An enabled `profiler` records spans for each harness phase (prompt
+        build, cache, network, first byte, parse, scoring, write).
+        
+        A response passes when it contains a JSON object matching its test's
+        response schema. With `structured` the schema is also sent to the
+        model as a structured-output constraint.
+        
+        The code and config a passing response carries (the fields its spec
+        declares under "artifacts") are checked by `artifact_validator`; the
+        default one checks inline and memoizes verdicts in .codecollab_artifacts.
+        """
+        self.backend = backend or create_live_backend(api_key)
+        self.agents = agents or {}
+        self.cache = cache
+        self.stream = stream
+        self.abort_invalid_streams = abort_invalid_streams
+        self.pricing = pricing or MODEL_PRICING
+        self.scheduler = scheduler or ModelScheduler()
+        self.test_timeout = test_timeout
+        self.spec_dir = spec_dir
+        self.axes = axes
+        self.profiler = profiler or Profiler()
+        self.structured = structured
+        self.artifacts = artifact_validator or ArtifactValidator(workers=0)
+        # Specs by scenario, loaded when a schema or artifact list is first needed
+        self._specs: Optional[Dict[str, TestSpec]] = None
+        # Deadline of the test running on the current thread, and of the whole suite
+        self._local = threading.local()
+        self._suite_deadline: Optional[float] = None
+        self._parse_cache = ParseCache()
+        # Set once golden answers turn out to be unusable (numpy is missing)
+        self._references_unavailable = False
+    
+    def close(self) -> None:
+        """Stop the artifact checkers' workers and cancel the model calls still running, e.g. those abandoned on a timeout"""
+        self.artifacts.close()
+        self.scheduler.shutdown()
+    
+    def _model_for(self, agent_id: str) -> Tuple[str, Dict[str, Any]]:
+        """Pick the model name and generation config for an agent"""
+        agent = resolve_agent(self.agents, agent_id)
+        if agent is None:
+            return DEFAULT_MODEL, {}
+        generation_config = {"temperature": agent.temperature} if agent.temperature is not None else {}
+        return agent.model, generation_config
+    
+    def _call_backend(self, model: str, prompt: str, generation_config: Dict[str, Any]):
+        """Make one model call through the scheduler, recording its attempts and retries"""
+        response, scheduling = self.scheduler.call(
+            model, lambda cancel: self._request(model, prompt, generation_config, cancel),
+            deadline=getattr(self._local, "deadline", None)
+        )
+        return response._replace(scheduling=scheduling)
+    
+    def _request(self, model: str, prompt: str, generation_config: Dict[str, Any], cancel=None):
+        """Send one request to the backend, streaming it when stream mode is on"""
+        if not self.stream:
+            with self.profiler.span("network", model=model):
+                return self.backend.generate(model, prompt, generation_config)
+        
+        started_at = time.perf_counter()
+        with self.profiler.span("network", model=model, stream=True):
+            response = consume_stream(
+                self.backend.stream(model, prompt, generation_config), model, started_at,
+                abort_on_invalid=self.abort_invalid_streams, cancel=cancel
+            )
+        first_token = response.stream_metrics["time_to_first_token"]
+        if first_token is not None:
+            self.profiler.add_span("first_byte", started_at, started_at + first_token, model=model)
+        # The stream was parsed while it arrived; validation and scoring reuse that result
+        self._parse_cache.put(response.text, response.parsed_json)
+        return response
+    
+    def _generate_content(self, model: str, prompt: str, generation_config: Dict[str, Any]):
+        """Send a prompt to a model, going through the response cache when one is configured"""
+        if self.cache is None:
+            return self._call_backend(model, prompt, generation_config)
+        
+        # Includes the backend call on a miss; "network" spans nest inside it
+        with self.profiler.span("cache", mode=self.cache.mode):
+            return self.cache.get_or_generate(
+                model, prompt, generation_config,
+                lambda: self._call_backend(model, prompt, generation_config)
+            )
+        
+    def _case_fields(self, case: TestCase) -> Dict[str, Any]:
+        """Fields identifying a matrix cell on its result"""
+        return {
+            "agent": case.agent,
+            "test": case.test,
+            "scenario": case.scenario,
+            "model": case.model,
+            "temperature": case.temperature,
+            "variant": case.variant,
+            "quality_bar": case.quality_bar,
+        }
+    
+    def _run_case(self, case: TestCase) -> Dict[str, Any]:
+        """Run one matrix cell: send its prompt to its model and collect the raw result"""
+        generation_config = case.generation_config
+        if self.structured and case.response_schema is not None:
+            generation_config = {**generation_config, RESPONSE_SCHEMA_KEY: case.response_schema}
+        start_time = time.perf_counter()
+        response = self._generate_content(case.model, case.prompt, generation_config)
+        response_time = time.perf_counter() - start_time
+        with self.profiler.span("parse"):
+            success = self._validate_json_response(response.text, case.response_schema)
+        
+        return {
+            **self._case_fields(case),
+            "prompt": case.prompt,
+            "response": response.text,
+            "response_time": response_time,
+            **self._response_metadata(response),
+            "success": success,
+            "evaluation_criteria": case.evaluation_criteria,
+        }
+    
+    def _response_metadata(self, response) -> Dict[str, Any]:
+        """Per-call measurements every test copies from its response into the result"""
+        return {
+            "stream_metrics": response.stream_metrics,
+            "cached": getattr(response, "cached", False),
+            "scheduling": getattr(response, "scheduling", None),
+            # Raw token counts; _account_usage turns them into the public `usage` field
+            "_usage": response.usage,
+        }
+    
+    def _account_usage(self, result: Dict[str, Any]) -> None:
+        """Attach token counts, output tokens/sec and estimated cost to a result"""
+        usage = result.pop("_usage", None) or estimate_usage(result["prompt"], result["response"])
+        result["usage"] = usage_record(result["model"], usage, result["response_time"], self.pricing,
+                                       cached=result.get("cached", False))
+    
+    def _validate_json_response(self, response: str, schema: Optional[Dict[str, Any]] = None) -> bool:
+        """Validate that the response contains a JSON object, matching `schema` when given"""
+        parsed = self._parse_cache.get(response)
+        return parsed is not None and (schema is None or compile_schema(schema).is_valid(parsed))
+    
+    def _spec(self, result: Dict[str, Any]) -> Optional[TestSpec]:
+        """The spec of the scenario a result belongs to (archived results are matched by name)"""
+        if self._specs is None:
+            self._specs = {spec.test: spec for spec in load_specs(self.spec_dir)}
+        return self._specs.get(result.get("scenario") or result["test"])
+    
+    def _response_schema(self, result: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        spec = self._spec(result)
+        return spec.response_schema if spec is not None else None
+    
+    def _schema_errors(self, result: Dict[str, Any]) -> List[str]:
+        """How a result's parsed response breaks its scenario's schema"""
+        schema = self._response_schema(result)
+        if schema is None:
+            return []
+        return compile_schema(schema).errors(self._parsed_response(result))
+    
+    def _extract_json_from_response(self, response: str) -> Dict[str, Any]:
+        """Extract and parse JSON from response"""
+        return self._parse_cache.get(response) or {}
+    
+    def _parsed_response(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Parsed JSON for a result, cached on the result dict under `_parsed_json`"""
+        if "_parsed_json" not in result:
+            result["_parsed_json"] = self._extract_json_from_response(result["response"])
+        return result["_parsed_json"]
+    
+    def _is_latency_acceptable(self, result: Dict[str, Any]) -> bool:
+        """Judge latency on first token and throughput when streamed, on total time otherwise"""
+        metrics = result.get("stream_metrics")
+        if not metrics or metrics.get("time_to_first_token") is None:
+            return result["response_time"] < RESPONSE_TIME_THRESHOLD
+        
+        tokens_per_second = metrics.get("tokens_per_second")
+        return (
+            metrics["time_to_first_token"] < TIME_TO_FIRST_TOKEN_THRESHOLD
+            and (tokens_per_second is None or tokens_per_second >= MIN_TOKENS_PER_SECOND)
+        )
+    
+    def _evaluate_response_quality(self, result: Dict[str, Any], similarity: Optional[Dict[str, Any]] = None,
+                                   artifacts: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Evaluate the quality of AI response based on criteria, its golden answers and its checked artifacts"""
+        evaluation = {
+            "json_valid": result["success"],
+            "response_time_acceptable": self._is_latency_acceptable(result),
+            "criteria_met": 0,
+            "total_criteria": len(result.get("evaluation_criteria", [])),
+            "quality_score": 0
+        }
+        
+        if result["success"]:
+            parsed_response = self._parsed_response(result)
+            criteria = result.get("evaluation_criteria", [])
+            
+            # Check how many criteria are likely met based on response content,
+            # scanning the response once for the keywords of every criterion
+            matches = match_criteria(criteria, result["response"])
+            evaluation["criteria_met"] = sum(1 for match in matches if match.met)
+            evaluation["criteria_matches"] = summarize_matches(matches)
+        if similarity is not None:
+            evaluation["reference_similarity"] = similarity
+        if artifacts is not None:
+            evaluation["artifacts"] = artifacts
+        
+        # Calculate quality score (0-100)
+        if evaluation["total_criteria"] > 0:
+            # Golden answers and checked artifacts each take a third of the criteria's weight
+            similarity_weight = 20 if self._has_references(result) else 0
+            artifact_weight = 20 if artifacts is not None and artifacts["checked"] else 0
+            criteria_weight = 60 - similarity_weight - artifact_weight
+            criteria_score = (evaluation["criteria_met"] / evaluation["total_criteria"]) * criteria_weight
+            similarity_score = similarity["score"] * similarity_weight if similarity is not None else 0
+            artifact_score = artifacts["valid"] / artifacts["checked"] * artifact_weight if artifact_weight else 0
+            json_score = 20 if evaluation["json_valid"] else 0
+            time_score = 20 if evaluation["response_time_acceptable"] else 10
+            evaluation["quality_score"] = criteria_score + similarity_score + artifact_score + json_score + time_score
+        
+        return evaluation
+    
+    def _reference_index(self) -> Optional[ReferenceIndex]:
+        """Golden answers of the specs in use, vectorized on first use
+        
+        None when there are none, or when numpy is missing: responses are
+        then scored on their criteria alone, after a warning.
+        """
+        if self._references_unavailable:
+            return None
+        try:
+            return load_index(golden_dir(self.spec_dir))
+        except RuntimeError as e:
+            self._references_unavailable = True
+            print(f"⚠️  Golden answers ignored, scoring on the criteria alone: {e}")
+            return None
+    
+    def _has_references(self, result: Dict[str, Any]) -> bool:
+        index = self._reference_index()
+        return index is not None and (result.get("scenario") or result["test"]) in index
+    
+    def _reference_similarities(self, results: List[Dict[str, Any]]) -> List[Optional[Dict[str, Any]]]:
+        """Similarity of each passing response to its scenario's golden answers, computed as one batch"""
+        index = self._reference_index()
+        passed = [result for result in results if result["success"]]
+        if index is None or not passed:
+            return [None] * len(results)
+        scores = iter(index.score([(result.get("scenario") or result["test"], self._parsed_response(result))
+                                   for result in passed]))
+        return [next(scores) if result["success"] else None for result in results]
+    
+    def _artifact_checks(self, results: List[Dict[str, Any]]) -> List[Optional[Dict[str, Any]]]:
+        """Check the artifacts of every passing response in one batch; None for results without any"""
+        artifacts = []
+        for result in results:
+            spec = self._spec(result)
+            fields = spec.artifacts if spec is not None and result["success"] else None
+            artifacts.append(extract_artifacts(self._parsed_response(result), fields) if fields else [])
+        verdicts = iter(self.artifacts.validate([artifact for found in artifacts for artifact in found]))
+        return [summarize_artifacts([next(verdicts) for _ in found]) if found else None for found in artifacts]
+    
+    def _validate_result(self, result: Dict[str, Any]) -> List[str]:
+        """Set whether a result passes (a JSON object matching its schema) and return its schema errors"""
+        metrics = result.get("stream_metrics") or {}
+        parsed = self._parsed_response(result)
+        schema_errors = self._schema_errors(result) if parsed else []
+        result["success"] = not metrics.get("aborted") and bool(parsed) and not schema_errors
+        if schema_errors:
+            result["schema_errors"] = schema_errors[:MAX_SCHEMA_ERRORS]
+        else:
+            result.pop("schema_errors", None)
+        return schema_errors
+    
+    def _score_result(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Apply the current JSON validation and quality evaluation to a result"""
+        return self._score_results([result])[0]
+    
+    def _score_results(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Apply the current JSON validation and quality evaluation to a batch of results
+        
+        Golden-answer similarity is computed for the whole batch in one
+        matrix operation, so re-scoring a file costs one pass, not one per
+        result. Artifacts are checked as one batch too.
+        """
+        with self.profiler.span("parse"):
+            all_schema_errors = [self._validate_result(result) for result in results]
+        with self.profiler.span("artifacts"):
+            artifact_checks = self._artifact_checks(results)
+        with self.profiler.span("scoring"):
+            similarities = self._reference_similarities(results)
+            for result, similarity, artifacts in zip(results, similarities, artifact_checks):
+                result["evaluation"] = self._evaluate_response_quality(result, similarity, artifacts)
+        
+        for result, schema_errors in zip(results, all_schema_errors):
+            # Errors raised by the test itself stand; parse errors follow the current validation
+            metrics = result.get("stream_metrics") or {}
+            error = result.get("error")
+            if error is None or error["kind"] == PARSE:
+                if result["success"]:
+                    result.pop("error", None)
+                elif schema_errors and not metrics.get("aborted"):
+                    more = f" (and {len(schema_errors) - 1} more)" if len(schema_errors) > 1 else ""
+                    result["error"] = error_record(PARSE, f"Response does not match the schema: {schema_errors[0]}{more}")
+                else:
+                    message = metrics.get("json_structure_error") or "No valid JSON object in the response"
+                    result["error"] = error_record(PARSE, message)
+        return results
+    
+    def _test_deadline(self) -> Optional[float]:
+        """Deadline for a test starting now: its own timeout, capped by the suite deadline"""
+        deadlines = [self._suite_deadline]
+        if self.test_timeout is not None:
+            deadlines.append(time.monotonic() + self.test_timeout)
+        deadlines = [deadline for deadline in deadlines if deadline is not None]
+        return min(deadlines) if deadlines else None
+    
+    def _execute_test(self, case: TestCase) -> Dict[str, Any]:
+        """Run one cell under its deadline, turning anything it raises into an error result"""
+        if self._suite_deadline is not None and time.monotonic() >= self._suite_deadline:
+            error = DeadlineReached("Suite deadline reached before the test started")
+            return {**error_result(case.agent, case.test, case.model, error, 0.0), **self._case_fields(case),
+                    "skipped": True}
+        
+        self._local.deadline = self._test_deadline()
+        start_time = time.perf_counter()
+        try:
+            result = self._run_case(case)
+        except Exception as e:
+            elapsed = time.perf_counter() - start_time
+            return {**error_result(case.agent, case.test, case.model, e, elapsed), **self._case_fields(case)}
+        finally:
+            self._local.deadline = None
+        
+        self._account_usage(result)
+        return result
+    
+    def _run_test(self, case: TestCase, writer: Optional[ResultWriter] = None, quiet: bool = False) -> Dict[str, Any]:
+        """Run a single test cell and attach its quality evaluation
+        
+        A test never raises: timeouts, quota and transport failures come back
+        as error results that are scored, written and summarised like any other.
+        With a writer the full result is appended to disk straight away and
+        only a slim copy, without prompt and response, is kept in memory.
+        """
+        if not quiet:
+            print(f"⏳ Running {case.agent}: {case.test} on {case.model}...")
+        with self.profiler.memory_window(case.test), self.profiler.span("test", agent=case.agent, test=case.test):
+            result = self._execute_test(case)
+            
+            # Evaluate response quality
+            evaluation = self._score_result(result)["evaluation"]
+        error = result.get("error")
+        artifacts = evaluation.get("artifacts")
+        checked = f", Artifacts: {artifacts['valid']}/{artifacts['checked']} valid" if artifacts and artifacts["checked"] else ""
+        
+        if quiet:
+            pass
+        elif error is not None and error["kind"] != PARSE:
+            print(f"💥 {case.test} - ERROR [{error['kind']}] {error['message']} ({result['response_time']:.2f}s)")
+        elif result['success']:
+            print(f"✅ {case.test} - PASSED ({result['response_time']:.2f}s, Quality: {evaluation['quality_score']:.0f}/100{checked})")
+        else:
+            print(f"❌ {case.test} - FAILED ({result['response_time']:.2f}s, Quality: {evaluation['quality_score']:.0f}/100)")
+        
+        if writer is not None:
+            with self.profiler.span("write"):
+                writer.write_result(result)
+            return slim_result(result)
+        return result
+    
+    async def _run_tests_concurrently(self, tests: List, max_concurrency: int,
+                                      writer: Optional[ResultWriter] = None,
+                                      quiet: bool = False) -> List[Dict[str, Any]]:
+        """Run tests in worker threads with at most max_concurrency requests in flight"""
+        import asyncio
+        from concurrent.futures import ThreadPoolExecutor
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        # A dedicated pool: the default executor is capped at cpu_count + 4
+        # workers, which would silently lower the requested limit
+        with ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="agent-test") as executor:
+            async def run(test):
+                # Each test starts its own timer only once it holds a slot, so
+                # response_time excludes the time spent queued behind other tests
+                async with semaphore:
+                    return await loop.run_in_executor(executor, self._run_test, test, writer, quiet)
+            
+            # gather preserves submission order, so results line up with `tests`
+            return await asyncio.gather(*(run(test) for test in tests))
+    
+    @staticmethod
+    def _matrix_row(entry: Dict[str, Any], latency: float, quality: float) -> Dict[str, Any]:
+        """A result or benchmark summary reduced to what fastest_passing compares"""
+        fields = ("agent", "scenario", "test", "model", "temperature", "variant", "quality_bar")
+        return {**{key: entry.get(key) for key in fields}, "latency": latency, "quality": quality}
+    
+    def _agent_defaults(self, agent_id: str) -> Tuple[str, Optional[float]]:
+        model, generation_config = self._model_for(agent_id)
+        return model, generation_config.get("temperature")
+    
+    def _test_cases(self) -> List[TestCase]:
+        """Every cell of the test matrix, in reporting order"""
+        with self.profiler.span("prompt_build"):
+            return expand_matrix(
+                load_specs(self.spec_dir), self._agent_defaults, list(self.agents or load_agents()), self.axes
+            )
+    
+    def _run_batch(self, tests: List, max_concurrency: int = 1, writer: Optional[ResultWriter] = None,
+                   quiet: bool = False) -> List[Dict[str, Any]]:
+        """Run a list of test cells, concurrently when max_concurrency > 1, preserving order"""
+        if max_concurrency > 1:
+            # asyncio costs more to import than the rest of the harness; offline commands never need it
+            import asyncio
+            return asyncio.run(self._run_tests_concurrently(tests, max_concurrency, writer, quiet))
+        return [self._run_test(test, writer, quiet) for test in tests]
+    
+    def run_all_tests(self, max_concurrency: int = 1, writer: Optional[ResultWriter] = None,
+                      deadline: Optional[float] = None, shard: Optional[Tuple[int, int]] = None,
+                      completed: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """Run all tests and return comprehensive results
+        
+        With max_concurrency > 1 the tests run concurrently, bounded to that
+        many in-flight model calls, so the suite takes roughly as long as the
+        slowest agent rather than the sum of all of them.
+        
+        With a writer each result is streamed to disk as soon as its test
+        finishes, followed by a summary record, and `detailed_results` in the
+        returned summary omit prompts and responses.
+        
+        `deadline` bounds the whole suite in seconds. Tests still running when
+        it passes return an error result straight away and their model calls
+        are cancelled, tests not yet started are skipped, and the summary is
+        marked partial.
+        
+        `shard` (i, N) runs only the cells assigned to shard i of N.
+        `completed` maps cell keys to results from a checkpoint; those cells
+        are not run again and their results are reported alongside the new ones.
+        """
+        print("🚀 Starting CodeCollab AI Agent Test Suite...")
+        print("Testing specialized AI agents for collaborative coding platform\n")
+        
+        tests = self._test_cases()
+        if shard is not None:
+            tests = select_shard(tests, *shard)
+            print(f"🧩 Shard {shard[0]}/{shard[1]}: {len(tests)} tests")
+        completed = completed or {}
+        pending = [case for case in tests if cell_key(case.agent, case.test) not in completed]
+        if len(pending) < len(tests):
+            print(f"↩️  Resuming from checkpoint: {len(tests) - len(pending)} of {len(tests)} tests already done")
+        
+        wall_start = time.perf_counter()
+        self._suite_deadline = time.monotonic() + deadline if deadline is not None else None
+        try:
+            new_results = iter(self._run_batch(pending, max_concurrency, writer))
+        finally:
+            if self._suite_deadline is not None and time.monotonic() >= self._suite_deadline:
+                # Tests return at the deadline without their calls: cancel
+                # those rather than let them run on in the background
+                self.scheduler.shutdown()
+            self._suite_deadline = None
+        wall_time = time.perf_counter() - wall_start
+        
+        # Report in matrix order, checkpointed results in place of the cells they cover
+        results = [
+            slim_result(completed[cell_key(case.agent, case.test)])
+            if cell_key(case.agent, case.test) in completed else next(new_results)
+            for case in tests
+        ]
+        summary = self._summarize(results)
+        if shard is not None:
+            summary["shard"] = list(shard)
+        
+        if writer is not None:
+            writer.write_summary(summary)
+        
+        self._print_summary(summary, wall_time, max_concurrency)
+        return summary
+    
+    def _summarize(self, results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """The suite summary for a list of scored results"""
+        total_time = sum(r['response_time'] for r in results)
+        successful_tests = sum(1 for r in results if r['success'])
+        quality_scores = [r["evaluation"]["quality_score"] for r in results]
+        
+        # Calculate comprehensive metrics
+        avg_quality = sum(quality_scores) / len(quality_scores) if quality_scores else 0
+        errors = {kind: 0 for kind in ERROR_KINDS}
+        for r in results:
+            if r.get("error"):
+                errors[r["error"]["kind"]] += 1
+        skipped_tests = sum(1 for r in results if r.get("skipped"))
+        
+        return {
+            "test_suite": "CodeCollab AI Agent Test Suite",
+            "version": "1.0.0",
+            "total_tests": len(results),
+            "successful_tests": successful_tests,
+            "failed_tests": len(results) - successful_tests,
+            "success_rate": (successful_tests / len(results)) * 100 if results else 0.0,
+            "errors": errors,
+            "partial": skipped_tests > 0,
+            "skipped_tests": skipped_tests,
+            "total_time": total_time,
+            "average_response_time": total_time / len(results) if results else 0.0,
+            "average_quality_score": avg_quality,
+            "performance_rating": self._get_performance_rating(avg_quality),
+            "token_usage": summarize_usage(results),
+            "fastest_passing": fastest_passing([
+                self._matrix_row(r, r["response_time"], r["evaluation"]["quality_score"]) for r in results
+            ]),
+            "scheduling": summarize_scheduling(results),
+            "detailed_results": results,
+            "recommendations": self._generate_recommendations(results)
+        }
+    
+    def _print_summary(self, summary: Dict[str, Any], wall_time: Optional[float] = None,
+                       max_concurrency: int = 1) -> None:
+        results = summary["detailed_results"]
+        total_time = summary["total_time"]
+        errors = summary["errors"]
+        print(f"\n📊 CodeCollab AI Test Summary:")
+        print(f"✅ Successful Tests: {summary['successful_tests']}/{summary['total_tests']} ({summary['success_rate']:.1f}%)")
+        if any(errors.values()):
+            print("⚠️  Errors: " + ", ".join(f"{count} {kind}" for kind, count in errors.items() if count))
+        if summary["skipped_tests"]:
+            print(f"⏰ Suite deadline reached: {summary['skipped_tests']} tests skipped, results are partial")
+        print(f"📈 Average Quality Score: {summary['average_quality_score']:.1f}/100")
+        print(f"⏱️  Average Response Time: {summary['average_response_time']:.2f}s")
+        first_token_times = [
+            r["stream_metrics"]["time_to_first_token"] for r in results
+            if (r.get("stream_metrics") or {}).get("time_to_first_token") is not None
+        ]
+        if first_token_times:
+            print(f"⚡ Average Time to First Token: {sum(first_token_times) / len(first_token_times):.2f}s")
+        print(f"🏆 Performance Rating: {summary['performance_rating']}")
+        token_usage = summary["token_usage"]
+        replayed = token_usage.get("cached_calls", 0)
+        replayed_note = f", {replayed} of {token_usage['calls']} calls replayed from the cache at no cost" if replayed else ""
+        print(f"🔢 Tokens: {token_usage['prompt_tokens']} prompt + {token_usage['completion_tokens']} completion "
+              f"(≈ ${token_usage['estimated_cost']:.4f}{replayed_note})")
+        scheduling = summary["scheduling"]
+        if scheduling["retries"] or scheduling["hedged_calls"] or scheduling["rate_limit_wait"]:
+            print(f"🔄 Scheduler: {scheduling['retries']} retries, {scheduling['hedged_calls']} hedged calls "
+                  f"({scheduling['hedge_wins']} won by the hedge), {scheduling['rate_limit_wait']:.2f}s rate-limit wait")
+        print(f"🕐 Total Execution Time: {total_time:.2f}s")
+        if wall_time is not None:
+            print(f"⏲️  Wall Clock Time: {wall_time:.2f}s (concurrency: {max_concurrency})")
+        if any(group["cells"] > 1 for group in summary["fastest_passing"]):
+            print("\n🏁 Fastest configuration per agent that meets the quality bar:")
+            print(format_fastest_table(summary["fastest_passing"]))
+    
+    def merge_shards(self, paths: List[str]) -> Dict[str, Any]:
+        """Combine the JSONL outputs of sharded (or resumed) runs into one suite summary
+        
+        Each cell is reported once, from its latest record, in matrix order.
+        The summary is marked partial when a shard's output is missing.
+        """
+        results, runs, missing = collect_shards(paths)
+        order = {cell_key(case.agent, case.test): i for i, case in enumerate(self._test_cases())}
+        results.sort(key=lambda r: order.get(cell_key(r["agent"], r["test"]), len(order)))
+        summary = self._summarize([slim_result(r) for r in results])
+        summary["merged_from"] = [run["path"] for run in runs]
+        if missing:
+            summary["missing_shards"] = missing
+            summary["partial"] = True
+        return summary
+    
+    def run_benchmark(self, trials: int = 5, warmup: int = 1, max_concurrency: int = 1,
+                      confidence: float = 0.95) -> Dict[str, Any]:
+        """Run every test repeatedly and report latency percentiles and quality confidence intervals
+        
+        Warmup rounds run first and are discarded. The measured trials of all
+        tests are interleaved in one batch so they share the concurrency limit,
+        and throughput is the number of measured calls over the batch wall time.
+        """
+        tests = self._test_cases()
+        print(f"🏋️  Benchmarking {len(tests)} tests: {warmup} warmup + {trials} measured trials each "
+              f"(concurrency: {max_concurrency})")
+        
+        if warmup > 0:
+            self._run_batch(tests * warmup, max_concurrency, quiet=True)
+        
+        wall_start = time.perf_counter()
+        results = [slim_result(r) for r in self._run_batch(tests * trials, max_concurrency, quiet=True)]
+        wall_time = time.perf_counter() - wall_start
+        
+        by_test: Dict[str, List[Dict[str, Any]]] = {}
+        for result in results:
+            by_test.setdefault(result["test"], []).append(result)
+        tests_summary = [summarize_trials(samples, confidence) for samples in by_test.values()]
+        
+        return {
+            "test_suite": "CodeCollab AI Agent Test Suite",
+            "mode": "benchmark",
+            "trials": trials,
+            "warmup": warmup,
+            "concurrency": max_concurrency,
+            "total_calls": len(results),
+            "wall_time": wall_time,
+            "throughput_rps": len(results) / wall_time if wall_time > 0 else 0.0,
+            "tests": tests_summary,
+            "fastest_passing": fastest_passing([
+                self._matrix_row(t, t["latency"]["p50"], t["quality"]["mean"]) for t in tests_summary
+            ]),
+        }
+    
+    def run_adaptive_benchmark(self, max_trials: int = 30, min_trials: int = 5, quality_precision: float = 2.5,
+                               latency_precision: float = 0.1, warmup: int = 1, max_concurrency: int = 1,
+                               confidence: float = 0.95) -> Dict[str, Any]:
+        """Benchmark every test with only as many trials as its confidence intervals need
+        
+        Trials are issued one call at a time, as concurrency slots free up,
+        to the test whose quality or latency interval is furthest from its
+        target (see AdaptiveSampler). A test stops once both intervals are
+        within target or its `max_trials` budget is spent. The report has the
+        same per-test statistics as run_benchmark, so `diff` compares either,
+        plus each test's stopping reason and the calls saved against running
+        every test `max_trials` times.
+        """
+        from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+        tests = self._test_cases()
+        cases = {case.test: case for case in tests}
+        sampler = AdaptiveSampler(list(cases), min_trials, max_trials, quality_precision, latency_precision, confidence)
+        print(f"🏋️  Adaptive benchmark of {len(tests)} tests: {warmup} warmup + {min_trials}-{max_trials} trials each, "
+              f"until quality ±{quality_precision:g} and latency ±{latency_precision:.0%} (concurrency: {max_concurrency})")
+        
+        if warmup > 0:
+            self._run_batch(tests * warmup, max_concurrency, quiet=True)
+        
+        samples: Dict[str, List[Dict[str, Any]]] = {name: [] for name in cases}
+        wall_start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="agent-test") as executor:
+            pending: Dict[Any, str] = {}
+            
+            def fill() -> None:
+                while len(pending) < max_concurrency:
+                    name = sampler.next_test()
+                    if name is None:
+                        return
+                    pending[executor.submit(self._run_test, cases[name], None, True)] = name
+            
+            fill()
+            while pending:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = pending.pop(future)
+                    result = slim_result(future.result())
+                    samples[name].append(result)
+                    sampler.add(name, result["evaluation"]["quality_score"],
+                                result["response_time"] if answered(result) else None)
+                fill()
+        wall_time = time.perf_counter() - wall_start
+        
+        tests_summary = [
+            {**summarize_trials(samples[name], confidence), "adaptive": sampler.status(name)}
+            for name in cases if samples[name]
+        ]
+        total_calls = sum(len(results) for results in samples.values())
+        fixed_calls = len(tests) * max_trials
+        return {
+            "test_suite": "CodeCollab AI Agent Test Suite",
+            "mode": "adaptive_benchmark",
+            "trials": max_trials,
+            "min_trials": min_trials,
+            "warmup": warmup,
+            "targets": {"quality_half_width": quality_precision, "latency_relative_half_width": latency_precision},
+            "concurrency": max_concurrency,
+            "total_calls": total_calls,
+            "fixed_design_calls": fixed_calls,
+            "calls_saved": 1 - total_calls / fixed_calls if fixed_calls else 0.0,
+            "converged": sum(1 for test in tests_summary if test["adaptive"]["converged"]),
+            "wall_time": wall_time,
+            "throughput_rps": total_calls / wall_time if wall_time > 0 else 0.0,
+            "tests": tests_summary,
+            "fastest_passing": fastest_passing([
+                self._matrix_row(t, t["latency"]["p50"], t["quality"]["mean"]) for t in tests_summary
+            ]),
+        }
+    
+    def plan_workflow(self) -> Tuple[Workflow, Dict[str, Any]]:
+        """Run the ai-coordinator test and turn its project_breakdown into a workflow"""
+        cases = [case for case in self._test_cases() if case.agent == "ai-coordinator"]
+        if not cases:
+            raise ValueError("no ai-coordinator test in the spec directory to plan the workflow with")
+        result = self._run_test(cases[0])
+        breakdown = self._parsed_response(result).get("project_breakdown") if result.get("response") else None
+        if not isinstance(breakdown, list) or not breakdown:
+            raise ValueError("the coordinator's response has no project_breakdown to execute")
+        return workflow_from_breakdown(breakdown, self.agents or load_agents()), result
+    
+    def _run_step(self, step: WorkflowStep, prompt: str) -> Dict[str, Any]:
+        """Send one workflow step to its agent's model; failures raise and execute_workflow records them"""
+        model, generation_config = self._model_for(step.agent)
+        self._local.deadline = self._test_deadline()
+        start_time = time.perf_counter()
+        try:
+            with self.profiler.span("test", agent=step.agent, test=step.id):
+                response = self._generate_content(model, prompt, generation_config)
+        finally:
+            self._local.deadline = None
+        usage = response.usage or estimate_usage(prompt, response.text)
+        cached = getattr(response, "cached", False)
+        return {"model": model, "response": response.text, "cached": cached,
+                "usage": usage_record(model, usage, time.perf_counter() - start_time, self.pricing, cached=cached)}
+    
+    def run_workflow(self, workflow: Workflow, task_input: str, max_concurrency: Optional[int] = None) -> Dict[str, Any]:
+        """Execute a multi-agent workflow with every step starting as soon as its inputs exist
+        
+        Steps run on their agent's model; each gets the outputs of the steps
+        it requires in its prompt, as A2ACoordinator does in the app. The
+        report compares the critical path with the total work to show how
+        much of the workflow's parallelism the run achieved.
+        """
+        print(f"🔀 Running workflow '{workflow.name}': {len(workflow.steps)} steps")
+        wall_start = time.perf_counter()
+        records = execute_workflow(workflow, self._run_step, task_input, max_concurrency)
+        wall_time = time.perf_counter() - wall_start
+        return {
+            "test_suite": "CodeCollab AI Agent Test Suite",
+            "mode": "workflow",
+            "input": task_input,
+            **summarize_workflow(workflow, records, wall_time),
+        }
+    
+    def _get_performance_rating(self, avg_quality: float) -> str:
+        """Get performance rating based on quality score"""
+        if avg_quality >= 90:
+            return "Excellent ⭐⭐⭐⭐⭐"
+        elif avg_quality >= 80:
+            return "Very Good ⭐⭐⭐⭐"
+        elif avg_quality >= 70:
+            return "Good ⭐⭐⭐"
+        elif avg_quality >= 60:
+            return "Fair ⭐⭐"
+        else:
+            return "Needs Improvement ⭐"
+    
+    def _generate_recommendations(self, results: List[Dict[str, Any]]) -> List[str]:
+        """Generate recommendations based on test results"""
+        recommendations = []
+        
+        errors: Dict[str, List[Dict[str, Any]]] = {}
+        for r in results:
+            if r.get("error"):
+                errors.setdefault(r["error"]["kind"], []).append(r)
+        # Latency and quality advice only applies to tests that got an answer back
+        answered = [r for r in results if (r.get("error") or {}).get("kind") in (None, PARSE)]
+        
+        failed_tests = errors.get(PARSE, [])
+        slow_tests = [r for r in answered if r["response_time"] > 20]
+        slow_first_token = [
+            r for r in answered
+            if (r.get("stream_metrics") or {}).get("time_to_first_token") is not None
+            and r["stream_metrics"]["time_to_first_token"] >= TIME_TO_FIRST_TOKEN_THRESHOLD
+        ]
+        low_quality = [r for r in answered if r["evaluation"]["quality_score"] < 70]
+        
+        skipped = [r for r in results if r.get("skipped")]
+        timed_out = [r for r in errors.get(TIMEOUT, []) if not r.get("skipped")]
+        if skipped:
+            recommendations.append(
+                f"Suite deadline skipped {len(skipped)} tests - raise --suite-deadline or run with more --concurrency"
+            )
+        if timed_out:
+            recommendations.append(
+                f"{len(timed_out)} tests timed out ({', '.join(r['agent'] for r in timed_out)}) - "
+                f"raise --test-timeout or shorten their prompts"
+            )
+        if errors.get(QUOTA):
+            recommendations.append(
+                f"{len(errors[QUOTA])} tests hit provider quotas - lower --concurrency or set --rate-limit for their models"
+            )
+        if errors.get(TRANSPORT):
+            recommendations.append(
+                f"{len(errors[TRANSPORT])} tests failed on transport errors - check connectivity and provider status, "
+                f"or raise --max-attempts"
+            )
+        if errors.get(INTERNAL):
+            recommendations.append(
+                f"{len(errors[INTERNAL])} tests raised unexpected errors - see the `error` field of their results"
+            )
+        
+        if failed_tests:
+            recommendations.append(f"Fix JSON response formatting for {len(failed_tests)} failed tests")
+        
+        artifact_checks = [(r, r["evaluation"].get("artifacts")) for r in answered]
+        broken_artifacts = [r for r, checks in artifact_checks if checks and checks["valid"] < checks["checked"]]
+        if broken_artifacts:
+            recommendations.append(
+                f"Generated code or config fails static checks in {len(broken_artifacts)} tests "
+                f"({', '.join(r['agent'] for r in broken_artifacts)}) - see evaluation.artifacts for the errors"
+            )
+        
+        if slow_tests:
+            recommendations.append(f"Optimize response time for {len(slow_tests)} slow tests (>20s)")
+        
+        # Streamed calls show how much of the latency was spent generating output
+        output_bound = [
+            r for r in answered
+            if r["response_time"] > 0
+            and (r.get("stream_metrics") or {}).get("generation_time", 0) / r["response_time"] >= OUTPUT_BOUND_SHARE
+            and (r.get("usage") or {}).get("completion_tokens", 0) >= OUTPUT_HEAVY_TOKENS
+        ]
+        if output_bound:
+            recommendations.append(
+                f"Output tokens dominate latency for {len(output_bound)} tests "
+                f"({', '.join(r['agent'] for r in output_bound)}) - ask for more concise output or cap max tokens"
+            )
+        
+        costs: Dict[str, float] = {}
+        for r in results:
+            costs[r["agent"]] = costs.get(r["agent"], 0.0) + ((r.get("usage") or {}).get("estimated_cost") or 0.0)
+        total_cost = sum(costs.values())
+        if total_cost > 0 and len(costs) > 1:
+            top_agent = max(costs, key=costs.get)
+            if costs[top_agent] / total_cost >= 0.5:
+                recommendations.append(
+                    f"{top_agent} accounts for {costs[top_agent] / total_cost:.0%} of estimated cost - "
+                    f"consider a cheaper model or a shorter prompt for it"
+                )
+        
+        if slow_first_token:
+            recommendations.append(
+                f"Reduce time to first token for {len(slow_first_token)} tests "
+                f"(>{TIME_TO_FIRST_TOKEN_THRESHOLD:.0f}s) - check prompt size and model queueing"
+            )
+        
+        if low_quality:
+            recommendations.append(f"Improve response quality for {len(low_quality)} tests scoring below 70/100")
+        
+        if not recommendations:
+            recommendations.append("All tests performing well! Consider adding more complex test scenarios.")
+        
+        return recommendations
+
+
+def _rescore_file(path: str) -> Dict[str, Any]:
+    """Re-score one archived results file; runs in a worker process and returns only small records"""
+    # Merged shard summaries keep slim results; their responses are in the shard files
+    results = [result for result in load_detailed_results(path) if "response" in result]
+    stored = [(result.get("evaluation") or {}).get("quality_score") for result in results]
+    for result in results:
+        result.pop("_parsed_json", None)
+    tester = CodeCollabAITester()
+    try:
+        # One batch per file: golden-answer similarity is a single matrix product for all of it
+        tester._score_results(results)
+    finally:
+        tester.close()
+    records = [
+        {
+            "agent": result["agent"],
+            "test": result["test"],
+            "stored_quality_score": stored_score,
+            "quality_score": result["evaluation"]["quality_score"],
+            "response_time": result["response_time"],
+            "success": result["success"],
+        }
+        for result, stored_score in zip(results, stored)
+    ]
+    
+    stored_scores = [r["stored_quality_score"] for r in records if r["stored_quality_score"] is not None]
+    rescored_average = sum(r["quality_score"] for r in records) / len(records) if records else 0
+    return {
+        "path": path,
+        "timestamp": run_timestamp(path),
+        "records": records,
+        "stored_average": sum(stored_scores) / len(stored_scores) if stored_scores else None,
+        "rescored_average": rescored_average,
+        "performance_rating": tester._get_performance_rating(rescored_average),
+    }
+
+
+def rescore_results(directory: str, workers: Optional[int] = None, threshold: float = 5.0) -> Dict[str, Any]:
+    """Re-apply the current scoring to every archived run in a directory, in parallel
+    
+    Each worker loads one results file at a time and sends back per-test
+    scores without the prompts and responses, so memory stays bounded by
+    the largest single file no matter how many runs are archived.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    paths = iter_result_files(directory)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        file_summaries = list(executor.map(_rescore_file, paths))
+    return aggregate_regressions(file_summaries, threshold)
@@ -0,0 +1,91 @@
+import json
+from typing import Dict, Any, List, NamedTuple, Optional, Tuple
+
+# Rough characters-per-token ratio for English and code, used when a
+# backend does not report token counts
+CHARS_PER_TOKEN = 4.0
+
+# USD per million (input, output) tokens. Experimental models are billed at
+# the rate of their stable counterpart so cost trends stay comparable.
+MODEL_PRICING: Dict[str, Tuple[float, float]] = {
+    "claude-sonnet-4-20250514": (3.00, 15.00),
+    "gemini-2.0-flash-exp": (0.10, 0.40),
+    "gemini-2.0-flash": (0.10, 0.40),
+}
+
+
+class TokenUsage(NamedTuple):
+    prompt_tokens: int
+    completion_tokens: int
+    total_tokens: int
+    estimated: bool = False
+
+
+def estimate_tokens(text: str) -> int:
+    return round(len(text) / CHARS_PER_TOKEN)
+
+
+def estimate_usage(prompt: str, completion: str) -> TokenUsage:
+    prompt_tokens, completion_tokens = estimate_tokens(prompt), estimate_tokens(completion)
+    return TokenUsage(prompt_tokens, completion_tokens, prompt_tokens + completion_tokens, estimated=True)
+
+
+def load_pricing(path: str) -> Dict[str, Tuple[float, float]]:
+    """Read a {"model": [input_per_million, output_per_million]} JSON file on top of the defaults"""
+    with open(path, "r", encoding="utf-8") as f:
+        overrides = json.load(f)
+    return {**MODEL_PRICING, **{model: tuple(rates) for model, rates in overrides.items()}}
+
+
+def estimate_cost(model: str, usage: TokenUsage,
+                  pricing: Optional[Dict[str, Tuple[float, float]]] = None) -> Optional[float]:
+    """Estimated USD cost of one call, or None for a model without a known price"""
+    rates = (pricing or MODEL_PRICING).get(model)
+    if rates is None:
+        return None
+    input_rate, output_rate = rates
+    return (usage.prompt_tokens * input_rate + usage.completion_tokens * output_rate) / 1_000_000
+
+
+def usage_record(model: str, usage: TokenUsage, response_time: float,
+                 pricing: Optional[Dict[str, Tuple[float, float]]] = None, cached: bool = False) -> Dict[str, Any]:
+    """JSON-friendly usage for one call, with end-to-end output throughput and cost
+
+    A response replayed from the cache was paid for when it was recorded,
+    so its cost is zero.
+    """
+    return {
+        "prompt_tokens": usage.prompt_tokens,
+        "completion_tokens": usage.completion_tokens,
+        "total_tokens": usage.total_tokens,
+        "estimated_tokens": usage.estimated,
+        "tokens_per_second": usage.completion_tokens / response_time if response_time > 0 else None,
+        "estimated_cost": 0.0 if cached else estimate_cost(model, usage, pricing),
+    }
+
+
+def _add(totals: Dict[str, Any], usage: Dict[str, Any], cached: bool) -> None:
+    for key in ("prompt_tokens", "completion_tokens", "total_tokens"):
+        totals[key] += usage[key]
+    totals["estimated_cost"] += usage["estimated_cost"] or 0.0
+    totals["calls"] += 1
+    totals["cached_calls"] += cached
+
+
+def _empty() -> Dict[str, Any]:
+    return {"calls": 0, "cached_calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0,
+            "estimated_cost": 0.0}
+
+
+def summarize_usage(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Token and cost totals for a run, overall and per agent; `cached_calls` were replays and cost nothing"""
+    totals = _empty()
+    by_agent: Dict[str, Dict[str, Any]] = {}
+    for result in results:
+        usage = result.get("usage")
+        if not usage:
+            continue
+        cached = bool(result.get("cached"))
+        _add(totals, usage, cached)
+        _add(by_agent.setdefault(result["agent"], _empty()), usage, cached)
+    return {**totals, "by_agent": by_agent}
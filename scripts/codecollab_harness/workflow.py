@@ -0,0 +1,327 @@
+import os
+import re
+import time
+from typing import Dict, Any, Callable, Iterable, List, NamedTuple, Optional
+
+from .agent_config import AGENT_ALIASES, AgentConfig, _balanced_block, _top_level_objects
+from .faults import INTERNAL, classify_error, error_record
+
+PROTOCOLS_PATH = os.path.normpath(
+    os.path.join(os.path.dirname(__file__), "..", "..", "lib", "ai", "a2a", "protocols.ts")
+)
+
+_PROTOCOL = re.compile(r"export const (\w+)\s*:\s*A2AProtocol\s*=\s*{")
+_STRING_FIELD = re.compile(r"(\w+)\s*:\s*'([^']*)'")
+_LIST_FIELD = re.compile(r"(\w+)\s*:\s*\[([^\]]*)\]")
+_QUOTED = re.compile(r"'([^']*)'")
+
+# Names a coordinator plan uses for agents that match no AI_AGENTS id, name or specialization
+PLAN_AGENT_ALIASES = {
+    "frontend-developer": "frontend-specialist",
+    "ui-developer": "frontend-specialist",
+    "backend-developer": "backend-specialist",
+    "api-developer": "backend-specialist",
+    "database-administrator": "database-specialist",
+    "dba": "database-specialist",
+    "qa": "testing-specialist",
+    "qa-engineer": "testing-specialist",
+    "tester": "testing-specialist",
+    "code-reviewer": "code-review",
+    "reviewer": "code-review",
+    "coordinator": "ai-coordinator",
+}
+
+
+class WorkflowStep(NamedTuple):
+    """One step of a multi-agent workflow, shaped like A2AStep in lib/ai/a2a/types.ts"""
+    id: str
+    agent: str
+    task: str
+    requires: List[str] = []
+    provides: List[str] = []
+
+
+class Workflow(NamedTuple):
+    name: str
+    description: str
+    steps: List[WorkflowStep]
+    # Dependencies that named nothing in the workflow (from free-text plans)
+    unresolved: List[str] = []
+
+
+def load_protocols(path: str = PROTOCOLS_PATH) -> Dict[str, Workflow]:
+    """Parse the A2AProtocol constants in lib/ai/a2a/protocols.ts, keyed by protocol name"""
+    with open(path, "r", encoding="utf-8") as f:
+        source = f.read()
+    protocols = {}
+    for match in _PROTOCOL.finditer(source):
+        block = _balanced_block(source, match.end() - 1, "{", "}")
+        steps_at = block.index("[", block.index("steps"))
+        steps_block = _balanced_block(block, steps_at, "[", "]")
+        header = dict(_STRING_FIELD.findall(block[:steps_at]))
+        steps = []
+        for body in _top_level_objects(steps_block):
+            fields = dict(_STRING_FIELD.findall(body))
+            lists = {key: _QUOTED.findall(items) for key, items in _LIST_FIELD.findall(body)}
+            steps.append(WorkflowStep(
+                id=fields["id"],
+                agent=fields["agent"],
+                task=fields["task"],
+                requires=lists.get("requires", []),
+                provides=lists.get("provides", []),
+            ))
+        protocols[header.get("name", match.group(1))] = Workflow(header.get("name", match.group(1)),
+                                                                 header.get("description", ""), steps)
+    return protocols
+
+
+def _slug(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")
+
+
+def _words_match(a: str, b: str) -> bool:
+    """True when one slug's words appear in a row in the other's"""
+    a, b = f"-{a}-", f"-{b}-"
+    return a in b or b in a
+
+
+def agent_id_for(name: str, agents: Dict[str, AgentConfig]) -> str:
+    """Map a free-text agent name from a plan ("Frontend Specialist") to an AI_AGENTS id
+
+    Names match an agent's id, name or specialization exactly, with or
+    without a trailing "agent", or an entry of PLAN_AGENT_ALIASES. A name
+    that matches nothing is kept as its slug, and the step then runs with
+    the default model.
+    """
+    slug = _slug(name)
+    if slug.endswith("-agent"):
+        slug = slug[:-len("-agent")]
+    slug = PLAN_AGENT_ALIASES.get(slug, AGENT_ALIASES.get(slug, slug))
+    if slug in agents:
+        return slug
+    for agent in agents.values():
+        if slug in {_slug(agent.name), _slug(agent.specialization)}:
+            return agent.id
+    return slug
+
+
+def workflow_from_breakdown(breakdown: List[Dict[str, Any]], agents: Dict[str, AgentConfig],
+                            name: str = "project-breakdown") -> Workflow:
+    """Turn the coordinator's project_breakdown into a workflow
+
+    Each entry becomes a step that provides its own id. Its free-text
+    `dependencies` are matched against the task, deliverables and agent of
+    earlier entries only, which keeps the graph acyclic whatever the model
+    wrote. A match is on whole words: one side's words appear in a row in
+    the other's, so "UI" matches "Build UI toolbar" but not "build".
+    Dependencies that match nothing are listed in `unresolved`.
+    """
+    steps: List[WorkflowStep] = []
+    keys: List[List[str]] = []
+    unresolved = []
+    for index, entry in enumerate(breakdown, 1):
+        agent = agent_id_for(str(entry.get("agent", "")), agents)
+        step_id = f"{index}-{agent}"
+        requires = []
+        for dependency in entry.get("dependencies") or []:
+            wanted = _slug(str(dependency))
+            matches = [
+                steps[i].id for i, candidates in enumerate(keys)
+                if wanted and any(_words_match(wanted, key) for key in candidates)
+            ]
+            if matches:
+                requires += [match for match in matches if match not in requires]
+            else:
+                unresolved.append(f"{step_id}: {dependency}")
+        steps.append(WorkflowStep(step_id, agent, str(entry.get("task", "")), requires, [step_id]))
+        keys.append([key for key in [_slug(str(entry.get("task", ""))), agent]
+                     + [_slug(str(d)) for d in entry.get("deliverables") or []] if key])
+    return Workflow(name, "Coordinator project_breakdown", steps, unresolved)
+
+
+def dependencies(workflow: Workflow) -> Dict[str, List[str]]:
+    """Step id -> ids of the steps providing what it requires
+
+    Artifacts no step provides are treated as external inputs. Raises
+    ValueError when the requirements form a cycle.
+    """
+    providers: Dict[str, List[str]] = {}
+    for step in workflow.steps:
+        for artifact in step.provides:
+            providers.setdefault(artifact, []).append(step.id)
+    graph = {
+        step.id: sorted({p for artifact in step.requires for p in providers.get(artifact, []) if p != step.id})
+        for step in workflow.steps
+    }
+    if len(topological_order(graph)) != len(graph):
+        raise ValueError(f"workflow '{workflow.name}' has a dependency cycle")
+    return graph
+
+
+def topological_order(graph: Dict[str, List[str]]) -> List[str]:
+    """Kahn's algorithm; steps caught in a cycle are left out"""
+    remaining = {node: len(deps) for node, deps in graph.items()}
+    dependents: Dict[str, List[str]] = {node: [] for node in graph}
+    for node, deps in graph.items():
+        for dep in deps:
+            dependents[dep].append(node)
+    ready = [node for node, count in remaining.items() if count == 0]
+    order = []
+    while ready:
+        node = ready.pop(0)
+        order.append(node)
+        for dependent in dependents[node]:
+            remaining[dependent] -= 1
+            if remaining[dependent] == 0:
+                ready.append(dependent)
+    return order
+
+
+def build_step_prompt(step: WorkflowStep, artifacts: Dict[str, str], task_input: str) -> str:
+    """The same prompt A2ACoordinator.buildPrompt sends, with the outputs of required steps"""
+    prompt = f"Task: {step.task}\n\n"
+    if step.requires:
+        prompt += "Previous results:\n"
+        for artifact in step.requires:
+            prompt += f"\n{artifact}:\n{artifacts.get(artifact, '')}\n"
+    return prompt + f"\nInput:\n{task_input}"
+
+
+def execute_workflow(workflow: Workflow, run_step: Callable[[WorkflowStep, str], Dict[str, Any]],
+                     task_input: str, max_parallel: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Run every step as soon as the steps it depends on have finished
+
+    `run_step(step, prompt)` calls the step's agent and returns a dict with
+    at least `response`; it runs in a worker thread. Each output is passed
+    to dependents under the names the step provides. When a step fails, its
+    dependents are skipped and independent branches carry on. Step times are
+    seconds from the start of the workflow.
+    """
+    from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+    graph = dependencies(workflow)
+    steps = {step.id: step for step in workflow.steps}
+    artifacts: Dict[str, str] = {}
+    records: Dict[str, Dict[str, Any]] = {}
+    started = time.perf_counter()
+
+    def run(step: WorkflowStep, prompt: str) -> Dict[str, Any]:
+        start = time.perf_counter() - started
+        try:
+            outcome = run_step(step, prompt)
+        except Exception as exc:
+            outcome = {"response": None, "error": error_record(classify_error(exc), str(exc), exc)}
+        return {**outcome, "start": start, "end": time.perf_counter() - started}
+
+    with ThreadPoolExecutor(max_workers=max_parallel or max(1, len(steps)),
+                            thread_name_prefix="workflow-step") as pool:
+        running = {}
+        pending = dict(graph)
+        while pending or running:
+            for step_id, deps in list(pending.items()):
+                if any(dep in records and not records[dep]["success"] for dep in deps):
+                    del pending[step_id]
+                    records[step_id] = {"success": False, "skipped": True, "start": None, "end": None,
+                                        "error": error_record(INTERNAL, "skipped: a step it depends on failed")}
+                elif all(dep in records for dep in deps):
+                    del pending[step_id]
+                    prompt = build_step_prompt(steps[step_id], artifacts, task_input)
+                    running[pool.submit(run, steps[step_id], prompt)] = step_id
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                step_id = running.pop(future)
+                record = future.result()
+                record["success"] = record.get("error") is None
+                records[step_id] = record
+                if record["success"]:
+                    for artifact in steps[step_id].provides:
+                        artifacts[artifact] = record["response"]
+
+    return [
+        {"id": step.id, "agent": step.agent, "task": step.task, "depends_on": graph[step.id], **records[step.id],
+         "latency": None if records[step.id]["start"] is None else records[step.id]["end"] - records[step.id]["start"]}
+        for step in workflow.steps
+    ]
+
+
+def critical_path(records: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Longest chain of dependent steps by measured latency
+
+    This is the lower bound on wall time for the workflow however many
+    agents run at once; total work over it is the best achievable speedup.
+    """
+    records = {record["id"]: record for record in records}
+    graph = {step_id: record["depends_on"] for step_id, record in records.items()}
+    finish: Dict[str, float] = {}
+    previous: Dict[str, Optional[str]] = {}
+    for step_id in topological_order(graph):
+        before = max(graph[step_id], key=lambda dep: finish[dep], default=None)
+        finish[step_id] = (finish[before] if before else 0.0) + (records[step_id]["latency"] or 0.0)
+        previous[step_id] = before
+    if not finish:
+        return {"steps": [], "latency": 0.0}
+    step_id: Optional[str] = max(finish, key=finish.get)
+    latency = finish[step_id]
+    path = []
+    while step_id is not None:
+        path.append(step_id)
+        step_id = previous[step_id]
+    return {"steps": path[::-1], "latency": latency}
+
+
+def summarize_workflow(workflow: Workflow, records: List[Dict[str, Any]], wall_time: float) -> Dict[str, Any]:
+    """Critical path against total work, plus how well the run used the available parallelism"""
+    total_work = sum(record["latency"] or 0.0 for record in records)
+    path = critical_path(records)
+    depth: Dict[str, int] = {}
+    graph = {record["id"]: record["depends_on"] for record in records}
+    for step_id in topological_order(graph):
+        depth[step_id] = 1 + max((depth[dep] for dep in graph[step_id]), default=0)
+    widths: Dict[int, int] = {}
+    for level in depth.values():
+        widths[level] = widths.get(level, 0) + 1
+    return {
+        "workflow": workflow.name,
+        "description": workflow.description,
+        "steps": records,
+        "unresolved_dependencies": workflow.unresolved,
+        "successful_steps": sum(1 for record in records if record["success"]),
+        "wall_time": wall_time,
+        "total_work": total_work,
+        "critical_path": path,
+        # Best possible speedup over running the steps one after another
+        "max_speedup": total_work / path["latency"] if path["latency"] > 0 else None,
+        # Speedup this run achieved
+        "parallelism": total_work / wall_time if wall_time > 0 else None,
+        # Time lost to scheduling and waiting beyond the critical path
+        "overhead": wall_time - path["latency"],
+        "max_width": max(widths.values(), default=0),
+    }
+
+
+def format_workflow_report(report: Dict[str, Any]) -> str:
+    on_path = set(report["critical_path"]["steps"])
+    lines = [
+        f"{'step':<28} {'agent':<24} {'after':<30} {'start':>7} {'latency':>8}  ",
+        "-" * 104,
+    ]
+    for step in report["steps"]:
+        if step.get("skipped"):
+            timing = f"{'-':>7} {'skipped':>8}"
+        else:
+            timing = f"{step['start']:>6.2f}s {step['latency']:>7.2f}s"
+        status = "✗" if not step["success"] else ("*" if step["id"] in on_path else "")
+        lines.append(f"{step['id']:<28} {step['agent']:<24} {', '.join(step['depends_on']) or '-':<30} {timing}  {status}")
+    speedup = report["max_speedup"]
+    lines += [
+        "",
+        f"critical path (*): {' → '.join(report['critical_path']['steps'])}",
+        f"critical path {report['critical_path']['latency']:.2f}s | total work {report['total_work']:.2f}s | "
+        f"wall {report['wall_time']:.2f}s | parallelism {report['parallelism'] or 0:.2f}x of "
+        f"{speedup or 0:.2f}x possible | widest level {report['max_width']} steps",
+    ]
+    if report["unresolved_dependencies"]:
+        lines.append(f"unresolved dependencies: {'; '.join(report['unresolved_dependencies'])}")
+    return "\n".join(lines)
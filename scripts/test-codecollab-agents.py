@@ -1,697 +1,8 @@
-import os
-import json
-import time
-import asyncio
-from typing import Dict, Any, List
-import google.generativeai as genai
+import sys
 
-class CodeCollabAITester:
-    def __init__(self, api_key: str):
-        """Initialize the tester with Gemini API"""
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-2.0-flash-exp')
-        
-    def test_frontend_specialist(self) -> Dict[str, Any]:
-        """Test frontend specialist agent capabilities"""
-        prompt = """
-        You are a Frontend Specialist expert in React, TypeScript, and modern web development.
-        Create a React component for a collaborative code editor toolbar with the following features:
-        - Save, run, and share buttons
-        - File breadcrumb navigation
-        - Live collaboration indicators (user avatars)
-        - Theme toggle (dark/light)
-        - Use TypeScript interfaces
-        - Use Tailwind CSS for styling
-        - Include hover animations and micro-interactions
-        
-        Return your response in this exact JSON format:
-        {
-            "code": "complete React component code with TypeScript",
-            "interfaces": "TypeScript interfaces definitions",
-            "features": ["list of implemented features"],
-            "styling_approach": "description of Tailwind CSS classes used",
-            "accessibility": ["accessibility features included"],
-            "interactions": ["animations and micro-interactions implemented"]
-        }
-        """
-        
-        start_time = time.time()
-        response = self.model.generate_content(prompt)
-        response_time = time.time() - start_time
-        
-        return {
-            "agent": "frontend-specialist",
-            "test": "collaborative_toolbar_component",
-            "prompt": prompt,
-            "response": response.text,
-            "response_time": response_time,
-            "success": self._validate_json_response(response.text),
-            "evaluation_criteria": [
-                "Contains React component with TypeScript",
-                "Includes proper interfaces",
-                "Uses Tailwind CSS classes",
-                "Has collaboration features",
-                "Includes accessibility attributes",
-                "Contains animations/transitions"
-            ]
-        }
-    
-    def test_backend_specialist(self) -> Dict[str, Any]:
-        """Test backend specialist agent capabilities"""
-        prompt = """
-        You are a Backend Specialist expert in API design and server-side architecture.
-        Create a Next.js API route for real-time collaboration features with:
-        - WebSocket connection handling
-        - User presence tracking
-        - File synchronization
-        - Conflict resolution
-        - Rate limiting
-        - Authentication middleware
-        - TypeScript types
-        
-        Return your response in this exact JSON format:
-        {
-            "code": "complete Next.js API route code",
-            "websocket_handler": "WebSocket connection logic",
-            "middleware": ["authentication and rate limiting middleware"],
-            "endpoints": [
-                {
-                    "method": "HTTP method",
-                    "path": "endpoint path",
-                    "description": "functionality description",
-                    "request_body": "expected request structure",
-                    "response": "response structure"
-                }
-            ],
-            "security_features": ["security measures implemented"],
-            "real_time_features": ["real-time collaboration features"],
-            "dependencies": ["required npm packages"]
-        }
-        """
-        
-        start_time = time.time()
-        response = self.model.generate_content(prompt)
-        response_time = time.time() - start_time
-        
-        return {
-            "agent": "backend-specialist",
-            "test": "realtime_collaboration_api",
-            "prompt": prompt,
-            "response": response.text,
-            "response_time": response_time,
-            "success": self._validate_json_response(response.text),
-            "evaluation_criteria": [
-                "Contains Next.js API route",
-                "Includes WebSocket handling",
-                "Has authentication middleware",
-                "Implements rate limiting",
-                "Covers real-time features",
-                "Uses proper TypeScript"
-            ]
-        }
-    
-    def test_database_specialist(self) -> Dict[str, Any]:
-        """Test database specialist capabilities"""
-        prompt = """
-        You are a Database Specialist expert in database design and optimization.
-        Design a comprehensive database schema for CodeCollab AI platform with:
-        - User management and authentication
-        - Project and file storage
-        - Real-time collaboration sessions
-        - Comments and annotations
-        - AI agent interactions history
-        - Version control integration
-        - Performance optimization
-        
-        Return your response in this exact JSON format:
-        {
-            "schema": "complete SQL schema with CREATE TABLE statements",
-            "tables": [
-                {
-                    "name": "table name",
-                    "purpose": "what this table stores",
-                    "columns": ["column definitions with types"],
-                    "indexes": ["recommended indexes for performance"],
-                    "relationships": ["foreign key relationships"]
-                }
-            ],
-            "rls_policies": ["Row Level Security policies for Supabase"],
-            "functions": ["database functions for complex operations"],
-            "optimization_notes": ["performance optimization strategies"],
-            "real_time_considerations": ["real-time subscription setup"]
-        }
-        """
-        
-        start_time = time.time()
-        response = self.model.generate_content(prompt)
-        response_time = time.time() - start_time
-        
-        return {
-            "agent": "database-specialist",
-            "test": "codecollab_database_schema",
-            "prompt": prompt,
-            "response": response.text,
-            "response_time": response_time,
-            "success": self._validate_json_response(response.text),
-            "evaluation_criteria": [
-                "Contains complete SQL schema",
-                "Has proper table relationships",
-                "Includes performance indexes",
-                "Covers real-time features",
-                "Implements security policies",
-                "Optimized for collaboration"
-            ]
-        }
-    
-    def test_testing_specialist(self) -> Dict[str, Any]:
-        """Test testing specialist capabilities"""
-        prompt = """
-        You are a Testing Specialist expert in test automation and quality assurance.
-        Create a comprehensive test suite for a collaborative code editor component with:
-        - Unit tests for component rendering
-        - Integration tests for real-time collaboration
-        - End-to-end tests for user workflows
-        - Performance tests for large files
-        - Accessibility tests
-        - Error boundary testing
-        - Mock strategies for WebSocket connections
-        
-        Return your response in this exact JSON format:
-        {
-            "test_code": "complete test file with Jest and React Testing Library",
-            "test_categories": [
-                {
-                    "category": "unit/integration/e2e/performance",
-                    "tests": ["specific test case descriptions"],
-                    "coverage": "functionality coverage percentage"
-                }
-            ],
-            "mock_strategies": ["mocking approaches for external dependencies"],
-            "setup_requirements": ["testing dependencies and configuration"],
-            "edge_cases": ["edge cases and error scenarios tested"],
-            "accessibility_tests": ["a11y testing approaches"],
-            "performance_benchmarks": ["performance testing metrics"]
-        }
-        """
-        
-        start_time = time.time()
-        response = self.model.generate_content(prompt)
-        response_time = time.time() - start_time
-        
-        return {
-            "agent": "testing-specialist",
-            "test": "collaborative_editor_test_suite",
-            "prompt": prompt,
-            "response": response.text,
-            "response_time": response_time,
-            "success": self._validate_json_response(response.text),
-            "evaluation_criteria": [
-                "Contains comprehensive test cases",
-                "Uses Jest and React Testing Library",
-                "Covers multiple test categories",
-                "Includes accessibility testing",
-                "Has performance benchmarks",
-                "Proper mocking strategies"
-            ]
-        }
-    
-    def test_code_review_specialist(self) -> Dict[str, Any]:
-        """Test code review specialist capabilities"""
-        sample_code = """
-        'use client';
-        import { useState, useEffect } from 'react';
-        import { WebSocket } from 'ws';
-        
-        function CollaborativeEditor({ projectId, userId }) {
-          const [code, setCode] = useState('');
-          const [ws, setWs] = useState(null);
-          const [users, setUsers] = useState([]);
-          
-          useEffect(() => {
-            const websocket = new WebSocket('ws://localhost:3000/collaborate');
-            setWs(websocket);
-            
-            websocket.onmessage = (event) => {
-              const data = JSON.parse(event.data);
-              if (data.type === 'code_update') {
-                setCode(data.code);
-              }
-            };
-          }, []);
-          
-          const handleCodeChange = (newCode) => {
-            setCode(newCode);
-            if (ws) {
-              ws.send(JSON.stringify({
-                type: 'code_update',
-                code: newCode,
-                userId: userId
-              }));
-            }
-          };
-          
-          return (
-            <div>
-              <textarea 
-                value={code} 
-                onChange={(e) => handleCodeChange(e.target.value)}
-                style={{width: '100%', height: '400px'}}
-              />
-            </div>
-          );
-        }
-        """
-        
-        prompt = f"""
-        You are a Code Review Specialist expert in code quality, patterns, and best practices.
-        Analyze this React collaborative editor component for CodeCollab AI:
-        
-        {sample_code}
-        
-        Provide comprehensive feedback on code quality, security, performance, and collaboration features.
-        
-        Return your response in this exact JSON format:
-        {{
-            "overall_score": "score out of 100",
-            "code_quality_issues": [
-                {{
-                    "type": "error/warning/suggestion",
-                    "severity": "critical/high/medium/low",
-                    "line": "line number if applicable",
-                    "issue": "detailed description of the issue",
-                    "recommendation": "specific fix recommendation",
-                    "example": "code example of the fix"
-                }}
-            ],
-            "security_vulnerabilities": ["security issues found"],
-            "performance_concerns": ["performance optimization opportunities"],
-            "collaboration_issues": ["problems with real-time collaboration"],
-            "best_practices": ["React/TypeScript best practices violations"],
-            "refactored_code": "improved version with fixes applied",
-            "accessibility_improvements": ["a11y enhancements needed"],
-            "testing_recommendations": ["testing strategies for this component"]
-        }}
-        """
-        
-        start_time = time.time()
-        response = self.model.generate_content(prompt)
-        response_time = time.time() - start_time
-        
-        return {
-            "agent": "code-review-specialist",
-            "test": "collaborative_editor_code_review",
-            "prompt": prompt,
-            "response": response.text,
-            "response_time": response_time,
-            "success": self._validate_json_response(response.text),
-            "evaluation_criteria": [
-                "Identifies code quality issues",
-                "Finds security vulnerabilities",
-                "Suggests performance improvements",
-                "Reviews collaboration features",
-                "Provides refactored code",
-                "Includes testing recommendations"
-            ]
-        }
-    
-    def test_ai_coordinator(self) -> Dict[str, Any]:
-        """Test AI coordinator capabilities for task orchestration"""
-        prompt = """
-        You are an AI Coordinator expert in orchestrating agent collaboration and workflow management.
-        Plan and coordinate a complex development task for CodeCollab AI:
-        
-        Task: "Implement a new feature: Live code execution with shared output display"
-        
-        This feature should allow multiple users to run code collaboratively and see results in real-time.
-        Coordinate the work between all specialist agents.
-        
-        Return your response in this exact JSON format:
-        {
-            "project_breakdown": [
-                {
-                    "agent": "specialist agent name",
-                    "task": "specific task description",
-                    "dependencies": ["what must be completed first"],
-                    "deliverables": ["expected outputs"],
-                    "estimated_hours": "time estimate",
-                    "priority": "high/medium/low"
-                }
-            ],
-            "execution_phases": {
-                "phase_1": {
-                    "name": "phase name",
-                    "tasks": ["parallel tasks for this phase"],
-                    "duration": "estimated time"
-                },
-                "phase_2": {
-                    "name": "phase name", 
-                    "tasks": ["tasks dependent on phase 1"],
-                    "duration": "estimated time"
-                },
-                "phase_3": {
-                    "name": "phase name",
-                    "tasks": ["integration and testing tasks"],
-                    "duration": "estimated time"
-                }
-            },
-            "communication_protocols": ["how agents share information"],
-            "quality_checkpoints": ["validation points during development"],
-            "risk_assessment": ["potential blockers and mitigation strategies"],
-            "success_metrics": ["how to measure completion"]
-        }
-        """
-        
-        start_time = time.time()
-        response = self.model.generate_content(prompt)
-        response_time = time.time() - start_time
-        
-        return {
-            "agent": "ai-coordinator",
-            "test": "live_code_execution_feature_planning",
-            "prompt": prompt,
-            "response": response.text,
-            "response_time": response_time,
-            "success": self._validate_json_response(response.text),
-            "evaluation_criteria": [
-                "Breaks down complex feature",
-                "Assigns appropriate specialists",
-                "Identifies dependencies correctly",
-                "Creates logical development phases",
-                "Includes risk management",
-                "Defines success metrics"
-            ]
-        }
-    
-    def test_collaborative_workflow(self) -> Dict[str, Any]:
-        """Test multi-agent collaboration scenario"""
-        prompt = """
-        Simulate a realistic collaborative development workflow for CodeCollab AI.
-        Scenario: A user reports a bug where real-time cursors are not syncing properly between users.
-        
-        Show how our AI agents would collaborate to diagnose and fix this issue:
-        1. Code Review Agent analyzes the cursor sync code
-        2. Backend Specialist investigates WebSocket connections  
-        3. Frontend Specialist examines cursor rendering
-        4. Database Specialist checks session storage
-        5. Testing Specialist creates reproduction tests
-        6. AI Coordinator manages the debugging process
-        
-        Return your response in this exact JSON format:
-        {
-            "collaboration_flow": [
-                {
-                    "step": "sequence number",
-                    "agent": "agent name",
-                    "action": "what the agent does",
-                    "input": "what information they receive",
-                    "output": "what they produce",
-                    "communication": "how they share findings with other agents"
-                }
-            ],
-            "parallel_tasks": ["tasks that can be done simultaneously"],
-            "sequential_dependencies": ["tasks that must wait for others"],
-            "information_sharing": {
-                "findings_repository": "how agents store discoveries",
-                "communication_channels": "how agents communicate",
-                "decision_making": "how consensus is reached"
-            },
-            "problem_resolution": {
-                "root_cause": "identified cause of the bug",
-                "solution_strategy": "approach to fix the issue", 
-                "implementation_plan": ["step-by-step fix implementation"],
-                "testing_strategy": "how to verify the fix works"
-            }
-        }
-        """
-        
-        start_time = time.time()
-        response = self.model.generate_content(prompt)
-        response_time = time.time() - start_time
-        
-        return {
-            "agent": "multi-agent-collaboration",
-            "test": "cursor_sync_bug_resolution",
-            "prompt": prompt,
-            "response": response.text,
-            "response_time": response_time,
-            "success": self._validate_json_response(response.text),
-            "evaluation_criteria": [
-                "Shows realistic agent interactions",
-                "Demonstrates problem-solving process",
-                "Includes proper information sharing",
-                "Has logical sequence of actions",
-                "Provides concrete solution",
-                "Includes verification strategy"
-            ]
-        }
-    
-    def test_template_generation(self) -> Dict[str, Any]:
-        """Test project template generation capabilities"""
-        prompt = """
-        Generate a new project template for CodeCollab AI template gallery.
-        Create a "Real-time Dashboard" template with:
-        - Live data visualization
-        - WebSocket connections
-        - Multi-user collaboration
-        - Modern React patterns
-        - TypeScript throughout
-        - Tailwind CSS styling
-        
-        Return your response in this exact JSON format:
-        {
-            "template_metadata": {
-                "id": "template-id",
-                "name": "template name",
-                "description": "template description",
-                "category": "web/mobile/api/fullstack",
-                "difficulty": "beginner/intermediate/advanced",
-                "tags": ["technology tags"],
-                "estimated_time": "completion time"
-            },
-            "file_structure": {
-                "package.json": "complete package.json content",
-                "src/App.tsx": "main application component",
-                "src/components/Dashboard.tsx": "dashboard component",
-                "src/hooks/useWebSocket.ts": "WebSocket custom hook",
-                "src/types/index.ts": "TypeScript type definitions"
-            },
-            "features": ["list of implemented features"],
-            "learning_objectives": ["what developers will learn"],
-            "setup_instructions": ["how to get started"],
-            "customization_options": ["ways to modify the template"]
-        }
-        """
-        
-        start_time = time.time()
-        response = self.model.generate_content(prompt)
-        response_time = time.time() - start_time
-        
-        return {
-            "agent": "template-generator",
-            "test": "realtime_dashboard_template",
-            "prompt": prompt,
-            "response": response.text,
-            "response_time": response_time,
-            "success": self._validate_json_response(response.text),
-            "evaluation_criteria": [
-                "Contains complete template metadata",
-                "Has proper file structure",
-                "Includes working code files",
-                "Features real-time capabilities",
-                "Uses modern React patterns",
-                "Provides learning value"
-            ]
-        }
-    
-    def _validate_json_response(self, response: str) -> bool:
-        """Validate if response contains valid JSON"""
-        try:
-            # Try to find JSON in the response
-            start_idx = response.find('{')
-            end_idx = response.rfind('}') + 1
-            if start_idx != -1 and end_idx != 0:
-                json_str = response[start_idx:end_idx]
-                parsed = json.loads(json_str)
-                return isinstance(parsed, dict) and len(parsed) > 0
-            return False
-        except Exception as e:
-            print(f"JSON validation error: {e}")
-            return False
-    
-    def _extract_json_from_response(self, response: str) -> Dict[str, Any]:
-        """Extract and parse JSON from response"""
-        try:
-            start_idx = response.find('{')
-            end_idx = response.rfind('}') + 1
-            if start_idx != -1 and end_idx != 0:
-                json_str = response[start_idx:end_idx]
-                return json.loads(json_str)
-            return {}
-        except:
-            return {}
-    
-    def _evaluate_response_quality(self, result: Dict[str, Any]) -> Dict[str, Any]:
-        """Evaluate the quality of AI response based on criteria"""
-        evaluation = {
-            "json_valid": result["success"],
-            "response_time_acceptable": result["response_time"] < 30.0,  # 30 second threshold
-            "criteria_met": 0,
-            "total_criteria": len(result.get("evaluation_criteria", [])),
-            "quality_score": 0
-        }
-        
-        if result["success"]:
-            parsed_response = self._extract_json_from_response(result["response"])
-            criteria = result.get("evaluation_criteria", [])
-            
-            # Check how many criteria are likely met based on response content
-            for criterion in criteria:
-                if any(keyword in result["response"].lower() for keyword in criterion.lower().split()):
-                    evaluation["criteria_met"] += 1
-        
-        # Calculate quality score (0-100)
-        if evaluation["total_criteria"] > 0:
-            criteria_score = (evaluation["criteria_met"] / evaluation["total_criteria"]) * 60
-            json_score = 20 if evaluation["json_valid"] else 0
-            time_score = 20 if evaluation["response_time_acceptable"] else 10
-            evaluation["quality_score"] = criteria_score + json_score + time_score
-        
-        return evaluation
-    
-    def run_all_tests(self) -> Dict[str, Any]:
-        """Run all tests and return comprehensive results"""
-        print("🚀 Starting CodeCollab AI Agent Test Suite...")
-        print("Testing specialized AI agents for collaborative coding platform\n")
-        
-        tests = [
-            self.test_frontend_specialist,
-            self.test_backend_specialist,
-            self.test_database_specialist,
-            self.test_testing_specialist,
-            self.test_code_review_specialist,
-            self.test_ai_coordinator,
-            self.test_collaborative_workflow,
-            self.test_template_generation
-        ]
-        
-        results = []
-        total_time = 0
-        successful_tests = 0
-        quality_scores = []
-        
-        for test in tests:
-            print(f"⏳ Running {test.__name__.replace('test_', '').replace('_', ' ').title()}...")
-            result = test()
-            
-            # Evaluate response quality
-            evaluation = self._evaluate_response_quality(result)
-            result["evaluation"] = evaluation
-            
-            results.append(result)
-            total_time += result['response_time']
-            quality_scores.append(evaluation["quality_score"])
-            
-            if result['success']:
-                successful_tests += 1
-                print(f"✅ {test.__name__} - PASSED ({result['response_time']:.2f}s, Quality: {evaluation['quality_score']:.0f}/100)")
-            else:
-                print(f"❌ {test.__name__} - FAILED ({result['response_time']:.2f}s, Quality: {evaluation['quality_score']:.0f}/100)")
-        
-        # Calculate comprehensive metrics
-        avg_quality = sum(quality_scores) / len(quality_scores) if quality_scores else 0
-        
-        summary = {
-            "test_suite": "CodeCollab AI Agent Test Suite",
-            "version": "1.0.0",
-            "total_tests": len(tests),
-            "successful_tests": successful_tests,
-            "failed_tests": len(tests) - successful_tests,
-            "success_rate": (successful_tests / len(tests)) * 100,
-            "total_time": total_time,
-            "average_response_time": total_time / len(tests),
-            "average_quality_score": avg_quality,
-            "performance_rating": self._get_performance_rating(avg_quality),
-            "detailed_results": results,
-            "recommendations": self._generate_recommendations(results)
-        }
-        
-        print(f"\n📊 CodeCollab AI Test Summary:")
-        print(f"✅ Successful Tests: {successful_tests}/{len(tests)} ({summary['success_rate']:.1f}%)")
-        print(f"📈 Average Quality Score: {avg_quality:.1f}/100")
-        print(f"⏱️  Average Response Time: {summary['average_response_time']:.2f}s")
-        print(f"🏆 Performance Rating: {summary['performance_rating']}")
-        print(f"🕐 Total Execution Time: {total_time:.2f}s")
-        
-        return summary
-    
-    def _get_performance_rating(self, avg_quality: float) -> str:
-        """Get performance rating based on quality score"""
-        if avg_quality >= 90:
-            return "Excellent ⭐⭐⭐⭐⭐"
-        elif avg_quality >= 80:
-            return "Very Good ⭐⭐⭐⭐"
-        elif avg_quality >= 70:
-            return "Good ⭐⭐⭐"
-        elif avg_quality >= 60:
-            return "Fair ⭐⭐"
-        else:
-            return "Needs Improvement ⭐"
-    
-    def _generate_recommendations(self, results: List[Dict[str, Any]]) -> List[str]:
-        """Generate recommendations based on test results"""
-        recommendations = []
-        
-        failed_tests = [r for r in results if not r["success"]]
-        slow_tests = [r for r in results if r["response_time"] > 20]
-        low_quality = [r for r in results if r["evaluation"]["quality_score"] < 70]
-        
-        if failed_tests:
-            recommendations.append(f"Fix JSON response formatting for {len(failed_tests)} failed tests")
-        
-        if slow_tests:
-            recommendations.append(f"Optimize response time for {len(slow_tests)} slow tests (>20s)")
-        
-        if low_quality:
-            recommendations.append(f"Improve response quality for {len(low_quality)} tests scoring below 70/100")
-        
-        if not recommendations:
-            recommendations.append("All tests performing well! Consider adding more complex test scenarios.")
-        
-        return recommendations
+# The suite lives in codecollab_harness so its bytecode is cached between runs;
+# this script is only the entry point (see codecollab_harness/cli.py)
+from codecollab_harness.cli import main
 
-# Usage example for CodeCollab AI
 if __name__ == "__main__":
-    # Replace with your actual Gemini API key
-    API_KEY = "your-gemini-api-key-here"
-    
-    print("🤖 CodeCollab AI Agent Test Suite")
-    print("=" * 50)
-    print("Testing AI agents for collaborative coding platform")
-    print("This suite validates the capabilities of our specialized AI agents\n")
-    
-    try:
-        tester = CodeCollabAITester(API_KEY)
-        results = tester.run_all_tests()
-        
-        # Save results to file with timestamp
-        timestamp = time.strftime("%Y%m%d_%H%M%S")
-        filename = f'codecollab_ai_test_results_{timestamp}.json'
-        
-        with open(filename, 'w') as f:
-            json.dump(results, f, indent=2)
-        
-        print(f"\n💾 Detailed results saved to '{filename}'")
-        
-        # Display recommendations
-        if results["recommendations"]:
-            print(f"\n💡 Recommendations:")
-            for i, rec in enumerate(results["recommendations"], 1):
-                print(f"   {i}. {rec}")
-        
-    except Exception as e:
-        print(f"❌ Error running CodeCollab AI tests: {e}")
-        print("\nTroubleshooting:")
-        print("1. Install required package: pip install google-generativeai")
-        print("2. Set your Gemini API key in the API_KEY variable")
-        print("3. Ensure stable internet connection")
-        print("4. Check that your API key has proper permissions")
\ No newline at end of file
+    sys.exit(main())
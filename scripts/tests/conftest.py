@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The harness is run as scripts/test-codecollab-agents.py, not installed: import it from scripts/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,58 @@
+import pytest
+
+from codecollab_harness.artifacts import check_sql_lexically
+
+
+def test_valid_schema():
+    sql = """
+    -- documents shared between collaborators; a ';' in a comment is ignored
+    CREATE TABLE documents (
+        id uuid PRIMARY KEY,
+        title text NOT NULL DEFAULT 'Untitled (draft); v1'
+    );
+    /* multi-line comment ( with an open paren */
+    CREATE INDEX "documents (title)" ON documents (title);
+    """
+    assert check_sql_lexically(sql) == []
+
+
+def test_doubled_quotes_are_escapes():
+    assert check_sql_lexically("INSERT INTO t VALUES ('it''s; (fine');") == []
+    assert check_sql_lexically('SELECT "a""b;(" FROM t;') == []
+
+
+def test_dollar_quoted_bodies():
+    sql = """
+    CREATE FUNCTION touch() RETURNS trigger AS $$
+    BEGIN
+        NEW.updated_at := now(); -- a ; and ( inside the body
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+    DO $body$ BEGIN PERFORM 1; END $body$;
+    """
+    assert check_sql_lexically(sql) == []
+
+
+@pytest.mark.parametrize("sql, error", [
+    ("SELECT 'unterminated;", "line 1: unterminated string"),
+    ('SELECT "unterminated;', "line 1: unterminated quoted identifier"),
+    ("SELECT 1;\n/* never closed", "line 2: unterminated comment"),
+    ("CREATE FUNCTION f() AS $fn$ SELECT 1; $$;", "line 1: unterminated dollar-quoted body $fn$"),
+])
+def test_unterminated(sql, error):
+    assert check_sql_lexically(sql) == [error]
+
+
+def test_parentheses():
+    assert check_sql_lexically("CREATE TABLE t (id int;") == ["line 1: unclosed '('"]
+    assert check_sql_lexically("SELECT 1);") == ["line 1: unbalanced ')'"]
+
+
+def test_statement_must_start_with_a_command():
+    errors = check_sql_lexically("CREATE TABLE t (id int);\nHere is the schema;")
+    assert errors == ["line 2: statement does not start with a SQL command: 'Here is the schema'"]
+
+
+def test_empty():
+    assert check_sql_lexically("-- nothing but a comment\n") == ["no SQL statements"]
@@ -0,0 +1,42 @@
+from collections import Counter
+
+import pytest
+
+from codecollab_harness.bench import EXACT_T_DF, AdaptiveSampler, mean_half_width, t_quantile
+
+
+@pytest.mark.parametrize("confidence, df, expected", [
+    (0.95, 1, 12.7062047),
+    (0.95, 2, 4.3026527),
+    (0.95, 3, 3.1824463),
+    (0.95, 10, 2.2281389),
+    (0.95, EXACT_T_DF, 2.0422725),
+    (0.95, EXACT_T_DF + 1, 2.0395134),
+    (0.99, 1, 63.6567412),
+    (0.99, 2, 9.9248432),
+    (0.90, 4, 2.1318468),
+    (0.99, 60, 2.6602830),
+])
+def test_t_quantile_matches_tables(confidence, df, expected):
+    assert t_quantile(confidence, df) == pytest.approx(expected, rel=1e-6)
+
+
+def test_mean_half_width():
+    assert mean_half_width([1.0]) is None
+    # Two values 2 apart: stdev √2, so the half-width is t(0.95, 1) · √2 / √2
+    assert mean_half_width([0.0, 2.0]) == pytest.approx(12.7062047, rel=1e-6)
+
+
+def test_calls_in_flight_are_shared_before_results_arrive():
+    sampler = AdaptiveSampler(["a", "b", "c"], min_trials=2, max_trials=30)
+    picks = Counter(sampler.next_test() for _ in range(40))
+    assert picks == {"a": 14, "b": 13, "c": 13}
+
+
+def test_free_calls_go_to_the_noisy_test():
+    sampler = AdaptiveSampler(["noisy", "stable"], min_trials=2, max_trials=30)
+    assert [sampler.next_test() for _ in range(4)] == ["noisy", "stable", "noisy", "stable"]
+    for test, quality in (("noisy", 0.0), ("noisy", 100.0), ("stable", 80.0), ("stable", 80.0)):
+        sampler.add(test, quality, 1.0)
+    assert sampler.done("stable") and not sampler.done("noisy")
+    assert [sampler.next_test() for _ in range(3)] == ["noisy"] * 3
@@ -0,0 +1,27 @@
+import os
+
+from codecollab_harness.cache import ResponseCache
+
+
+def test_prune_evicts_least_recently_used(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_size_bytes=1)
+    for written, key in enumerate(["c" * 64, "b" * 64, "a" * 64]):
+        cache.put(key, {"text": key[0] * 100})
+        os.utime(cache._path(key), (1_000_000 + written, 1_000_000 + written))
+    # "c" is the oldest entry, but a hit makes it the most recently used
+    assert cache.get("c" * 64)["text"][0] == "c"
+    cache.max_size_bytes = 2 * os.path.getsize(cache._path("c" * 64))
+    assert cache.prune() == 1
+    assert [key[0] for key in ("a" * 64, "b" * 64, "c" * 64) if cache.get(key)] == ["a", "c"]
+
+
+def test_hits_keep_the_recording_time_for_expiry(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_age_seconds=60)
+    cache.put("d" * 64, {"text": "x"})
+    os.utime(cache._path("d" * 64), (0, 0))
+    assert cache.get("d" * 64) is None
+    cache.max_age_seconds = None
+    assert cache.get("d" * 64) == {"text": "x"}
+    assert os.path.getmtime(cache._path("d" * 64)) == 0
+    cache.max_age_seconds = 60
+    assert cache.prune() == 1
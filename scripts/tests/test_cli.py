@@ -0,0 +1,41 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from codecollab_harness.cli import build_parser
+
+SCRIPTS = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def startup_modules():
+    """Harness modules loaded by importing the CLI and building its parser, in a fresh interpreter"""
+    code = ("import sys; from codecollab_harness.cli import build_parser; build_parser(); "
+            "print(' '.join(name.partition('.')[2] for name in sys.modules if name.startswith('codecollab_harness.')))")
+    output = subprocess.run([sys.executable, "-c", code], cwd=SCRIPTS, capture_output=True, text=True, check=True).stdout
+    return set(output.split())
+
+
+def test_parser_loads_only_the_options():
+    # Anything more is paid for by every command, `--help` included, at startup
+    assert startup_modules() == {"cli", "options"}
+
+
+@pytest.mark.parametrize("argv", [
+    ["load", "--rate", "0"],
+    ["load", "--rate", "2,-1"],
+    ["load", "--rate", "nan"],
+    ["load", "--rate", ","],
+    ["load", "--users", "0"],
+    ["load", "--rate", "1", "--connections", "0"],
+])
+def test_load_levels_must_be_positive(argv, capsys):
+    with pytest.raises(SystemExit):
+        build_parser().parse_args(argv)
+    assert "expected" in capsys.readouterr().err
+
+
+def test_load_levels():
+    args = build_parser().parse_args(["load", "--rate", "0.5, 2", "--connections", "8"])
+    assert (args.rate, args.connections) == ([0.5, 2.0], 8)
+    assert build_parser().parse_args(["load", "--users", "1,4"]).users == [1, 4]
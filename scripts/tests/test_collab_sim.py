@@ -0,0 +1,122 @@
+import asyncio
+
+import pytest
+
+from codecollab_harness.collab_sim import (EDIT, REPLACE, CollabSimulator, RelayServer, WebSocket, _accept_key,
+                                           _apply_mask, _Decoder, _read_head, _write_var_string, _write_var_uint,
+                                           awareness_message, edit_update, merge_updates, read_awareness,
+                                           split_updates, update_id)
+
+
+@pytest.mark.parametrize("value, encoded", [(0, b"\x00"), (127, b"\x7f"), (128, b"\x80\x01"), (300, b"\xac\x02")])
+def test_var_uint_encoding(value, encoded):
+    out = bytearray()
+    _write_var_uint(out, value)
+    assert bytes(out) == encoded
+
+
+def test_var_fields_round_trip():
+    values = [0, 1, 127, 128, 16383, 16384, 2 ** 32 - 1, 2 ** 53]
+    out = bytearray()
+    for value in values:
+        _write_var_uint(out, value)
+    _write_var_string(out, "src/файл.ts")
+    decoder = _Decoder(bytes(out))
+    assert [decoder.var_uint() for _ in values] == values
+    assert decoder.var_string() == "src/файл.ts"
+    assert decoder.pos == len(out)
+
+
+@pytest.mark.parametrize("origin, deleted", [(None, None), ((7, 41), None), ((7, 41), (7, 0, 42))])
+def test_edit_update_carries_its_id(origin, deleted):
+    update = edit_update(3_000_000_000, 42, "src/a.ts", "let x", origin=origin, deleted=deleted)
+    assert update_id(update) == (3_000_000_000, 42)
+    assert split_updates(merge_updates([update, b"\x00"])) == [update, b"\x00"]
+
+
+def test_awareness_round_trip():
+    entries = [(1, 0, '{"user": {"name": "a"}}'), (2 ** 31, 5, "null")]
+    message = awareness_message(entries)
+    decoder = _Decoder(message)
+    assert decoder.var_uint() == 1
+    assert read_awareness(decoder.var_bytes()) == entries
+
+
+class _Buffer:
+    def __init__(self):
+        self.data = bytearray()
+
+    def write(self, data):
+        self.data += data
+
+
+@pytest.mark.parametrize("size", [0, 5, 200, 70000])
+def test_masked_frames_round_trip(size):
+    payload = bytes(range(256)) * (size // 256) + bytes(size % 256)
+    buffer = _Buffer()
+    client = WebSocket(None, buffer, mask=True)
+    wire = client.send(payload)
+    assert wire == len(buffer.data) and buffer.data[1] & 0x80
+    if size:
+        assert payload not in buffer.data
+
+    async def receive():
+        reader = asyncio.StreamReader()
+        reader.feed_data(bytes(buffer.data))
+        reader.feed_eof()
+        return await WebSocket(reader, _Buffer(), mask=False).recv()
+
+    assert asyncio.run(receive()) == (payload, wire)
+
+
+def test_mask_is_its_own_inverse():
+    assert _apply_mask(_apply_mask(b"hello world", b"\x01\x02\x03\x04"), b"\x01\x02\x03\x04") == b"hello world"
+    assert _apply_mask(b"\x00\x00\x00\x00\x00", b"\x01\x02\x03\x04") == b"\x01\x02\x03\x04\x01"
+
+
+@pytest.mark.parametrize("edit_mode", ["keystroke", REPLACE])
+def test_simulation_against_the_relay_converges(edit_mode):
+    async def simulate():
+        server = RelayServer()
+        await server.start()
+        try:
+            simulator = CollabSimulator(server.url, clients=4, rooms=2, edit_rate=20, cursor_rate=10,
+                                        edit_mode=edit_mode, file_chars=50)
+            return await simulator.run(duration=0.3, ramp=0.05, settle=2)
+        finally:
+            await server.stop()
+
+    report = asyncio.run(simulate())
+    assert (report["connected"], report["failed_connections"]) == (4, 0)
+    assert report["convergence"]["converged"] and report["convergence"]["digests_match"]
+    edits = report["ops"][EDIT]
+    assert edits["sent"] > 0 and edits["deliveries"] == edits["expected_deliveries"] == edits["sent"]
+
+
+def test_join_that_never_syncs_is_closed():
+    closed = []
+
+    async def silent(reader, writer):
+        _, headers = await _read_head(reader)
+        writer.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                      f"Sec-WebSocket-Accept: {_accept_key(headers['sec-websocket-key'])}\r\n\r\n").encode())
+        while await reader.read(4096):
+            pass
+        closed.append(writer)
+        writer.close()
+
+    async def simulate():
+        server = await asyncio.start_server(silent, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            report = await CollabSimulator(f"ws://127.0.0.1:{port}", clients=3, rooms=1, timeout=0.2).run(
+                duration=0.1, ramp=0, settle=0.1)
+            await asyncio.sleep(0.05)
+        finally:
+            server.close()
+            await server.wait_closed()
+        return report, [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+
+    report, leftover = asyncio.run(simulate())
+    assert (report["connected"], report["failed_connections"]) == (0, 3)
+    assert len(closed) == 3 and leftover == []
@@ -0,0 +1,17 @@
+from codecollab_harness.history import ResultsStore
+
+
+def result(prompt, response):
+    return {"agent": "frontend-specialist", "test": "toolbar", "model": "flash", "response_time": 1.0,
+            "success": True, "evaluation": {"quality_score": 80.0}, "prompt": prompt, "response": response}
+
+
+def test_replacing_a_run_drops_blobs_only_it_used(tmp_path):
+    with ResultsStore(str(tmp_path / "history.db")) as store:
+        store.add_run([result("prompt", "shared")], 1.0, source="other.json")
+        store.add_run([result("prompt", "old answer")], 2.0, source="run.json")
+        run_id = store.add_run([result("prompt", "new answer")], 2.0, source="run.json")
+        texts = {store.get_blob(row[0]) for row in store.db.execute("SELECT hash FROM blobs")}
+        assert texts == {"prompt", "shared", "new answer"}
+        assert [r["response"] for r in store.load_run(run_id)] == ["new answer"]
+        assert store.stats()["runs"] == 2
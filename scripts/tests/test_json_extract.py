@@ -0,0 +1,96 @@
+import json
+
+import pytest
+
+from codecollab_harness.json_extract import JSONExtractor, ParseCache, extract_json
+
+ANSWER = {"component": "Toolbar", "props": ["a}b", "c\"]d"], "nested": {"empty": {}, "list": [1, [2]]}}
+
+
+def feed_in_chunks(text, size):
+    extractor = JSONExtractor()
+    for start in range(0, len(text), size):
+        extractor.feed(text[start:start + size])
+    return extractor
+
+
+@pytest.mark.parametrize("text", [
+    json.dumps(ANSWER),
+    "Here is the component:\n```json\n" + json.dumps(ANSWER, indent=2) + "\n```\nLet me know!",
+    "Use {placeholders} like {this} for names. " + json.dumps(ANSWER),
+    'An example: {"name": ] is wrong, the answer is ' + json.dumps(ANSWER),
+    "{} and [] first, then " + json.dumps(ANSWER) + " } ] trailing braces",
+    "An unclosed { in prose, then " + json.dumps(ANSWER),
+])
+def test_recovers_the_answer_from_around_noise(text):
+    assert extract_json(text) == ANSWER
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64])
+def test_chunked_input_parses_like_whole_input(size):
+    text = 'Example: {"name": ] then {placeholders} and ```json\n' + json.dumps(ANSWER) + "\n```"
+    extractor = feed_in_chunks(text, size)
+    assert extractor.finish() == ANSWER
+
+
+def test_escape_split_across_chunks():
+    text = json.dumps({"quote": 'say "hi"}'})
+    for size in range(1, len(text)):
+        assert feed_in_chunks(text, size).finish() == {"quote": 'say "hi"}'}
+
+
+def test_no_object():
+    assert extract_json("no JSON here") is None
+    assert extract_json("only empty {} and [1, 2]") is None
+    assert extract_json('{"truncated": [1, 2') is None
+
+
+def test_error_in_prose_is_recovered_and_not_broken():
+    extractor = feed_in_chunks('Example: {"name": ] and more prose', 4)
+    assert extractor.error is not None
+    assert not extractor.broken
+    assert extractor.feed(' {"ok": 1}') == {"ok": 1}
+
+
+def test_broken_answer_is_terminal():
+    extractor = feed_in_chunks('```json\n{"name": "x", "items": [1, 2}', 4)
+    assert extractor.error == "unexpected '}' at offset 36"
+    assert extractor.broken
+
+
+def test_broken_answer_with_open_inner_candidate_is_not_terminal_yet():
+    extractor = feed_in_chunks('{"outer": ] {"inner": 1', 5)
+    assert extractor.error is not None
+    assert not extractor.broken
+    assert extractor.feed("}") == {"inner": 1}
+
+
+def test_parse_cache_bounded_by_bytes():
+    cache = ParseCache(max_bytes=100)
+    cache.put("a" * 60, {"a": 1})
+    cache.put("b" * 60, {"b": 1})
+    assert cache.size == 60
+    assert cache.get("b" * 60) == {"b": 1}
+    assert cache.get('{"c": 1}') == {"c": 1}
+    assert cache.size == 68
+
+
+def test_nothing_nested_in_a_broken_object_is_returned():
+    assert extract_json('{"code":"x","features":[{"name":"f"}],}') is None
+    assert extract_json('{"a": {"b": 1} x') is None
+    assert extract_json('{"a": {"b": 1} x} then {"ok": 1}') == {"ok": 1}
+
+
+def test_failed_candidates_are_not_rescanned():
+    # Resuming just after each failed `{` made this quadratic: seconds at n=4000
+    extractor = JSONExtractor()
+    assert extractor.feed("{" * 100000 + "]") is None
+    assert extractor.finish() is None
+    assert extract_json("{" * 100000 + " " + json.dumps(ANSWER)) == ANSWER
+
+
+def test_deep_nesting_is_a_parse_failure():
+    deep = '{"a":' * 3000 + "1" + "}" * 3000
+    assert extract_json(deep) is None
+    assert extract_json(deep[:-1]) is None
+    assert ParseCache().get(deep + ' {"ok": 1}') == {"ok": 1}
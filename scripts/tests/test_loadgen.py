@@ -0,0 +1,107 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from codecollab_harness.loadgen import (AI_ROUTE, CLOSED_LOOP, CONNECTION_ERROR, OPEN_LOOP, TIMEOUT_ERROR,
+                                        LoadGenerator, LoadTarget, saturation_point, summarize_load)
+
+
+def record(status, scheduled_at, finished_at, route=AI_ROUTE):
+    return {"route": route, "label": "t", "status": status, "scheduled_at": scheduled_at,
+            "finished_at": finished_at, "latency": finished_at - scheduled_at, "service_time": 0.5}
+
+
+def test_summarize_load_window():
+    records = [
+        record(200, 0.5, 1.5),  # warmup: throughput only
+        record(200, 1.0, 2.0),
+        record(200, 2.0, 5.0),
+        record(503, 3.0, 3.1),
+        record(TIMEOUT_ERROR, 4.0, 14.0),  # finished after the window
+        record(CONNECTION_ERROR, 5.0, 5.0),
+    ]
+    step = summarize_load(records, 1.0, 11.0)
+    assert (step["requests"], step["succeeded"]) == (5, 2)
+    assert step["statuses"] == {"200": 2, "503": 1, "connection": 1, "timeout": 1}
+    assert step["arrival_rps"] == pytest.approx(0.5)
+    # Answers inside the window, 4xx/5xx included; transport errors are not answers
+    assert step["response_rps"] == pytest.approx(0.4)
+    assert step["throughput_rps"] == pytest.approx(0.3)
+    assert step["error_share"] == pytest.approx(0.6)
+    assert step["transport_error_share"] == pytest.approx(0.4)
+    # Successful requests only
+    assert step["latency"]["max"] == pytest.approx(3.0)
+    assert step["routes"][AI_ROUTE]["errors"] == 3
+
+
+def test_summarize_load_with_no_requests():
+    step = summarize_load([], 0.0, 1.0)
+    assert (step["requests"], step["error_share"], step["latency"]["p50"]) == (0, 0.0, None)
+
+
+def step(model, level, arrival, response, throughput=None, transport=0.0):
+    key = "offered_rps" if model == OPEN_LOOP else "users"
+    return {"model": model, key: level, "arrival_rps": arrival, "response_rps": response,
+            "throughput_rps": response if throughput is None else throughput, "transport_error_share": transport}
+
+
+def test_open_loop_saturates_when_answers_fall_behind_arrivals():
+    steps = [step(OPEN_LOOP, 5, 5.0, 5.0), step(OPEN_LOOP, 10, 10.0, 9.6), step(OPEN_LOOP, 20, 20.0, 12.0)]
+    assert saturation_point(steps) == {"step": 20, "capacity_rps": 12.0}
+    assert saturation_point(steps[:2]) is None
+
+
+def test_closed_loop_saturates_when_users_stop_adding_throughput():
+    steps = [step(CLOSED_LOOP, 1, 2.0, 2.0), step(CLOSED_LOOP, 2, 4.0, 3.9), step(CLOSED_LOOP, 4, 4.0, 4.0)]
+    assert saturation_point(steps) == {"step": 4, "capacity_rps": 4.0}
+
+
+def test_transport_errors_saturate_any_step():
+    steps = [step(OPEN_LOOP, 5, 5.0, 5.0, throughput=4.0, transport=0.02)]
+    assert saturation_point(steps) == {"step": 5, "capacity_rps": 4.0}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        status = 200 if self.path == "/api/ai" else 404
+        self.send_response(status)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_open_and_closed_loop_against_a_local_server(server_url):
+    generator = LoadGenerator(server_url, [LoadTarget(AI_ROUTE, "t", b"{}")], connections=4)
+    step = generator.open_loop(rate=40, duration=0.5)
+    assert step["statuses"] == {"200": step["requests"]} and step["requests"] >= 15
+    # Keep-alive: far fewer connections than requests
+    assert step["connections_opened"] <= 4
+    step = generator.closed_loop(users=2, duration=0.3)
+    assert step["succeeded"] == step["requests"] > 0
+
+
+def test_invalid_levels():
+    generator = LoadGenerator("http://127.0.0.1:9", [LoadTarget(AI_ROUTE, "t", b"{}")])
+    with pytest.raises(ValueError):
+        generator.open_loop(rate=0, duration=1)
+    with pytest.raises(ValueError):
+        generator.closed_loop(users=0, duration=1)
+    with pytest.raises(ValueError):
+        LoadGenerator("http://127.0.0.1:9", [], connections=0)
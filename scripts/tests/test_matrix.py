@@ -0,0 +1,81 @@
+import json
+
+import pytest
+
+from codecollab_harness.matrix import SPEC_DIR, MatrixAxes, expand_matrix, load_spec, load_specs
+
+SPEC = {
+    "agent": "frontend-specialist",
+    "test": "toolbar",
+    "prompt": ["Build a toolbar.", "Return your response in this exact JSON format:", '{"code": "the code"}'],
+    "variants": {"concise": ["{prompt}", "Keep it short."]},
+    "evaluation_criteria": ["code"],
+}
+DEFAULTS = {"frontend-specialist": ("flash", 0.3), "backend-specialist": ("pro", None)}
+
+
+def write_spec(directory, name, **overrides):
+    path = directory / name
+    path.write_text(json.dumps({**SPEC, **overrides}))
+    return str(path)
+
+
+def test_load_spec(tmp_path):
+    spec = load_spec(write_spec(tmp_path, "01-toolbar.json"))
+    assert spec.prompt.startswith("Build a toolbar.\n")
+    assert spec.variants["concise"] == spec.prompt + "\nKeep it short."
+    assert spec.quality_bar == 70.0
+    # No response_schema: derived from the JSON format example in the prompt
+    assert spec.response_schema["required"] == ["code"]
+
+
+def test_load_spec_rejects_broken_schemas_and_artifacts(tmp_path):
+    with pytest.raises(ValueError, match=r"01-toolbar.json: response_schema \$: unknown types \['tuple'\]"):
+        load_spec(write_spec(tmp_path, "01-toolbar.json", response_schema={"type": "tuple"}))
+    with pytest.raises(ValueError, match="unknown artifact kinds \\['cobol'\\]"):
+        load_spec(write_spec(tmp_path, "02-toolbar.json", artifacts={"code": "cobol"}))
+
+
+def test_load_specs_in_file_name_order(tmp_path):
+    write_spec(tmp_path, "02-second.json", test="second")
+    write_spec(tmp_path, "01-first.json", test="first")
+    (tmp_path / "notes.txt").write_text("not a spec")
+    assert [spec.test for spec in load_specs(str(tmp_path))] == ["first", "second"]
+
+
+def test_shipped_specs_load():
+    specs = load_specs(SPEC_DIR)
+    assert len({spec.test for spec in specs}) == len(specs) >= 8
+
+
+def test_default_matrix_is_one_cell_per_spec(tmp_path):
+    [case] = expand_matrix([load_spec(write_spec(tmp_path, "01-toolbar.json"))], DEFAULTS.get)
+    assert (case.test, case.scenario, case.model, case.temperature, case.variant) == (
+        "toolbar", "toolbar", "flash", 0.3, "default")
+    assert case.generation_config == {"temperature": 0.3}
+
+
+def test_axes_expand_and_name_the_cells(tmp_path):
+    spec = load_spec(write_spec(tmp_path, "01-toolbar.json"))
+    axes = MatrixAxes(models=["flash", "pro"], temperatures=[0.3, None], variants=["default", "concise"])
+    cases = expand_matrix([spec], DEFAULTS.get, axes=axes)
+    assert len(cases) == 8
+    assert [case.test for case in cases[:4]] == [
+        "toolbar", "toolbar[concise]", "toolbar[t=default]", "toolbar[t=default|concise]"]
+    assert cases[-1].test == "toolbar[pro|t=default|concise]"
+    assert cases[-1].prompt == spec.variants["concise"]
+
+
+def test_spec_matrix_and_all_agents(tmp_path):
+    spec = load_spec(write_spec(tmp_path, "01-toolbar.json", matrix={"agents": ["all"]}))
+    cases = expand_matrix([spec], DEFAULTS.get, agent_ids=list(DEFAULTS))
+    assert [(case.agent, case.test, case.model) for case in cases] == [
+        ("frontend-specialist", "toolbar", "flash"),
+        ("backend-specialist", "toolbar[backend-specialist]", "pro"),
+    ]
+
+
+def test_unknown_variant(tmp_path):
+    spec = load_spec(write_spec(tmp_path, "01-toolbar.json"))
+    with pytest.raises(ValueError, match=r"unknown prompt variants \['verbose'\]"):
+        expand_matrix([spec], DEFAULTS.get, axes=MatrixAxes(variants=["verbose"]))
@@ -0,0 +1,34 @@
+from codecollab_harness.metrics import MetricsExporter
+
+
+def result(response_time, quality=80.0, error=None):
+    return {"agent": "frontend-specialist", "test": "toolbar", "model": "flash", "response_time": response_time,
+            "evaluation": {"quality_score": quality}, "error": error}
+
+
+def summary(*results):
+    return {"success_rate": 100.0, "average_quality_score": 80.0, "average_response_time": 1.0,
+            "detailed_results": list(results)}
+
+
+def test_timeouts_are_errors_not_latencies():
+    exporter = MetricsExporter(window=1)
+    exporter.record_run(summary(result(1.0)))
+    alerts = exporter.record_run(summary(result(1.1), result(60.0, quality=80.0, error={"kind": "timeout"})))
+    assert alerts == []
+    [series] = exporter.state["series"].values()
+    assert (series["latency_count"], series["latency_sum"]) == (2, 2.1)
+    assert series["errors"] == {"timeout": 1}
+    assert series["last"]["latency"] == 1.1
+    text = exporter.render()
+    assert 'codecollab_agent_response_seconds_count{agent="frontend-specialist",test="toolbar",model="flash"} 2' in text
+
+
+def test_a_run_of_timeouts_has_no_latency():
+    exporter = MetricsExporter(window=1)
+    exporter.record_run(summary(result(1.0)))
+    assert exporter.record_run(summary(result(60.0, quality=0.0, error={"kind": "timeout"})))[0]["metric"] == "quality"
+    [series] = exporter.state["series"].values()
+    assert series["last"]["latency"] is None
+    samples = [line for line in exporter.render().splitlines() if not line.startswith("#")]
+    assert not any(line.startswith("codecollab_agent_last_response_seconds") for line in samples)
@@ -0,0 +1,40 @@
+import pytest
+
+from codecollab_harness.schema import compile_schema
+
+
+@pytest.mark.parametrize("schema, message", [
+    ({"type": "object", "patternProperties": {}}, "$: unsupported schema keywords ['patternProperties']"),
+    ({"type": "tuple"}, "$: unknown types ['tuple']"),
+    ({"properties": {"name": "string"}}, "$.name: a schema must be an object, got 'string'"),
+    ({"items": {"type": ["string", "date"]}}, "$[]: unknown types ['date']"),
+    ({"additionalProperties": {"oneOf": []}}, "$.*: unsupported schema keywords ['oneOf']"),
+])
+def test_compile_errors_name_the_offending_subschema(schema, message):
+    with pytest.raises(ValueError) as error:
+        compile_schema(schema)
+    assert str(error.value) == message
+
+
+def test_equal_schemas_share_a_validator():
+    assert compile_schema({"type": "string", "minLength": 1}) is compile_schema({"minLength": 1, "type": "string"})
+
+
+def test_errors():
+    validator = compile_schema({
+        "type": "object",
+        "required": ["name", "tags"],
+        "additionalProperties": False,
+        "properties": {
+            "name": {"type": "string", "minLength": 2},
+            "tags": {"type": "array", "items": {"enum": ["ui", "api"]}, "maxItems": 2},
+        },
+    })
+    assert validator.is_valid({"name": "toolbar", "tags": ["ui"]})
+    assert validator.errors({"name": "x", "tags": ["ui", "db", "api"], "extra": 1}) == [
+        "$.name: expected at least 2 characters, got 1",
+        "$.tags: expected at most 2 items, got 3",
+        "$.tags[1]: 'db' is not one of ['ui', 'api']",
+        "$: unexpected property 'extra'",
+    ]
+    assert validator.errors([]) == ["$: expected object, got array"]
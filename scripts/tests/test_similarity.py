@@ -0,0 +1,50 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from codecollab_harness.similarity import ReferenceIndex  # noqa: E402
+
+GOLDEN = {
+    "toolbar": [
+        {"component": "CollaborativeToolbar shows presence avatars and a share button",
+         "tests": "renders avatars for every active collaborator"},
+        {"component": "Toolbar with user presence indicators and share dialog",
+         "tests": "opens the share dialog on click"},
+    ],
+    "schema": ["CREATE TABLE documents with owner and collaborators tables"],
+}
+
+
+@pytest.fixture(scope="module")
+def index():
+    return ReferenceIndex(GOLDEN)
+
+
+def test_identical_answer_scores_one(index):
+    [score] = index.score([("toolbar", GOLDEN["toolbar"][0])])
+    assert score["document"] == pytest.approx(1.0, abs=1e-3)
+    assert score["fields"] == {"component": pytest.approx(1.0, abs=1e-3), "tests": pytest.approx(1.0, abs=1e-3)}
+    assert score["score"] == pytest.approx(1.0, abs=1e-3)
+
+
+def test_fields_match_their_own_references_only(index):
+    close, unrelated, partial = index.score([
+        ("toolbar", {"component": "a toolbar showing presence avatars", "tests": "renders avatars"}),
+        ("toolbar", {"component": "kubernetes ingress yaml", "tests": "helm chart lint"}),
+        ("toolbar", {"component": "CollaborativeToolbar shows presence avatars and a share button"}),
+    ])
+    assert close["score"] > 0.3
+    assert unrelated["score"] == 0.0
+    assert partial["fields"]["tests"] == 0.0
+    assert partial["score"] == pytest.approx(partial["fields"]["component"] / 2, abs=1e-4)
+
+
+def test_non_object_references_use_the_whole_response(index):
+    [score] = index.score([("schema", "CREATE TABLE documents with owner")])
+    assert score["fields"] == {}
+    assert 0.0 < score["score"] == score["document"] < 1.0
+
+
+def test_scenarios_without_references(index):
+    assert index.score([("unknown", {"a": 1}), ("schema", "documents")])[0] is None
+    assert index.score([]) == []
@@ -0,0 +1,24 @@
+import pytest
+
+from codecollab_harness.usage import TokenUsage, summarize_usage, usage_record
+
+PRICING = {"flash": (0.10, 0.40)}
+USAGE = TokenUsage(1_000_000, 500_000, 1_500_000)
+
+
+def test_cached_replays_cost_nothing():
+    assert usage_record("flash", USAGE, 2.0, PRICING)["estimated_cost"] == pytest.approx(0.30)
+    assert usage_record("flash", USAGE, 2.0, PRICING, cached=True)["estimated_cost"] == 0.0
+    assert usage_record("unpriced", USAGE, 2.0, PRICING)["estimated_cost"] is None
+
+
+def test_summary_counts_cached_calls():
+    results = [
+        {"agent": "a", "cached": False, "usage": usage_record("flash", USAGE, 2.0, PRICING)},
+        {"agent": "a", "cached": True, "usage": usage_record("flash", USAGE, 2.0, PRICING, cached=True)},
+        {"agent": "b", "usage": None},
+    ]
+    totals = summarize_usage(results)
+    assert (totals["calls"], totals["cached_calls"], totals["total_tokens"]) == (2, 1, 3_000_000)
+    assert totals["estimated_cost"] == pytest.approx(0.30)
+    assert totals["by_agent"]["a"]["cached_calls"] == 1
@@ -0,0 +1,44 @@
+import pytest
+
+from codecollab_harness.agent_config import AgentConfig
+from codecollab_harness.workflow import agent_id_for, workflow_from_breakdown
+
+AGENTS = {
+    agent.id: agent for agent in [
+        AgentConfig("frontend-specialist", "Frontend Specialist", "m", None, "frontend"),
+        AgentConfig("testing-specialist", "Testing Specialist", "m", None, "testing"),
+        AgentConfig("code-review", "Code Review Specialist", "m", None, "code-review"),
+        AgentConfig("ai-coordinator", "AI Coordinator", "m", None, "coordinator"),
+    ]
+}
+
+
+@pytest.mark.parametrize("name, agent", [
+    ("frontend-specialist", "frontend-specialist"),
+    ("Frontend Specialist", "frontend-specialist"),
+    ("frontend", "frontend-specialist"),
+    ("Frontend Specialist Agent", "frontend-specialist"),
+    ("Code Review Specialist", "code-review"),
+    ("code-review-specialist", "code-review"),
+    ("QA Engineer", "testing-specialist"),
+    ("Coordinator", "ai-coordinator"),
+])
+def test_known_names(name, agent):
+    assert agent_id_for(name, AGENTS) == agent
+
+
+@pytest.mark.parametrize("name", ["Specialist", "Front", "AI", "Review", "DevOps Engineer"])
+def test_partial_names_match_no_agent(name):
+    assert agent_id_for(name, AGENTS) not in AGENTS
+
+
+def test_breakdown_dependencies_match_whole_words():
+    workflow = workflow_from_breakdown([
+        {"agent": "Frontend Specialist", "task": "Build toolbar", "deliverables": ["Toolbar component"]},
+        {"agent": "Testing Specialist", "task": "Test toolbar", "dependencies": ["UI", "toolbar component"]},
+        {"agent": "Code Review", "task": "Review", "dependencies": ["Testing Specialist", "the build"]},
+    ], AGENTS)
+    assert [step.requires for step in workflow.steps] == [
+        [], ["1-frontend-specialist"], ["2-testing-specialist"]]
+    # "ui" is inside "build" but is not one of its words
+    assert workflow.unresolved == ["2-testing-specialist: UI", "3-code-review: the build"]